@@ -1,12 +1,13 @@
 """The Bluestar AC integration."""
-import asyncio
 import logging
-from typing import Any, Dict
+from typing import List
 
 import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.typing import ConfigType
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.const import (
     CONF_DEVICE_ID,
@@ -17,25 +18,65 @@ from homeassistant.const import (
 
 from .const import (
     DOMAIN,
-    CONF_AUTH_ID,
     CONF_AUTH_TYPE,
     DEFAULT_AUTH_TYPE,
+    CONF_PUSH_UPDATES,
+    DEFAULT_PUSH_UPDATES,
+    CONF_COALESCE_WINDOW,
+    DEFAULT_COALESCE_WINDOW,
+    CONF_OPTIMISTIC,
+    DEFAULT_OPTIMISTIC,
+    DATA_ACCOUNT,
+    DATA_API,
+    DATA_CLIENTS,
+    DATA_COORDINATOR,
+    DATA_DEVICES,
+    SIGNAL_NEW_DEVICES,
 )
-from .bluestar_client import BluestarACClient
+from .account import (
+    account_key,
+    async_get_account,
+    async_release_account,
+    async_remove_session_cache,
+)
+from .services import async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS: list[Platform] = [Platform.CLIMATE, Platform.SWITCH, Platform.FAN]
+PLATFORMS: list[Platform] = [Platform.CLIMATE, Platform.SWITCH, Platform.FAN, Platform.SENSOR]
 
 CONFIG_SCHEMA = vol.Schema({
     DOMAIN: vol.Schema({
         vol.Required(CONF_USERNAME): str,
         vol.Required(CONF_PASSWORD): str,
-        vol.Required(CONF_DEVICE_ID): str,
+        vol.Optional(CONF_DEVICE_ID): str,
         vol.Optional(CONF_AUTH_TYPE, default=DEFAULT_AUTH_TYPE): str,
     })
 })
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Register the integration's services."""
+    async_setup_services(hass)
+    return True
+
+def _entry_device_ids(
+    hass: HomeAssistant, entry: ConfigEntry, coordinator
+) -> List[str]:
+    """Return the devices a config entry covers.
+    
+    Entries created before multi-device support name a single device; an
+    account entry covers every discovered device not owned by one of them.
+    """
+    if CONF_DEVICE_ID in entry.data:
+        return [entry.data[CONF_DEVICE_ID]]
+    
+    legacy = {
+        other.data[CONF_DEVICE_ID]
+        for other in hass.config_entries.async_entries(DOMAIN)
+        if CONF_DEVICE_ID in other.data
+    }
+    return [device_id for device_id in coordinator.data if device_id not in legacy]
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Bluestar AC from a config entry."""
     hass.data.setdefault(DOMAIN, {})
@@ -43,24 +84,76 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     config = entry.data
     username = config[CONF_USERNAME]
     password = config[CONF_PASSWORD]
-    device_id = config[CONF_DEVICE_ID]
-    auth_type = config.get(CONF_AUTH_TYPE, DEFAULT_AUTH_TYPE)
     
-    # Create client
-    client = BluestarACClient(username, password, device_id, auth_type)
+    coalesce_window = entry.options.get(CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW)
+    optimistic = entry.options.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC)
+    push = entry.options.get(CONF_PUSH_UPDATES, DEFAULT_PUSH_UPDATES)
     
+    # Entries on the same account share one login, connection and coordinator
+    account = async_get_account(hass, username, password)
+    account.entry_ids.add(entry.entry_id)
     try:
-        # Test connection
-        await hass.async_add_executor_job(client.test_connection)
-    except Exception as ex:
-        _LOGGER.error("Failed to connect to Bluestar AC: %s", ex)
-        raise ConfigEntryNotReady from ex
+        await account.async_setup()
+    except ConfigEntryNotReady:
+        await async_release_account(hass, account, entry.entry_id)
+        raise
+    
+    coordinator = account.coordinator
+    clients = {
+        device_id: account.get_client(device_id, coalesce_window / 1000, optimistic)
+        for device_id in _entry_device_ids(hass, entry, coordinator)
+    }
     
-    # Store client in hass data
-    hass.data[DOMAIN][entry.entry_id] = client
+    devices = {device_id: account.get_device(device_id) for device_id in clients}
+    
+    # Store clients in hass data
+    hass.data[DOMAIN][entry.entry_id] = {
+        DATA_ACCOUNT: account,
+        DATA_API: account.api,
+        DATA_CLIENTS: clients,
+        DATA_COORDINATOR: coordinator,
+        DATA_DEVICES: devices,
+    }
     
     # Set up platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    
+    @callback
+    def async_add_new_devices() -> None:
+        """Create clients and entities for ACs added to the account since setup."""
+        new = [
+            device_id for device_id in _entry_device_ids(hass, entry, coordinator)
+            if device_id not in clients
+        ]
+        if not new:
+            return
+        _LOGGER.info("Adding new Bluestar ACs %s", ", ".join(new))
+        for device_id in new:
+            clients[device_id] = account.get_client(
+                device_id, coalesce_window / 1000, optimistic
+            )
+            devices[device_id] = account.get_device(device_id)
+        async_dispatcher_send(
+            hass,
+            SIGNAL_NEW_DEVICES.format(entry_id=entry.entry_id),
+            [devices[device_id] for device_id in new],
+        )
+        entry.async_create_background_task(
+            hass,
+            account.async_add_clients([clients[device_id] for device_id in new], push),
+            f"{DOMAIN}_add_{entry.entry_id}",
+        )
+    
+    entry.async_on_unload(coordinator.async_add_listener(async_add_new_devices))
+    
+    # Connect after the entities exist so startup does not wait on the cloud;
+    # in push mode shadow messages replace polling once subscribed
+    entry.async_create_background_task(
+        hass,
+        account.async_start(list(clients.values()), push),
+        f"{DOMAIN}_start_{entry.entry_id}",
+    )
     
     return True
 
@@ -69,13 +162,27 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        data = hass.data[DOMAIN].pop(entry.entry_id)
+        account = data[DATA_ACCOUNT]
+        for device_id in data[DATA_CLIENTS]:
+            await account.async_remove_client(device_id)
+        await async_release_account(hass, account, entry.entry_id)
     
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the cached session once no entry uses the account."""
+    key = account_key(entry.data[CONF_USERNAME])
+    if not any(
+        account_key(other.data.get(CONF_USERNAME, "")) == key
+        for other in hass.config_entries.async_entries(DOMAIN)
+        if other.entry_id != entry.entry_id
+    ):
+        await async_remove_session_cache(hass, entry.data[CONF_USERNAME])
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    await hass.config_entries.async_reload(entry.entry_id)
 
@@ -0,0 +1,429 @@
+"""Per-account state shared by all Bluestar AC config entries."""
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+from homeassistant.util.ssl import get_default_context
+
+from .api_client import BluestarClient
+from .aws_iot import BluestarIoTConnection, IoTConnectionError, decode_credentials
+from .bluestar_client import BluestarACClient
+from .capabilities import Capabilities, get_capabilities
+from .const import (
+    DOMAIN,
+    DATA_ACCOUNTS,
+    DATA_MODELS,
+    DEFAULT_SCAN_INTERVAL,
+    STORAGE_VERSION,
+    STORAGE_SAVE_DELAY,
+)
+from .coordinator import BluestarDataUpdateCoordinator
+from .device_state import DeviceStateTracker
+from .reconnect import ReconnectSupervisor
+from .scheduler import CommandScheduler
+from .session import SessionRefresher
+from .trace import INCOMING, OUTGOING
+from .transport import TransportSelector
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def account_key(username: str) -> str:
+    """Return the key identifying an account, whatever the username's case."""
+    return username.strip().lower()
+
+
+def _session_store(hass: HomeAssistant, username: str) -> Store:
+    """Return the private store caching an account's session and devices.
+
+    The key is derived from a hash so usernames do not end up in file names.
+    """
+    key = hashlib.sha256(account_key(username).encode()).hexdigest()[:16]
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.session.{key}", private=True)
+
+
+class _ModelCache:
+    """``model_config`` of every model seen, persisted by ``model_id``.
+
+    Lets devices whose ``/things`` entry lacks a config still get the
+    right capabilities.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the cache."""
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.models")
+        self._loaded = False
+        self.models: Dict[str, Dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load the stored configs and compile them."""
+        if self._loaded:
+            return
+        self._loaded = True
+        self.models.update(await self._store.async_load() or {})
+        for model_id, model_config in self.models.items():
+            get_capabilities(model_id, model_config)
+
+    @callback
+    def async_add(self, devices: Iterable[Dict[str, Any]]) -> None:
+        """Remember the configs of models not seen before."""
+        added = False
+        for device in devices:
+            model_id = device.get("model_id")
+            if model_id and device.get("model_config") and model_id not in self.models:
+                self.models[model_id] = device["model_config"]
+                added = True
+        if added:
+            self._store.async_delay_save(lambda: self.models, STORAGE_SAVE_DELAY)
+
+
+class BluestarAccount:
+    """Login session, IoT credentials and MQTT connection of one account.
+
+    Every config entry for the same username holds a reference to the same
+    account, so the account logs in, connects and polls only once no
+    matter how many ACs it has.
+    """
+
+    def __init__(self, hass: HomeAssistant, username: str, password: str):
+        """Initialize the account."""
+        self.username = username
+        self.key = account_key(username)
+        self._hass = hass
+        # The API owns one keep-alive pool per account, shared by polling
+        # and commands; it is created on the first request
+        self.api = BluestarClient(username, password)
+        self.metrics = self.api.metrics
+        self.trace = self.api.trace
+        self.scheduler = CommandScheduler(metrics=self.metrics)
+        self.transports = TransportSelector()
+        self.coordinator = BluestarDataUpdateCoordinator(hass, self.api)
+        self.connection: Optional[BluestarIoTConnection] = None
+        self.entry_ids: Set[str] = set()
+        self._session = async_get_clientsession(hass)
+        self._clients: Dict[str, BluestarACClient] = {}
+        self._devices: Dict[str, DeviceStateTracker] = {}
+        self._connect_lock = asyncio.Lock()
+        self._setup_lock = asyncio.Lock()
+        self._store = _session_store(hass, username)
+        self._store_loaded = False
+        self._cached_devices: List[Dict[str, Any]] = []
+        self._stale = False
+        self._push_devices: Set[str] = set()
+        self._models: _ModelCache = hass.data.setdefault(DOMAIN, {}).setdefault(
+            DATA_MODELS, _ModelCache(hass)
+        )
+        self.api.on_session_update = self._async_save_session
+        self._unsub_cache = self.coordinator.async_add_listener(self._async_cache_devices)
+        self.supervisor = ReconnectSupervisor(
+            self._async_connect_once, lambda: self.connected
+        )
+        self.supervisor.on_reconnect = self._async_reconnected
+        self.refresher = SessionRefresher(self.api)
+        self.refresher.on_refresh = self._async_session_refreshed
+
+    def _store_data(self) -> Dict[str, Any]:
+        """Return the session and device list to persist."""
+        return {**self.api.export_session(), "devices": self._cached_devices}
+
+    @callback
+    def _async_save_session(self) -> None:
+        """Persist the session after a login."""
+        self._store.async_delay_save(self._store_data, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _async_cache_devices(self) -> None:
+        """Persist the device list whenever a device is added or removed."""
+        if not self.coordinator.data or self._stale:
+            return
+        if {device["thing_id"] for device in self._cached_devices} == set(self.coordinator.data):
+            return
+        self._models.async_add(self.coordinator.data.values())
+        for device_id, client in self._clients.items():
+            client.capabilities = self.capabilities(device_id)
+        self._cached_devices = [
+            {key: value for key, value in device.items() if key not in ("state", "connected")}
+            for device in self.coordinator.data.values()
+        ]
+        self._async_save_session()
+
+    async def _async_prepare_http(self) -> None:
+        """Give the API Home Assistant's SSL context before its first request.
+
+        Creating the context reads the CA bundle, so it runs in the executor.
+        """
+        if self.api.ssl_context is None:
+            self.api.ssl_context = await self._hass.async_add_executor_job(
+                get_default_context
+            )
+
+    async def _async_load_session(self) -> None:
+        """Restore a still-valid session and the last known devices.
+
+        Cached devices let setup add entities without waiting for the
+        cloud; they stay unavailable until the first refresh.
+        """
+        if self._store_loaded:
+            return
+        self._store_loaded = True
+        data = await self._store.async_load()
+        if not data:
+            return
+        if self.api.restore_session(data):
+            _LOGGER.debug("Reusing cached session for %s", self.username)
+        self._cached_devices = data.get("devices", [])
+        if self._cached_devices and self.coordinator.data is None:
+            self._stale = True
+            self.coordinator.async_set_updated_data({
+                device["thing_id"]: {**device, "state": {}, "connected": False}
+                for device in self._cached_devices
+            })
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the shared MQTT connection is up."""
+        return self.connection is not None and self.connection.connected
+
+    @property
+    def available(self) -> bool:
+        """Return False while the reconnect circuit breaker is open."""
+        return self.supervisor.available
+
+    async def async_connect(self) -> bool:
+        """Return True once connected; reconnects are single-flight with backoff."""
+        return await self.supervisor.async_ensure_connected()
+
+    @callback
+    def _async_connection_lost(self) -> None:
+        """Fall back to polling and reconnect in the background."""
+        _LOGGER.warning("Lost MQTT connection for %s", self.username)
+        self.trace.record(INCOMING, "connection", "lost")
+        self.async_update_polling()
+        self.supervisor.async_schedule_reconnect()
+
+    @callback
+    def _async_reconnected(self) -> None:
+        """Resume push updates and catch up on missed state."""
+        self._hass.async_create_task(self._async_subscribe_pending())
+        self._hass.async_create_task(self.coordinator.async_request_refresh())
+
+    @callback
+    def _async_session_refreshed(self) -> None:
+        """Hand renewed IoT credentials to the MQTT connection.
+
+        SigV4 only signs the WebSocket handshake, so the live connection
+        is left alone; the next reconnect signs with the new credentials.
+        """
+        if self.connection is None or not self.api.iot_credentials:
+            return
+        try:
+            self.connection.credentials = decode_credentials(self.api.iot_credentials)
+        except ValueError as e:
+            _LOGGER.warning("Renewed IoT credentials are malformed: %s", e)
+
+    async def _async_subscribe_pending(self) -> None:
+        """Subscribe push devices whose subscription has not gone through yet.
+
+        Subscriptions made earlier are restored by the connection itself.
+        """
+        clients = [
+            client for device_id, client in self._clients.items()
+            if device_id in self._push_devices and not client.subscribed
+        ]
+        if clients and self.connected:
+            results = await asyncio.gather(*(
+                client.async_subscribe_shadow() for client in clients
+            ))
+            if not all(results):
+                _LOGGER.warning("Shadow subscription failed, falling back to polling")
+        self.async_update_polling()
+
+    async def _async_connect_once(self) -> bool:
+        """Log in if needed and open the shared MQTT connection."""
+        async with self._connect_lock:
+            if self.connected:
+                return True
+
+            await self._async_prepare_http()
+            await self._async_load_session()
+            while True:
+                if not await self.api.ensure_authenticated():
+                    _LOGGER.error("Failed to login to Bluestar")
+                    return False
+                if not self.api.iot_credentials or not self.api.user_id:
+                    _LOGGER.error("Login response did not include IoT credentials")
+                    return False
+
+                try:
+                    credentials = decode_credentials(self.api.iot_credentials)
+                    if self.connection is None:
+                        self.connection = BluestarIoTConnection(
+                            self._session, credentials, f"u-{self.api.user_id}"
+                        )
+                        self.connection.on_connection_lost = self._async_connection_lost
+                    else:
+                        self.connection.credentials = credentials
+                    start = time.monotonic()
+                    self.trace.record(OUTGOING, "connection", "connect")
+                    try:
+                        await self.connection.connect()
+                    except IoTConnectionError as e:
+                        self.metrics.record("connect", time.monotonic() - start, False)
+                        self.trace.record(INCOMING, "connection", "connect", error=str(e))
+                        raise
+                    self.metrics.record("connect", time.monotonic() - start, True)
+                    self.trace.record(INCOMING, "connection", "connect")
+                except (IoTConnectionError, ValueError) as e:
+                    if self.api.session_restored:
+                        # Cached credentials may have been revoked; log in again
+                        _LOGGER.debug("Cached IoT credentials rejected: %s", e)
+                        self.api.invalidate_session()
+                        continue
+                    _LOGGER.error("Failed to connect to AWS IoT: %s", e)
+                    return False
+
+                _LOGGER.info("Connected to Bluestar account %s", self.username)
+                return True
+
+    async def async_setup(self) -> None:
+        """Make the device list available, once per account.
+
+        The cached list is used when there is one; only the very first
+        setup has to wait for the cloud.
+        """
+        async with self._setup_lock:
+            await self._async_prepare_http()
+            await self._models.async_load()
+            await self._async_load_session()
+            if self.coordinator.data is None:
+                await self.coordinator.async_refresh()
+            if not self.coordinator.last_update_success:
+                raise ConfigEntryNotReady("Failed to fetch Bluestar device states")
+
+    async def async_start(self, clients: Iterable[BluestarACClient], push: bool) -> None:
+        """Refresh cached state, connect and subscribe after setup.
+
+        Runs as a background task so Home Assistant does not wait on the
+        cloud during startup. A failed connect keeps polling and retries
+        in the background.
+        """
+        async with self._setup_lock:
+            if self._stale:
+                await self.coordinator.async_refresh()
+                self._stale = False
+                self._async_cache_devices()
+        if push:
+            self._push_devices.update(client.device_id for client in clients)
+        self.refresher.start()
+        if await self.async_connect():
+            await self._async_subscribe_pending()
+        else:
+            self.async_update_polling()
+            self.supervisor.async_schedule_reconnect()
+
+    async def async_add_clients(self, clients: Iterable[BluestarACClient], push: bool) -> None:
+        """Subscribe clients created after startup, or poll for them."""
+        if push:
+            self._push_devices.update(client.device_id for client in clients)
+        await self._async_subscribe_pending()
+
+    def capabilities(self, device_id: str) -> Capabilities:
+        """Return the capabilities of a device's model."""
+        device = (self.coordinator.data or {}).get(device_id, {})
+        return get_capabilities(device.get("model_id"), device.get("model_config"))
+
+    def get_client(
+        self, device_id: str, coalesce_window: float, optimistic: bool
+    ) -> BluestarACClient:
+        """Return the control client for a device, creating it if needed."""
+        client = self._clients.get(device_id)
+        if client is None:
+            client = self._clients[device_id] = BluestarACClient(
+                self,
+                device_id,
+                coalesce_window,
+                self.coordinator.async_set_device_state,
+                optimistic,
+                self.capabilities(device_id),
+                self.coordinator.device_state,
+            )
+        return client
+
+    def get_device(self, device_id: str) -> DeviceStateTracker:
+        """Return the shared state tracker of a device with a client."""
+        device = self._devices.get(device_id)
+        if device is None:
+            device = self._devices[device_id] = DeviceStateTracker(
+                self.coordinator, self._clients[device_id], device_id
+            )
+        return device
+
+    async def async_remove_client(self, device_id: str) -> None:
+        """Close and forget the control client of a device."""
+        client = self._clients.pop(device_id, None)
+        self._devices.pop(device_id, None)
+        self._push_devices.discard(device_id)
+        if client:
+            await client.async_close()
+        self.async_update_polling()
+
+    @callback
+    def async_update_polling(self) -> None:
+        """Poll only while some device on the account is not receiving push."""
+        push = self.connected and bool(self._clients) and all(
+            client.subscribed for client in self._clients.values()
+        )
+        if push:
+            self.coordinator.update_interval = None
+        elif self.coordinator.update_interval is None:
+            # Nothing is scheduled while push-only, so kick off polling again
+            self.coordinator.update_interval = timedelta(seconds=DEFAULT_SCAN_INTERVAL)
+            self._hass.async_create_task(self.coordinator.async_request_refresh())
+
+    async def async_close(self) -> None:
+        """Close every client, the MQTT connection and the HTTP client."""
+        for device_id in list(self._clients):
+            await self.async_remove_client(device_id)
+        self.supervisor.stop()
+        self.scheduler.stop()
+        self.refresher.stop()
+        self._unsub_cache()
+        if self.connection:
+            await self.connection.disconnect()
+        await self.api.close()
+
+
+@callback
+def async_get_account(
+    hass: HomeAssistant, username: str, password: str
+) -> BluestarAccount:
+    """Return the shared account for a username, creating it if needed."""
+    accounts = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_ACCOUNTS, {})
+    key = account_key(username)
+    account = accounts.get(key)
+    if account is None:
+        account = accounts[key] = BluestarAccount(hass, username, password)
+    return account
+
+
+async def async_remove_session_cache(hass: HomeAssistant, username: str) -> None:
+    """Delete the persisted session of an account."""
+    await _session_store(hass, username).async_remove()
+
+
+async def async_release_account(
+    hass: HomeAssistant, account: BluestarAccount, entry_id: str
+) -> None:
+    """Drop an entry's reference and close the account after the last one."""
+    account.entry_ids.discard(entry_id)
+    if account.entry_ids:
+        return
+    hass.data[DOMAIN][DATA_ACCOUNTS].pop(account.key, None)
+    await account.async_close()
@@ -1,9 +1,11 @@
 """API client for Bluestar Smart AC."""
 
 import asyncio
+import importlib.util
 import logging
+import ssl
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import httpx
 
@@ -13,63 +15,159 @@ from .const import (
     DEVICES_URL,
     DEVICE_STATE_URL,
     DEVICE_INFO_URL,
+    DEVICE_PREFERENCES_URL,
     DEFAULT_HEADERS,
-    POWER_ON,
-    POWER_OFF,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    SESSION_LIFETIME,
 )
+from .metrics import Metrics
+from .trace import INCOMING, OUTGOING, TraceRecorder
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def http_client_options() -> Dict[str, Any]:
+    """Return the ``httpx.AsyncClient`` options for the Bluestar API.
+
+    Connections are kept alive between polls so repeated requests reuse
+    the TLS session. HTTP/2 is used when the optional ``h2`` package is
+    installed.
+    """
+    return {
+        "http2": importlib.util.find_spec("h2") is not None,
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    }
+
+
 class BluestarClient:
     """Client for Bluestar Smart AC API."""
 
-    def __init__(self, email: str, password: str, region: str = "IN"):
-        """Initialize the client."""
+    def __init__(
+        self,
+        email: str,
+        password: str,
+        region: str = "IN",
+        base_url: str = BASE_URL,
+        metrics: Optional[Metrics] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        trace: Optional[TraceRecorder] = None,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        """Initialize the client.
+
+        ``base_url`` can point the client at another deployment, such as
+        the local stand-in cloud in ``tools/fake_cloud.py``. Call timings
+        are recorded in ``metrics``. ``http_client`` is a pooled client
+        owned by the caller; without one a private client is created and
+        closed by ``close``. Requests and responses are recorded in
+        ``trace``. ``ssl_context`` verifies the private client's
+        connections; it can also be set later, before the first request,
+        since building one loads certificates from disk.
+        """
         self.email = email
         self.password = password
         self.region = region
+        self.base_url = base_url.rstrip("/")
         self._session_token: Optional[str] = None
         self._token_expiry: float = 0
-        self._client: Optional[httpx.AsyncClient] = None
+        self._iot_credentials: Optional[str] = None
+        self.user_id: Optional[str] = None
+        self.session_restored = False
+        self.on_session_update: Optional[Callable[[], None]] = None
+        self._client = http_client
+        self.ssl_context = ssl_context
+        self._owns_client = http_client is None
+        self._headers = dict(DEFAULT_HEADERS)
+        self._auth_headers = self._headers
         self._lock = asyncio.Lock()
+        self.metrics = metrics or Metrics()
+        self.trace = trace or TraceRecorder()
+
+    def _url(self, url: str, **kwargs: Any) -> str:
+        """Rebase one of the ``*_URL`` constants onto ``base_url``."""
+        return self.base_url + url[len(BASE_URL):].format(**kwargs)
+
+    def export_session(self) -> Dict[str, Any]:
+        """Return the session token and IoT credentials for persisting."""
+        return {
+            "session_token": self._session_token,
+            "token_expiry": self._token_expiry,
+            "mi": self._iot_credentials,
+            "user_id": self.user_id,
+        }
+
+    def restore_session(self, data: Dict[str, Any]) -> bool:
+        """Reuse a persisted session if it has not expired yet."""
+        if not data.get("session_token") or time.time() >= data.get("token_expiry", 0):
+            return False
+        self._set_session_token(data["session_token"])
+        self._token_expiry = data["token_expiry"]
+        self._iot_credentials = data.get("mi")
+        self.user_id = data.get("user_id")
+        self.session_restored = True
+        return True
+
+    @property
+    def session_expires_in(self) -> float:
+        """Return the seconds left before the session expires."""
+        return max(0.0, self._token_expiry - time.time())
+
+    def invalidate_session(self) -> None:
+        """Forget the session so the next call logs in again."""
+        self._set_session_token(None)
+        self._token_expiry = 0
+        self.session_restored = False
+
+    def _set_session_token(self, token: Optional[str]) -> None:
+        """Store the session token and rebuild the authenticated headers."""
+        self._session_token = token
+        self._auth_headers = (
+            {**self._headers, "X-APP-SESSION": token} if token else self._headers
+        )
 
     async def _ensure_client(self) -> None:
         """Ensure HTTP client is initialized."""
         if self._client is None:
             self._client = httpx.AsyncClient(
-                timeout=30.0,
-                headers=DEFAULT_HEADERS.copy()
+                verify=self.ssl_context or True, **http_client_options()
             )
 
     async def _get_auth_headers(self) -> Dict[str, str]:
-        """Get headers with authentication."""
-        headers = DEFAULT_HEADERS.copy()
-        if self._session_token:
-            headers["X-APP-SESSION"] = self._session_token
-        return headers
+        """Get headers with authentication.
+
+        The dict is shared between requests and must not be modified.
+        """
+        return self._auth_headers
 
     async def _make_request(
-        self, method: str, url: str, **kwargs
+        self, method: str, url: str, retry_auth: bool = True, **kwargs
     ) -> Optional[httpx.Response]:
         """Make HTTP request with error handling."""
         await self._ensure_client()
+        kwargs.setdefault("headers", self._headers)
         
         try:
-            response = await self._client.request(method, url, **kwargs)
+            response = await self._send(method, url, **kwargs)
             _LOGGER.debug(
                 "%s %s: %s", method, url, response.status_code
             )
             
-            if response.status_code == 401:
+            if response.status_code == 401 and retry_auth:
                 _LOGGER.warning("Authentication failed, attempting re-login")
+                self.invalidate_session()
                 await self._login()
                 # Retry with new token
                 if self._session_token:
-                    headers = kwargs.get("headers", {})
-                    headers["X-APP-SESSION"] = self._session_token
-                    kwargs["headers"] = headers
-                    response = await self._client.request(method, url, **kwargs)
+                    kwargs["headers"] = self._auth_headers
+                    response = await self._send(method, url, **kwargs)
             
             return response
             
@@ -83,66 +181,141 @@ class BluestarClient:
             _LOGGER.error("Unexpected error for %s %s: %s", method, url, e)
             return None
 
-    async def _login(self) -> bool:
-        """Login to the Bluestar API."""
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, recording it and its response in the trace.
+
+        Login bodies carry the password and are left out.
+        """
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        body = None if path == LOGIN_URL[len(BASE_URL):] else kwargs.get("json")
+        self.trace.record(OUTGOING, "rest", path, body, method=method)
+        start = time.monotonic()
+        try:
+            response = await self._client.request(method, url, **kwargs)
+        except Exception as e:
+            self.trace.record(
+                INCOMING, "rest", path, method=method, error=type(e).__name__,
+                ms=round((time.monotonic() - start) * 1000, 1),
+            )
+            raise
+        self.trace.record(
+            INCOMING, "rest", path, method=method, status=response.status_code,
+            ms=round((time.monotonic() - start) * 1000, 1),
+        )
+        return response
+
+    def _session_valid(self) -> bool:
+        """Return True if there is a session that has not expired."""
+        return bool(self._session_token) and time.time() < self._token_expiry
+
+    async def _login(self, force: bool = False) -> bool:
+        """Login to the Bluestar API.
+
+        With ``force`` a new session is requested even if the current one
+        is still valid; requests keep using the old one until it arrives,
+        so they are checked outside the lock.
+        """
+        if not force and self._session_valid():
+            return True
         async with self._lock:
-            if self._session_token and time.time() < self._token_expiry:
+            if not force and self._session_valid():
                 return True
 
             _LOGGER.info("Logging in to Bluestar API")
-            
-            payload = {
-                "auth_id": self.email,
-                "auth_type": 1,  # 1 for email, 0 for phone
-                "password": self.password
-            }
-            
-            response = await self._make_request("POST", LOGIN_URL, json=payload)
-            if not response:
-                return False
-            
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    if "data" in data and "session_token" in data["data"]:
-                        self._session_token = data["data"]["session_token"]
-                        # Set token expiry to 1 hour from now
-                        self._token_expiry = time.time() + 3600
-                        _LOGGER.info("Login successful")
-                        return True
-                    else:
-                        _LOGGER.error("No session token in login response")
-                        return False
-                except Exception as e:
-                    _LOGGER.error("Failed to parse login response: %s", e)
+            start = time.monotonic()
+            success = await self._request_login()
+            self.metrics.record("login", time.monotonic() - start, success)
+            return success
+
+    async def _request_login(self) -> bool:
+        """Send the login request and store the session it returns."""
+        payload = {
+            "auth_id": self.email,
+            "auth_type": 1,  # 1 for email, 0 for phone
+            "password": self.password
+        }
+        
+        response = await self._make_request(
+            "POST", self._url(LOGIN_URL), retry_auth=False, json=payload
+        )
+        if not response:
+            return False
+        
+        if response.status_code == 200:
+            try:
+                data = response.json()
+                session_token = data.get("session") or data.get(
+                    "data", {}
+                ).get("session_token")
+                if session_token:
+                    self._set_session_token(session_token)
+                    self._iot_credentials = data.get("mi")
+                    self.user_id = data.get("user", {}).get("id")
+                    self._token_expiry = time.time() + SESSION_LIFETIME
+                    self.session_restored = False
+                    _LOGGER.info("Login successful")
+                    if self.on_session_update:
+                        self.on_session_update()
+                    return True
+                else:
+                    _LOGGER.error("No session token in login response")
                     return False
-            else:
-                _LOGGER.error(
-                    "Login failed with status %d: %s",
-                    response.status_code,
-                    response.text
-                )
+            except Exception as e:
+                _LOGGER.error("Failed to parse login response: %s", e)
                 return False
+        else:
+            _LOGGER.error(
+                "Login failed with status %d: %s",
+                response.status_code,
+                response.text
+            )
+            return False
 
     async def ensure_authenticated(self) -> bool:
         """Ensure we have a valid session token."""
         return await self._login()
 
+    async def refresh_session(self) -> bool:
+        """Renew the session and IoT credentials ahead of expiry."""
+        return await self._login(force=True)
+
+    @property
+    def iot_credentials(self) -> Optional[str]:
+        """Return the base64 ``mi`` AWS IoT credentials from the last login."""
+        return self._iot_credentials
+
     async def get_devices(self) -> List[Dict[str, Any]]:
-        """Get list of user's devices."""
+        """Get list of user's devices.
+
+        Each device dict from ``things`` is merged with its entry in the
+        ``states`` map, so callers get ``state`` and ``connected`` keys
+        alongside ``thing_id``, ``model_config`` and friends.
+        """
         if not await self.ensure_authenticated():
             return []
         
+        start = time.monotonic()
+        devices = await self._fetch_devices()
+        self.metrics.record("get_devices", time.monotonic() - start, bool(devices))
+        return devices
+
+    async def _fetch_devices(self) -> List[Dict[str, Any]]:
+        """Request ``/things`` and merge the states into the devices."""
         headers = await self._get_auth_headers()
-        response = await self._make_request("GET", DEVICES_URL, headers=headers)
+        response = await self._make_request("GET", self._url(DEVICES_URL), headers=headers)
         
         if not response or response.status_code != 200:
             return []
         
         try:
             data = response.json()
-            devices = data.get("data", [])
-            _LOGGER.info("Found %d devices", len(devices))
+            devices = data.get("things", data.get("data", []))
+            states = data.get("states", {})
+            for device in devices:
+                device_state = states.get(device.get("thing_id"), {})
+                device["state"] = device_state.get("state", {})
+                device["connected"] = device_state.get("connected", False)
+            _LOGGER.debug("Found %d devices", len(devices))
             return devices
         except Exception as e:
             _LOGGER.error("Failed to parse devices response: %s", e)
@@ -153,7 +326,16 @@ class BluestarClient:
         if not await self.ensure_authenticated():
             return None
         
-        url = DEVICE_STATE_URL.format(device_id=device_id)
+        start = time.monotonic()
+        status = await self._fetch_device_status(device_id)
+        self.metrics.record(
+            "get_device_status", time.monotonic() - start, status is not None
+        )
+        return status
+
+    async def _fetch_device_status(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """Request the state of one device."""
+        url = self._url(DEVICE_STATE_URL, device_id=device_id)
         headers = await self._get_auth_headers()
         response = await self._make_request("GET", url, headers=headers)
         
@@ -174,7 +356,7 @@ class BluestarClient:
         if not await self.ensure_authenticated():
             return False
         
-        url = DEVICE_STATE_URL.format(device_id=device_id)
+        url = self._url(DEVICE_STATE_URL, device_id=device_id)
         headers = await self._get_auth_headers()
         
         # Build payload from kwargs
@@ -213,12 +395,44 @@ class BluestarClient:
         
         return success
 
+    async def set_preferences(self, device_id: str, preferences: Dict[str, Any]) -> bool:
+        """Write control values through ``/things/{id}/preferences``.
+
+        ``preferences`` uses the same keys as a desired shadow update.
+        """
+        if not await self.ensure_authenticated():
+            return False
+
+        start = time.monotonic()
+        success = await self._post_preferences(device_id, preferences)
+        self.metrics.record("set_preferences", time.monotonic() - start, success)
+        return success
+
+    async def _post_preferences(self, device_id: str, preferences: Dict[str, Any]) -> bool:
+        """Send the preferences request of one device."""
+        url = self._url(DEVICE_PREFERENCES_URL, device_id=device_id)
+        headers = await self._get_auth_headers()
+        response = await self._make_request(
+            "POST", url, json={"preferences": preferences}, headers=headers
+        )
+        if not response:
+            return False
+        if response.status_code != 200:
+            _LOGGER.error(
+                "Failed to set preferences of %s: %d - %s",
+                device_id,
+                response.status_code,
+                response.text,
+            )
+            return False
+        return True
+
     async def get_device_info(self, device_id: str) -> Optional[Dict[str, Any]]:
         """Get detailed device information."""
         if not await self.ensure_authenticated():
             return None
         
-        url = DEVICE_INFO_URL.format(device_id=device_id)
+        url = self._url(DEVICE_INFO_URL, device_id=device_id)
         params = {"is_tuya_device": "true"}
         headers = await self._get_auth_headers()
         
@@ -237,8 +451,8 @@ class BluestarClient:
             return None
 
     async def close(self) -> None:
-        """Close the HTTP client."""
-        if self._client:
+        """Close the HTTP client if this instance created it."""
+        if self._client and self._owns_client:
             await self._client.aclose()
             self._client = None
 
@@ -0,0 +1,448 @@
+"""Asyncio AWS IoT transport for Bluestar AC.
+
+Speaks MQTT 3.1.1 over a SigV4-signed WebSocket using the event loop and
+aiohttp, so no executor threads or native SDKs are involved.
+"""
+import asyncio
+import base64
+import datetime
+import hashlib
+import hmac
+import logging
+import struct
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_REGION = "ap-south-1"
+SIGV4_SERVICE = "iotdata"
+CONNECT_TIMEOUT = 10  # seconds
+ACK_TIMEOUT = 10  # seconds
+KEEPALIVE = 60  # seconds
+# The connection counts as lost when no PINGRESP arrived for this many keepalives
+PING_TIMEOUT_FACTOR = 1.5
+# AWS IoT limits on topic filters per SUBSCRIBE and subscriptions per connection
+MAX_TOPICS_PER_SUBSCRIBE = 8
+MAX_SUBSCRIPTIONS = 50
+
+# MQTT control packet types (upper nibble of the first byte)
+CONNECT = 0x10
+CONNACK = 0x20
+PUBLISH = 0x30
+PUBACK = 0x40
+SUBSCRIBE = 0x80
+SUBACK = 0x90
+UNSUBSCRIBE = 0xA0
+UNSUBACK = 0xB0
+PINGREQ = 0xC0
+PINGRESP = 0xD0
+DISCONNECT = 0xE0
+
+MessageCallback = Callable[[str, bytes], None]
+
+
+class IoTConnectionError(Exception):
+    """Error to indicate the MQTT connection failed or was lost."""
+
+
+@dataclass(frozen=True)
+class IoTCredentials:
+    """Endpoint and SigV4 credentials decoded from the login ``mi`` field."""
+
+    endpoint: str
+    access_key: str
+    secret_key: str
+    session_token: Optional[str] = None
+
+    @property
+    def region(self) -> str:
+        """Return the AWS region embedded in the endpoint host name."""
+        parts = self.endpoint.split(".")
+        if len(parts) > 3 and parts[1] == "iot":
+            return parts[2]
+        return DEFAULT_REGION
+
+
+def decode_credentials(mi: str) -> IoTCredentials:
+    """Decode the base64 ``endpoint::access_key::secret[::token]`` blob."""
+    fields = base64.b64decode(mi).decode().split("::")
+    if len(fields) < 3:
+        raise ValueError("Malformed IoT credentials")
+    return IoTCredentials(*fields[:4])
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    """Return an HMAC-SHA256 digest."""
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+def presign_url(
+    credentials: IoTCredentials, now: Optional[datetime.datetime] = None
+) -> str:
+    """Return a SigV4 query-signed ``wss://`` URL for the MQTT endpoint.
+
+    An endpoint that already carries a scheme (``ws://127.0.0.1:8080``) is
+    used as-is, which lets tests point at a local broker.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    datestamp = now.strftime("%Y%m%d")
+    if "://" in credentials.endpoint:
+        base = credentials.endpoint.rstrip("/")
+        host = urlsplit(base).netloc
+    else:
+        host = credentials.endpoint
+        base = f"wss://{host}"
+    scope = f"{datestamp}/{credentials.region}/{SIGV4_SERVICE}/aws4_request"
+
+    query = "&".join([
+        "X-Amz-Algorithm=AWS4-HMAC-SHA256",
+        "X-Amz-Credential=" + quote(f"{credentials.access_key}/{scope}", safe=""),
+        f"X-Amz-Date={amz_date}",
+        "X-Amz-SignedHeaders=host",
+    ])
+    canonical_request = "\n".join([
+        "GET",
+        "/mqtt",
+        query,
+        f"host:{host}\n",
+        "host",
+        hashlib.sha256(b"").hexdigest(),
+    ])
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256",
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+
+    key = _hmac(f"AWS4{credentials.secret_key}".encode(), datestamp)
+    key = _hmac(key, credentials.region)
+    key = _hmac(key, SIGV4_SERVICE)
+    key = _hmac(key, "aws4_request")
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    url = f"{base}/mqtt?{query}&X-Amz-Signature={signature}"
+    if credentials.session_token:
+        # AWS IoT expects the token outside the signed query
+        url += "&X-Amz-Security-Token=" + quote(credentials.session_token, safe="")
+    return url
+
+
+def _encode_length(length: int) -> bytes:
+    """Encode an MQTT remaining-length varint."""
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def _encode_string(value: str) -> bytes:
+    """Encode a length-prefixed UTF-8 string."""
+    data = value.encode()
+    return struct.pack("!H", len(data)) + data
+
+
+def _packet(first_byte: int, body: bytes = b"") -> bytes:
+    """Frame a packet body with its fixed header."""
+    return bytes([first_byte]) + _encode_length(len(body)) + body
+
+
+def encode_connect(client_id: str, keepalive: int = KEEPALIVE) -> bytes:
+    """Build a clean-session CONNECT packet."""
+    body = _encode_string("MQTT") + bytes([4, 0x02]) + struct.pack("!H", keepalive)
+    return _packet(CONNECT, body + _encode_string(client_id))
+
+
+def encode_publish(topic: str, payload: bytes) -> bytes:
+    """Build a QoS 0 PUBLISH packet."""
+    return _packet(PUBLISH, _encode_string(topic) + payload)
+
+
+def encode_subscribe(packet_id: int, topics: Iterable[str]) -> bytes:
+    """Build a SUBSCRIBE packet requesting QoS 0 for every topic."""
+    body = struct.pack("!H", packet_id)
+    for topic in topics:
+        body += _encode_string(topic) + b"\x00"
+    return _packet(SUBSCRIBE | 0x02, body)
+
+
+def encode_unsubscribe(packet_id: int, topics: Iterable[str]) -> bytes:
+    """Build an UNSUBSCRIBE packet."""
+    body = struct.pack("!H", packet_id)
+    for topic in topics:
+        body += _encode_string(topic)
+    return _packet(UNSUBSCRIBE | 0x02, body)
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    """Split a list into consecutive lists of at most ``size`` items."""
+    return [items[index:index + size] for index in range(0, len(items), size)]
+
+
+def read_packet(buffer: bytearray) -> Optional[Tuple[int, bytes]]:
+    """Pop one complete packet from the buffer as ``(first_byte, body)``.
+
+    Returns None if the buffer does not hold a complete packet yet.
+    """
+    length = 0
+    multiplier = 1
+    for index in range(1, min(len(buffer), 5)):
+        byte = buffer[index]
+        length += (byte & 0x7F) * multiplier
+        multiplier *= 128
+        if not byte & 0x80:
+            end = index + 1 + length
+            if len(buffer) < end:
+                return None
+            first_byte, body = buffer[0], bytes(buffer[index + 1:end])
+            del buffer[:end]
+            return first_byte, body
+    return None
+
+
+def decode_publish(first_byte: int, body: bytes) -> Tuple[str, bytes, int, Optional[int]]:
+    """Split a PUBLISH body into ``(topic, payload, qos, packet_id)``."""
+    (topic_length,) = struct.unpack_from("!H", body)
+    topic = body[2:2 + topic_length].decode()
+    offset = 2 + topic_length
+    qos = (first_byte >> 1) & 0x03
+    packet_id = None
+    if qos:
+        (packet_id,) = struct.unpack_from("!H", body, offset)
+        offset += 2
+    return topic, body[offset:], qos, packet_id
+
+
+class BluestarIoTConnection:
+    """MQTT connection to AWS IoT over a SigV4-signed WebSocket.
+
+    Subscriptions are remembered and restored on every ``connect`` so the
+    same object can be reconnected with fresh credentials.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        credentials: IoTCredentials,
+        client_id: str,
+        keepalive: int = KEEPALIVE,
+    ):
+        """Initialize the connection."""
+        self.credentials = credentials
+        self.client_id = client_id
+        self._session = session
+        self._keepalive = keepalive
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._ping_task: Optional[asyncio.Task] = None
+        self._buffer = bytearray()
+        self._packet_id = 0
+        self._connack: Optional[asyncio.Future] = None
+        self._acks: Dict[int, asyncio.Future] = {}
+        self._last_pingresp = 0.0
+        self._subscriptions: Dict[str, MessageCallback] = {}
+        self.on_connection_lost: Optional[Callable[[], None]] = None
+
+    @property
+    def connected(self) -> bool:
+        """Return True while the WebSocket is open and MQTT is connected."""
+        return self._ws is not None and not self._ws.closed and self._ping_task is not None
+
+    async def connect(self) -> None:
+        """Open the WebSocket, send CONNECT and restore subscriptions."""
+        await self.disconnect()
+        loop = asyncio.get_running_loop()
+        try:
+            self._ws = await self._session.ws_connect(
+                presign_url(self.credentials),
+                protocols=("mqtt",),
+                timeout=CONNECT_TIMEOUT,
+                heartbeat=self._keepalive,
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise IoTConnectionError(f"WebSocket handshake failed: {e}") from e
+
+        self._buffer.clear()
+        self._connack = loop.create_future()
+        self._reader_task = loop.create_task(self._read_loop())
+        await self._ws.send_bytes(encode_connect(self.client_id, self._keepalive))
+        try:
+            return_code = await asyncio.wait_for(self._connack, CONNECT_TIMEOUT)
+        except asyncio.TimeoutError as e:
+            await self.disconnect()
+            raise IoTConnectionError("Timed out waiting for CONNACK") from e
+        if return_code != 0:
+            await self.disconnect()
+            raise IoTConnectionError(f"Connection refused with code {return_code}")
+
+        self._last_pingresp = time.monotonic()
+        self._ping_task = loop.create_task(self._ping_loop())
+        if self._subscriptions:
+            await self._send_subscribe(list(self._subscriptions))
+        _LOGGER.debug("MQTT connected as %s", self.client_id)
+
+    async def disconnect(self) -> None:
+        """Close the connection, keeping the subscription list."""
+        for task in (self._ping_task, self._reader_task):
+            if task and task is not asyncio.current_task():
+                task.cancel()
+        self._ping_task = None
+        self._reader_task = None
+        if self._ws is not None:
+            ws, self._ws = self._ws, None
+            if not ws.closed:
+                try:
+                    await ws.send_bytes(_packet(DISCONNECT))
+                except (aiohttp.ClientError, ConnectionError):
+                    pass
+                await ws.close()
+        self._fail_pending(IoTConnectionError("Connection closed"))
+
+    async def publish(self, topic: str, payload: bytes) -> None:
+        """Publish a message with QoS 0."""
+        if not self.connected:
+            raise IoTConnectionError("Not connected")
+        await self._ws.send_bytes(encode_publish(topic, payload))
+
+    async def subscribe(self, topics: List[str], callback: MessageCallback) -> None:
+        """Subscribe to exact topic names and route their messages to callback.
+
+        Raises ``IoTConnectionError`` without subscribing if the topics
+        would take the connection past AWS IoT's subscription limit.
+        """
+        new = [topic for topic in topics if topic not in self._subscriptions]
+        if len(self._subscriptions) + len(new) > MAX_SUBSCRIPTIONS:
+            raise IoTConnectionError(
+                f"Subscription limit of {MAX_SUBSCRIPTIONS} topics reached"
+            )
+        for topic in topics:
+            self._subscriptions[topic] = callback
+        if self.connected:
+            await self._send_subscribe(topics)
+
+    async def unsubscribe(self, topics: List[str]) -> None:
+        """Remove subscriptions."""
+        for topic in topics:
+            self._subscriptions.pop(topic, None)
+        if self.connected:
+            for chunk in _chunks(topics, MAX_TOPICS_PER_SUBSCRIBE):
+                packet_id = self._next_packet_id()
+                await self._request(packet_id, encode_unsubscribe(packet_id, chunk))
+
+    async def _send_subscribe(self, topics: List[str]) -> None:
+        """Send SUBSCRIBE packets and check every granted QoS."""
+        for chunk in _chunks(topics, MAX_TOPICS_PER_SUBSCRIBE):
+            packet_id = self._next_packet_id()
+            granted = await self._request(packet_id, encode_subscribe(packet_id, chunk))
+            if any(code == 0x80 for code in granted):
+                raise IoTConnectionError(f"Subscription rejected for {chunk}")
+
+    async def _request(self, packet_id: int, packet: bytes) -> bytes:
+        """Send a packet and wait for the acknowledgement with its ID."""
+        if self._ws is None or self._ws.closed:
+            raise IoTConnectionError("Not connected")
+        future = asyncio.get_running_loop().create_future()
+        self._acks[packet_id] = future
+        try:
+            await self._ws.send_bytes(packet)
+            return await asyncio.wait_for(future, ACK_TIMEOUT)
+        except asyncio.TimeoutError as e:
+            raise IoTConnectionError(f"No acknowledgement for packet {packet_id}") from e
+        finally:
+            self._acks.pop(packet_id, None)
+
+    def _next_packet_id(self) -> int:
+        """Return the next non-zero 16-bit packet identifier."""
+        self._packet_id = self._packet_id % 0xFFFF + 1
+        return self._packet_id
+
+    async def _read_loop(self) -> None:
+        """Read WebSocket frames and dispatch the MQTT packets they carry."""
+        try:
+            async for message in self._ws:
+                if message.type != aiohttp.WSMsgType.BINARY:
+                    continue
+                self._buffer.extend(message.data)
+                while (packet := read_packet(self._buffer)) is not None:
+                    await self._handle_packet(*packet)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _LOGGER.warning("MQTT connection lost: %s", e)
+        self._reader_task = None
+        self._connection_lost()
+
+    def _connection_lost(self) -> None:
+        """Stop pinging, fail pending requests and report the loss."""
+        if self._ping_task and self._ping_task is not asyncio.current_task():
+            self._ping_task.cancel()
+        self._ping_task = None
+        self._fail_pending(IoTConnectionError("Connection lost"))
+        if self.on_connection_lost:
+            self.on_connection_lost()
+
+    async def _handle_packet(self, first_byte: int, body: bytes) -> None:
+        """Handle one incoming packet."""
+        packet_type = first_byte & 0xF0
+        if packet_type == PUBLISH:
+            topic, payload, qos, packet_id = decode_publish(first_byte, body)
+            if qos and packet_id is not None:
+                await self._ws.send_bytes(_packet(PUBACK, struct.pack("!H", packet_id)))
+            callback = self._subscriptions.get(topic)
+            if callback:
+                try:
+                    callback(topic, payload)
+                except Exception:
+                    _LOGGER.exception("Error handling message on %s", topic)
+        elif packet_type == CONNACK:
+            if self._connack and not self._connack.done():
+                self._connack.set_result(body[1])
+        elif packet_type in (SUBACK, UNSUBACK):
+            (packet_id,) = struct.unpack_from("!H", body)
+            future = self._acks.get(packet_id)
+            if future and not future.done():
+                future.set_result(body[2:])
+        elif packet_type == PINGRESP:
+            self._last_pingresp = time.monotonic()
+
+    async def _ping_loop(self) -> None:
+        """Keep the connection alive and notice when it silently died.
+
+        A half-open socket may never report an error, so the connection
+        counts as lost once no PINGRESP has arrived for
+        ``PING_TIMEOUT_FACTOR`` keepalive periods.
+        """
+        while True:
+            await asyncio.sleep(self._keepalive / 2)
+            silent = time.monotonic() - self._last_pingresp
+            if silent > self._keepalive * PING_TIMEOUT_FACTOR:
+                _LOGGER.warning("No PINGRESP for %.0fs, MQTT connection lost", silent)
+                if self._reader_task:
+                    self._reader_task.cancel()
+                    self._reader_task = None
+                ws, self._ws = self._ws, None
+                self._connection_lost()
+                if ws is not None:
+                    await ws.close()
+                return
+            try:
+                await self._ws.send_bytes(_packet(PINGREQ))
+            except (aiohttp.ClientError, ConnectionError, AttributeError):
+                return
+
+    def _fail_pending(self, error: Exception) -> None:
+        """Fail every outstanding acknowledgement."""
+        if self._connack and not self._connack.done():
+            self._connack.set_exception(error)
+        for future in self._acks.values():
+            if not future.done():
+                future.set_exception(error)
+        self._acks.clear()
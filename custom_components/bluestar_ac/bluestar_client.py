@@ -1,184 +1,786 @@
 """Bluestar AC client for Home Assistant."""
 import asyncio
+import json
 import logging
 import time
-from typing import Any, Dict, Optional
-
-from .const import (
-    MIN_TEMP,
-    MAX_TEMP,
-    FAN_MODES,
-    SWING_MODES,
-    PRESET_MODES,
-    HVAC_MODES,
-    DEFAULT_TEMPERATURE,
-    DEFAULT_FAN_MODE,
-    DEFAULT_SWING_MODE,
-    DEFAULT_PRESET_MODE,
-)
+import uuid
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from .aws_iot import IoTConnectionError
+from .capabilities import DEFAULT_CAPABILITIES, Capabilities
+from .const import DEFAULT_COALESCE_WINDOW
+from .scheduler import Priority
+from .trace import INCOMING, OUTGOING
+from .transport import TRANSPORT_MQTT, TRANSPORT_REST
+
+if TYPE_CHECKING:
+    from .account import BluestarAccount
 
 _LOGGER = logging.getLogger(__name__)
 
+# Shadow topics carrying the state reported by the AC, and the verdicts
+# on our own desired-state updates; deltas carry no device state
+SHADOW_TOPIC = "$aws/things/{device_id}/shadow/{suffix}"
+SHADOW_SUBSCRIPTIONS = ("update/accepted", "update/rejected", "get/accepted")
+CONTROL_TOPIC = "things/{device_id}/control"
+
+# Optimistic state is rolled back if the shadow has not accepted it by then
+SHADOW_ACK_TIMEOUT = 10  # seconds
+# How long an accepted command's keys are shown before the device reports them
+REPORT_TIMEOUT = 60  # seconds
+
+# Desired-state encodings; modes and fan speeds depend on the model and
+# come from its Capabilities
+SWING_PAYLOADS = {
+    "off": {"hswing": 0, "vswing": 0},
+    "horizontal": {"hswing": 1, "vswing": 0},
+    "vertical": {"hswing": 0, "vswing": 1},
+    "both": {"hswing": 1, "vswing": 1},
+}
+
+# Special modes are mutually exclusive, so every preset clears the others
+PRESET_PAYLOADS = {
+    "none": {"eco": 0, "turbo": 0, "sleep": 0},
+    "eco": {"eco": 1, "turbo": 0, "sleep": 0},
+    "turbo": {"eco": 0, "turbo": 1, "sleep": 0},
+    "sleep": {"eco": 0, "turbo": 0, "sleep": 1},
+}
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    """Return True if two state values are equal, e.g. ``"24.0"`` and ``24``."""
+    try:
+        return float(a) == float(b)
+    except (TypeError, ValueError):
+        return str(a) == str(b)
+
+
+def shadow_state(topic: str, document: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Extract the device state from a decoded shadow document.
+
+    ``update/accepted`` and ``get/accepted`` carry it under
+    ``state.reported``. ``update/delta`` only lists desired keys the
+    device has not applied yet, so it carries no device state.
+    """
+    state = document.get("state")
+    if not isinstance(state, dict) or topic.endswith("/update/delta"):
+        return None
+    reported = state.get("reported")
+    return reported if isinstance(reported, dict) and reported else None
+
+
+class _PendingCommand:
+    """Desired-state keys sent as one shadow update, until the shadow answers.
+    
+    ``token`` is the ``clientToken`` AWS IoT echoes in the accepted or
+    rejected response; ``ts`` is the fallback correlation key.
+    ``priority`` is the highest lane of any command merged into the batch.
+    ``transport`` pins the command to one transport instead of letting
+    the account's selector choose.
+    """
+    
+    def __init__(
+        self, future: Optional[asyncio.Future] = None, transport: Optional[str] = None
+    ):
+        """Initialize an empty batch."""
+        self.payload: Dict[str, Any] = {}
+        self.future = future
+        self.task: Optional[asyncio.Task] = None
+        self.token = uuid.uuid4().hex
+        self.ts: Optional[int] = None
+        self.sent_at = 0.0
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.priority = Priority.NORMAL
+        self.transport = transport
+
 class BluestarACClient:
     """Client for Bluestar AC control."""
     
-    def __init__(self, username: str, password: str, device_id: str, auth_type: str = "bluestar"):
-        """Initialize the client."""
-        self.username = username
-        self.password = password
+    def __init__(
+        self,
+        account: "BluestarAccount",
+        device_id: str,
+        coalesce_window: float = DEFAULT_COALESCE_WINDOW / 1000,
+        state_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        optimistic: bool = True,
+        capabilities: Capabilities = DEFAULT_CAPABILITIES,
+        reported_state: Optional[Callable[[str], Dict[str, Any]]] = None,
+    ):
+        """Initialize the client.
+        
+        ``account`` owns the login session and the MQTT connection shared
+        with the other devices of the account.
+        ``coalesce_window`` is the time in seconds commands are buffered so
+        that back-to-back ``set_*`` calls go out as a single shadow update.
+        ``state_callback`` receives the state the device reports.
+        With ``optimistic``, a command shows in ``optimistic_state`` as soon
+        as it is queued, until the shadow accepts or rejects it. Accepted
+        keys show there until the device reports them.
+        ``capabilities`` are the model's modes, fan speeds and temperature
+        range used to encode and validate commands.
+        ``reported_state`` returns the last state reported by a device;
+        keys a command would set to the reported or an already desired
+        value are left out, and a command with nothing left is not sent.
+        """
         self.device_id = device_id
-        self.auth_type = auth_type
-        self._aws_client = None
-        self._connected = False
+        self.optimistic = optimistic
+        self.capabilities = capabilities
+        self._account = account
+        self._state_callback = state_callback
+        self._reported_state = reported_state
+        self._subscribed = False
+        self._coalesce_window = coalesce_window
+        self._pending: Optional[_PendingCommand] = None
+        self._commands: Dict[str, _PendingCommand] = {}
+        # Keys the shadow or REST accepted, with when, until the device reports them
+        self._accepted: Dict[str, Tuple[Any, float]] = {}
+        self._report_timer: Optional[asyncio.TimerHandle] = None
+        self._listeners: List[Callable[[], None]] = []
+        # Commands dropped entirely and keys trimmed as already set
+        self.dedup_skipped = 0
+        self.dedup_trimmed = 0
+        # Newest shadow document seen, and older ones dropped since
+        self.shadow_version: Optional[int] = None
+        self.shadow_timestamp: Optional[float] = None
+        self.stale_dropped = 0
+        # Client token of our outstanding shadow get
+        self._get_token: Optional[str] = None
+    
+    @property
+    def connected(self) -> bool:
+        """Return True if the account's MQTT connection is up."""
+        return self._account.connected
+    
+    @property
+    def available(self) -> bool:
+        """Return False while the account's reconnect circuit is open."""
+        return self._account.available
+    
+    @property
+    def subscribed(self) -> bool:
+        """Return True if shadow updates are pushed for this device."""
+        return self._subscribed
+    
+    @property
+    def optimistic_state(self) -> Dict[str, Any]:
+        """Return the keys sent to the device that it has not reported yet.
+
+        These are the accepted keys awaiting a report and, with
+        ``optimistic``, the keys of commands not answered yet.
+        """
+        self._prune_accepted()
+        state = {key: value for key, (value, _) in self._accepted.items()}
+        if self.optimistic:
+            for command in self._commands.values():
+                state.update(command.payload)
+        return state
+    
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call ``listener`` whenever ``optimistic_state`` changes.
+        
+        Returns a function that removes the listener.
+        """
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+    
+    def _notify(self) -> None:
+        """Tell listeners the optimistic state changed."""
+        for listener in list(self._listeners):
+            listener()
+    
+    def _prune_accepted(self) -> None:
+        """Forget accepted keys the device reports, or has not within the timeout.
+        
+        The reported state covers both shadow pushes and polls, so either
+        confirms a key.
+        """
+        if not self._accepted:
+            return
+        reported = self._reported_state(self.device_id) if self._reported_state else {}
+        expired = time.monotonic() - REPORT_TIMEOUT
+        for key, (value, accepted_at) in list(self._accepted.items()):
+            if accepted_at <= expired or (
+                key in reported and _same_value(reported[key], value)
+            ):
+                del self._accepted[key]
+    
+    @property
+    def _shadow_topics(self) -> List[str]:
+        """Return the shadow topics this device subscribes to."""
+        return [
+            SHADOW_TOPIC.format(device_id=self.device_id, suffix=suffix)
+            for suffix in SHADOW_SUBSCRIPTIONS
+        ]
         
-    def test_connection(self) -> bool:
-        """Test the connection to the AC."""
+    async def _ensure_connected(self) -> bool:
+        """Ensure we have a valid connection."""
+        if not self.connected:
+            return await self._account.async_connect()
+        return True
+    
+    def _current_state(self) -> Dict[str, Any]:
+        """Return the reported state overlaid with unanswered commands.
+        
+        Accepted keys the device has not reported yet are left out.
+        """
+        current = dict(self._reported_state(self.device_id)) if self._reported_state else {}
+        for command in self._commands.values():
+            current.update(command.payload)
+        return current
+    
+    def _current_mode(self) -> Optional[int]:
+        """Return the mode code the device is in or has been sent."""
         try:
-            # Import here to avoid circular imports
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            from working_aws_iot_client import BluestarAWSIoTClient
-            
-            client = BluestarAWSIoTClient()
+            return int(self._current_state()["mode"])
+        except (KeyError, TypeError, ValueError):
+            return None
+    
+    def _trim_redundant(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop the keys the device already has or has been sent.
+        
+        The reported state is overlaid with unanswered commands, so a key
+        sent a moment ago is not sent again while its answer is pending.
+        """
+        current = self._current_state()
+        trimmed = {
+            key: value for key, value in payload.items()
+            if key not in current or not _same_value(current[key], value)
+        }
+        if not trimmed:
+            self.dedup_skipped += 1
+        elif len(trimmed) < len(payload):
+            self.dedup_trimmed += 1
+        if len(trimmed) < len(payload):
+            _LOGGER.debug(
+                "Skipping %s for %s, already set",
+                {key: payload[key] for key in payload.keys() - trimmed.keys()},
+                self.device_id,
+            )
+        return trimmed
+    
+    async def _send_command(
+        self,
+        payload: Dict[str, Any],
+        priority: Priority = Priority.NORMAL,
+        force: bool = False,
+        transport: Optional[str] = None,
+    ) -> bool:
+        """Queue a command, merging it with others sent within the window.
+        
+        The first command of a batch schedules a flush after the coalescing
+        window; every caller in the batch awaits the same result. Powering
+        off always takes the high-priority lane of the account's scheduler.
+        Unless ``force`` is set, keys that are already set are dropped and
+        a command left empty succeeds without being sent. A command pinned
+        to a ``transport`` is sent on its own.
+        """
+        if not force:
+            payload = self._trim_redundant(payload)
+            if not payload:
+                return True
+        if payload.get("pow") == 0:
+            priority = Priority.HIGH
+        if self._coalesce_window <= 0 or transport:
+            command = self._track(_PendingCommand(transport=transport), payload, priority)
+            return await self._submit(command)
             
-            # Test login
-            if not client.login_and_get_credentials():
-                _LOGGER.error("Failed to login to Bluestar")
-                return False
-                
-            # Test AWS IoT connection
-            if not client.create_aws_iot_client():
-                _LOGGER.error("Failed to create AWS IoT client")
+        pending = self._pending
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = self._pending = _PendingCommand(loop.create_future())
+            pending.task = loop.create_task(self._flush(pending))
+        self._track(pending, payload, priority)
+        return await asyncio.shield(pending.future)
+    
+    def _track(
+        self, command: _PendingCommand, payload: Dict[str, Any], priority: Priority
+    ) -> _PendingCommand:
+        """Add keys to a command and show them optimistically."""
+        command.payload.update(payload)
+        command.priority = min(command.priority, priority)
+        self._commands[command.token] = command
+        self._notify()
+        return command
+    
+    async def _flush(self, pending: _PendingCommand) -> None:
+        """Publish a batch once its coalescing window has elapsed."""
+        await asyncio.sleep(self._coalesce_window)
+        if self._pending is pending:
+            self._pending = None
+        result = False
+        try:
+            result = await self._submit(pending)
+        finally:
+            if not pending.future.done():
+                pending.future.set_result(result)
+    
+    async def _submit(self, command: _PendingCommand) -> bool:
+        """Send a command once the account's scheduler lets it through.
+        
+        Unless the command is pinned, the account's transport selector
+        decides between the MQTT shadow and a REST preferences write; if
+        sending fails, the command is queued again on the next transport.
+        A shadow that rejects or never answers a published command rolls
+        it back later without failing over.
+        """
+        if command.transport:
+            transports = [command.transport]
+        else:
+            transports = self._account.transports.order(self.connected)
+        for transport in transports:
+            send = self._post if transport == TRANSPORT_REST else self._publish
+            if await self._account.scheduler.async_submit(
+                self.device_id, lambda: send(command), command.priority
+            ):
+                return True
+            if command.token not in self._commands:
                 return False
-                
-            self._aws_client = client
-            self._connected = True
-            _LOGGER.info("Successfully connected to Bluestar AC")
-            return True
+            _LOGGER.debug("Sending over %s failed for %s", transport, self.device_id)
+        self._resolve(command, False)
+        return False
+    
+    async def _post(self, command: _PendingCommand) -> bool:
+        """Send a command as a REST preferences write.
+        
+        The cloud answers the request itself, so the keys are applied as
+        soon as it succeeds.
+        """
+        start = time.monotonic()
+        success = await self._account.api.set_preferences(
+            self.device_id, dict(command.payload)
+        )
+        self._account.transports.record(TRANSPORT_REST, time.monotonic() - start, success)
+        if success:
+            self._resolve(command, True)
+        return success
+    
+    async def _publish(self, command: _PendingCommand) -> bool:
+        """Send a command via AWS IoT.
+        
+        Without a shadow subscription no verdict can arrive, so a sent
+        command counts as accepted right away.
+        """
+        start = time.monotonic()
+        if not await self._ensure_connected():
+            self._account.transports.record(TRANSPORT_MQTT, time.monotonic() - start, False)
+            return False
             
-        except Exception as e:
-            _LOGGER.error("Connection test failed: %s", e)
+        # Add timestamp and source
+        payload = dict(command.payload)
+        payload["ts"] = command.ts = int(time.time() * 1000)
+        payload["src"] = "anmq"
+        
+        start = command.sent_at = time.monotonic()
+        self._account.trace.record(
+            OUTGOING, "mqtt", SHADOW_TOPIC.format(device_id=self.device_id, suffix="update"),
+            payload, token=command.token,
+        )
+        try:
+            # Desired-state update, then the force-apply nudge the app sends
+            await self._account.connection.publish(
+                SHADOW_TOPIC.format(device_id=self.device_id, suffix="update"),
+                json.dumps({
+                    "state": {"desired": payload},
+                    "clientToken": command.token,
+                }).encode(),
+            )
+            await self._account.connection.publish(
+                CONTROL_TOPIC.format(device_id=self.device_id),
+                json.dumps({"fpsh": 1}).encode(),
+            )
+        except (IoTConnectionError, aiohttp.ClientError, ConnectionError) as e:
+            self._account.metrics.record("publish", time.monotonic() - start, False)
+            self._account.transports.record(TRANSPORT_MQTT, time.monotonic() - start, False)
+            _LOGGER.error("Error sending command %s: %s", payload, e)
             return False
-    
-    def _ensure_connected(self) -> bool:
-        """Ensure we have a valid connection."""
-        if not self._connected or not self._aws_client:
-            return self.test_connection()
+            
+        self._account.metrics.record("publish", time.monotonic() - start, True)
+        _LOGGER.debug("Command sent successfully: %s", payload)
+        if self._subscribed:
+            # The verdict may have arrived while the nudge was being sent
+            if command.token in self._commands:
+                command.timer = asyncio.get_running_loop().call_later(
+                    SHADOW_ACK_TIMEOUT, self._on_ack_timeout, command
+                )
+        else:
+            self._account.transports.record(TRANSPORT_MQTT, time.monotonic() - start, True)
+            self._resolve(command, True)
         return True
     
-    def _send_command(self, payload: Dict[str, Any]) -> bool:
-        """Send a command via AWS IoT."""
-        if not self._ensure_connected():
+    def _resolve(self, command: _PendingCommand, accepted: bool) -> None:
+        """Settle a command: keep its keys if accepted, roll back otherwise.
+        
+        Accepted keys stay in ``optimistic_state`` until the device reports
+        them; an acknowledgement is not the device's state.
+        """
+        if self._commands.pop(command.token, None) is None:
+            return
+        if command.timer:
+            command.timer.cancel()
+        if accepted:
+            now = time.monotonic()
+            self._accepted.update(
+                (key, (value, now)) for key, value in command.payload.items()
+            )
+            if self._report_timer:
+                self._report_timer.cancel()
+            # Show the reported state again if the device never reports
+            self._report_timer = asyncio.get_running_loop().call_later(
+                REPORT_TIMEOUT, self._notify
+            )
+        self._notify()
+    
+    def _on_ack_timeout(self, command: _PendingCommand) -> None:
+        """Roll back a command the shadow never answered."""
+        if command.token not in self._commands:
+            return
+        _LOGGER.warning(
+            "No shadow response for %s on %s, rolling back", command.payload, self.device_id
+        )
+        self._account.metrics.record("shadow_ack", SHADOW_ACK_TIMEOUT, False)
+        self._account.transports.record(TRANSPORT_MQTT, SHADOW_ACK_TIMEOUT, False)
+        self._resolve(command, False)
+    
+    def _match_command(self, document: Dict[str, Any]) -> Optional[_PendingCommand]:
+        """Find the command a shadow verdict answers, by token or timestamp."""
+        token = document.get("clientToken")
+        if token:
+            return self._commands.get(token)
+        desired = (document.get("state") or {}).get("desired") or {}
+        ts = desired.get("ts")
+        if ts is None:
+            return None
+        return next(
+            (command for command in self._commands.values() if command.ts == ts), None
+        )
+    
+    async def async_subscribe_shadow(
+        self, state_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> bool:
+        """Subscribe to shadow updates and push reported state to a callback.
+
+        The callback runs on the event loop with the device ID and the
+        parsed state; without one the callback given at construction is
+        used. A shadow ``get`` is published afterwards so the current
+        state arrives without waiting for the next change; its client
+        token tells the answer apart from those to other clients' gets.
+        """
+        if not await self._ensure_connected():
             return False
             
+        if state_callback:
+            self._state_callback = state_callback
         try:
-            # Add timestamp and source
-            payload["ts"] = int(time.time() * 1000)
-            payload["src"] = "anmq"
+            await self._account.connection.subscribe(
+                self._shadow_topics, self._on_shadow_message
+            )
+            self._subscribed = True
+            self._get_token = uuid.uuid4().hex
+            await self._account.connection.publish(
+                SHADOW_TOPIC.format(device_id=self.device_id, suffix="get"),
+                json.dumps({"clientToken": self._get_token}).encode(),
+            )
+        except (IoTConnectionError, aiohttp.ClientError, ConnectionError) as e:
+            _LOGGER.error("Failed to subscribe to shadow updates: %s", e)
+            return False
             
-            # Send via shadow update
-            success = self._aws_client.send_shadow_update(payload)
-            if success:
-                _LOGGER.debug("Command sent successfully: %s", payload)
+        _LOGGER.debug("Subscribed to shadow updates for %s", self.device_id)
+        return True
+    
+    def _is_current(self, topic: str, document: Dict[str, Any]) -> bool:
+        """Return False for a shadow document older than one already seen.
+        
+        AWS IoT increments the shadow ``version`` on every update, so a
+        lower one means the message arrived out of order; ``timestamp`` is
+        compared when there is no version. The answer to our own ``get``,
+        matched by its client token, is current by definition, so it is
+        always applied, which also resets the version after the shadow was
+        deleted. Answers to the phone app's gets are checked like any other
+        document.
+        """
+        version = document.get("version")
+        timestamp = document.get("timestamp")
+        if not isinstance(version, int):
+            version = None
+        if not isinstance(timestamp, (int, float)):
+            timestamp = None
+        own_get = (
+            topic.endswith("/get/accepted")
+            and self._get_token is not None
+            and document.get("clientToken") == self._get_token
+        )
+        if own_get:
+            self._get_token = None
+        else:
+            if version is not None and self.shadow_version is not None:
+                stale = version < self.shadow_version
             else:
-                _LOGGER.error("Failed to send command: %s", payload)
-            return success
+                stale = (
+                    timestamp is not None
+                    and self.shadow_timestamp is not None
+                    and timestamp < self.shadow_timestamp
+                )
+            if stale:
+                _LOGGER.debug(
+                    "Dropping shadow version %s of %s, already at %s",
+                    version, self.device_id, self.shadow_version,
+                )
+                self.stale_dropped += 1
+                return False
+        if version is not None:
+            self.shadow_version = version
+        if timestamp is not None:
+            self.shadow_timestamp = timestamp
+        return True
+    
+    def _on_shadow_message(self, topic: str, payload: bytes) -> None:
+        """Handle a message on one of the shadow topics."""
+        try:
+            document = json.loads(payload)
+        except (TypeError, ValueError):
+            _LOGGER.debug("Ignoring non-JSON shadow message on %s", topic)
+            return
+        if not isinstance(document, dict):
+            return
+        self._account.trace.record(INCOMING, "mqtt", topic, document)
             
-        except Exception as e:
-            _LOGGER.error("Error sending command: %s", e)
-            return False
+        accepted = topic.endswith("/update/accepted")
+        if accepted or topic.endswith("/update/rejected"):
+            command = self._match_command(document)
+            if command:
+                elapsed = time.monotonic() - command.sent_at
+                self._account.metrics.record("shadow_ack", elapsed, accepted)
+                self._account.transports.record(TRANSPORT_MQTT, elapsed, accepted)
+                if not accepted:
+                    _LOGGER.warning(
+                        "Shadow rejected %s on %s: %s",
+                        command.payload,
+                        self.device_id,
+                        document.get("message"),
+                    )
+                self._resolve(command, accepted)
+            
+        if not topic.endswith("/update/rejected") and not self._is_current(topic, document):
+            return
+        state = shadow_state(topic, document)
+        if state and self._state_callback:
+            self._state_callback(self.device_id, state)
     
-    def set_power(self, power: bool) -> bool:
-        """Set power state."""
-        payload = {"pow": 1 if power else 0}
-        return self._send_command(payload)
+    def _encode_temperature(self, temperature: float) -> Optional[Dict[str, Any]]:
+        """Build the payload for a target temperature."""
+        caps = self.capabilities
+        if not caps.min_temp <= temperature <= caps.max_temp:
+            _LOGGER.error(
+                "Temperature %s out of range [%s, %s]", temperature, caps.min_temp, caps.max_temp
+            )
+            return None
+        return {"stemp": f"{temperature:.1f}"}
     
-    def set_temperature(self, temperature: float) -> bool:
-        """Set target temperature."""
-        if not MIN_TEMP <= temperature <= MAX_TEMP:
-            _LOGGER.error("Temperature %s out of range [%s, %s]", temperature, MIN_TEMP, MAX_TEMP)
-            return False
+    def _encode_mode(self, mode: str) -> Optional[Dict[str, Any]]:
+        """Build the payload for an HVAC mode.
+        
+        Modes with a fixed fan speed also set that speed, as the app does.
+        """
+        code = self.capabilities.modes.get(mode)
+        if code is None:
+            _LOGGER.error("Mode %s is not supported by %s", mode, self.device_id)
+            return None
+        payload = {"mode": code}
+        if code in self.capabilities.fixed_fan_speeds:
+            payload["fspd"] = self.capabilities.fixed_fan_speeds[code]
+        return payload
+    
+    def _encode_fan_mode(self, fan_mode: str) -> Optional[Dict[str, Any]]:
+        """Build the payload for a fan mode."""
+        code = self.capabilities.fan_speeds.get(fan_mode)
+        if code is None:
+            _LOGGER.error("Fan mode %s is not supported by %s", fan_mode, self.device_id)
+            return None
+        return {"fspd": code}
+    
+    def _encode_swing_mode(self, swing_mode: str) -> Optional[Dict[str, Any]]:
+        """Build the payload for a swing mode."""
+        if swing_mode not in SWING_PAYLOADS:
+            _LOGGER.error("Invalid swing mode: %s", swing_mode)
+            return None
+        return dict(SWING_PAYLOADS[swing_mode])
+    
+    def _encode_preset_mode(self, preset_mode: str) -> Optional[Dict[str, Any]]:
+        """Build the payload for a preset mode."""
+        if preset_mode not in PRESET_PAYLOADS:
+            _LOGGER.error("Invalid preset mode: %s", preset_mode)
+            return None
+        return dict(PRESET_PAYLOADS[preset_mode])
+    
+    def _encode_state(
+        self,
+        power: Optional[bool] = None,
+        hvac_mode: Optional[str] = None,
+        temperature: Optional[float] = None,
+        fan_mode: Optional[str] = None,
+        swing_mode: Optional[str] = None,
+        preset_mode: Optional[str] = None,
+        display: Optional[bool] = None,
+        buzzer: Optional[bool] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Build one payload from several attributes, or None if any is invalid.
+        
+        An ``hvac_mode`` of ``off`` powers the unit down; any other mode
+        also powers it on, so a mode change needs a single publish.
+        Without an ``hvac_mode``, the temperature and fan speed are checked
+        against the mode the device is in or has been sent.
+        """
+        payload: Dict[str, Any] = {}
+        parts = []
+        if power is not None:
+            payload["pow"] = 1 if power else 0
+        if hvac_mode == "off":
+            payload["pow"] = 0
+        elif hvac_mode is not None:
+            payload["pow"] = 1
+            parts.append(self._encode_mode(hvac_mode))
+        if hvac_mode is None:
+            mode_code = self._current_mode()
+        else:
+            mode_code = self.capabilities.modes.get(hvac_mode)
+        mode_name = self.capabilities.mode_names.get(mode_code, hvac_mode)
+        if temperature is not None:
+            if mode_code in self.capabilities.no_temperature_modes:
+                _LOGGER.error("Mode %s has no target temperature", mode_name)
+                return None
+            parts.append(self._encode_temperature(temperature))
+        if fan_mode is not None:
+            if mode_code in self.capabilities.fixed_fan_speeds:
+                _LOGGER.error("Mode %s has a fixed fan speed", mode_name)
+                return None
+            parts.append(self._encode_fan_mode(fan_mode))
+        if swing_mode is not None:
+            parts.append(self._encode_swing_mode(swing_mode))
+        if preset_mode is not None:
+            parts.append(self._encode_preset_mode(preset_mode))
+        if display is not None:
+            payload["display"] = 1 if display else 0
+        if buzzer is not None:
+            payload["buzzer"] = 1 if buzzer else 0
             
-        payload = {"stemp": f"{temperature:.1f}"}
-        return self._send_command(payload)
-    
-    def set_mode(self, mode: str) -> bool:
-        """Set HVAC mode."""
-        mode_mapping = {
-            "auto": 0,
-            "cool": 1,
-            "dry": 2,
-            "fan": 3
-        }
+        for part in parts:
+            if part is None:
+                return None
+            payload.update(part)
+        return payload
+    
+    async def async_set_state(
+        self,
+        priority: Priority = Priority.NORMAL,
+        force: bool = False,
+        transport: Optional[str] = None,
+        **attrs: Any,
+    ) -> bool:
+        """Set several attributes with a single update.
         
-        if mode not in mode_mapping:
-            _LOGGER.error("Invalid mode: %s", mode)
+        Accepts ``power``, ``hvac_mode``, ``temperature``, ``fan_mode``,
+        ``swing_mode``, ``preset_mode``, ``display`` and ``buzzer``.
+        ``priority`` is the scheduler lane; user commands pass ``HIGH``.
+        With ``force``, values the device already has are sent anyway.
+        ``transport`` pins the update to ``mqtt`` or ``rest``; by default
+        the faster healthy one is used.
+        """
+        payload = self._encode_state(**attrs)
+        if not payload:
+            _LOGGER.error("No valid state to set: %s", attrs)
             return False
-            
-        payload = {"climate": mode_mapping[mode]}
-        return self._send_command(payload)
+        return await self._send_command(payload, priority, force, transport)
     
-    def set_fan_mode(self, fan_mode: str) -> bool:
-        """Set fan mode."""
-        fan_mapping = {
-            "auto": 0,
-            "low": 1,
-            "medium": 2,
-            "high": 3
-        }
+    async def async_set_preferences(
+        self, priority: Priority = Priority.NORMAL, force: bool = False, **attrs: Any
+    ) -> bool:
+        """Set several attributes with a REST preferences write."""
+        return await self.async_set_state(priority, force, TRANSPORT_REST, **attrs)
+    
+    async def async_send_payload(
+        self,
+        payload: Dict[str, Any],
+        priority: Priority = Priority.NORMAL,
+        force: bool = False,
+    ) -> bool:
+        """Send already encoded desired-state keys, such as a traced command.
         
-        if fan_mode not in fan_mapping:
-            _LOGGER.error("Invalid fan mode: %s", fan_mode)
+        The ``ts`` and ``src`` keys are replaced on sending.
+        """
+        payload = {key: value for key, value in payload.items() if key not in ("ts", "src")}
+        if not payload:
             return False
-            
-        payload = {"fspd": fan_mapping[fan_mode]}
-        return self._send_command(payload)
+        return await self._send_command(payload, priority, force)
+    
+    async def async_set_power(
+        self, power: bool, priority: Priority = Priority.NORMAL
+    ) -> bool:
+        """Set power state."""
+        return await self.async_set_state(priority, power=power)
     
-    def set_swing_mode(self, swing_mode: str) -> bool:
+    async def async_set_temperature(
+        self, temperature: float, priority: Priority = Priority.NORMAL
+    ) -> bool:
+        """Set target temperature."""
+        return await self.async_set_state(priority, temperature=temperature)
+    
+    async def async_set_mode(
+        self, mode: str, priority: Priority = Priority.NORMAL
+    ) -> bool:
+        """Set HVAC mode, powering the unit on."""
+        return await self.async_set_state(priority, hvac_mode=mode)
+    
+    async def async_set_fan_mode(
+        self, fan_mode: str, priority: Priority = Priority.NORMAL
+    ) -> bool:
+        """Set fan mode."""
+        return await self.async_set_state(priority, fan_mode=fan_mode)
+    
+    async def async_set_swing_mode(
+        self, swing_mode: str, priority: Priority = Priority.NORMAL
+    ) -> bool:
         """Set swing mode."""
-        if swing_mode == "off":
-            payload = {"hswing": 0, "vswing": 0}
-        elif swing_mode == "horizontal":
-            payload = {"hswing": 1, "vswing": 0}
-        elif swing_mode == "vertical":
-            payload = {"hswing": 0, "vswing": 1}
-        elif swing_mode == "both":
-            payload = {"hswing": 1, "vswing": 1}
-        else:
-            _LOGGER.error("Invalid swing mode: %s", swing_mode)
-            return False
-            
-        return self._send_command(payload)
+        return await self.async_set_state(priority, swing_mode=swing_mode)
     
-    def set_preset_mode(self, preset_mode: str) -> bool:
+    async def async_set_preset_mode(
+        self, preset_mode: str, priority: Priority = Priority.NORMAL
+    ) -> bool:
         """Set preset mode."""
-        if preset_mode == "none":
-            # Turn off all special modes
-            payload = {"eco": 0, "turbo": 0, "sleep": 0}
-        elif preset_mode == "eco":
-            payload = {"eco": 1, "turbo": 0, "sleep": 0}
-        elif preset_mode == "turbo":
-            payload = {"eco": 0, "turbo": 1, "sleep": 0}
-        elif preset_mode == "sleep":
-            payload = {"eco": 0, "turbo": 0, "sleep": 1}
-        else:
-            _LOGGER.error("Invalid preset mode: %s", preset_mode)
-            return False
-            
-        return self._send_command(payload)
+        return await self.async_set_state(priority, preset_mode=preset_mode)
     
-    def set_display(self, display: bool) -> bool:
+    async def async_set_display(
+        self, display: bool, priority: Priority = Priority.NORMAL
+    ) -> bool:
         """Set display state."""
-        payload = {"display": 1 if display else 0}
-        return self._send_command(payload)
+        return await self.async_set_state(priority, display=display)
     
-    def set_buzzer(self, buzzer: bool) -> bool:
+    async def async_set_buzzer(
+        self, buzzer: bool, priority: Priority = Priority.NORMAL
+    ) -> bool:
         """Set buzzer state."""
-        payload = {"buzzer": 1 if buzzer else 0}
-        return self._send_command(payload)
+        return await self.async_set_state(priority, buzzer=buzzer)
     
-    def close(self):
+    async def async_close(self) -> None:
         """Close the client."""
-        self._connected = False
-        self._aws_client = None
+        if self._pending:
+            self._pending.task.cancel()
+            if not self._pending.future.done():
+                self._pending.future.set_result(False)
+            self._pending = None
+        for command in self._commands.values():
+            if command.timer:
+                command.timer.cancel()
+        self._commands.clear()
+        if self._report_timer:
+            self._report_timer.cancel()
+            self._report_timer = None
+        self._accepted.clear()
+        self._listeners.clear()
+        if self._subscribed and self._account.connection:
+            try:
+                await self._account.connection.unsubscribe(self._shadow_topics)
+            except (IoTConnectionError, aiohttp.ClientError, ConnectionError) as e:
+                _LOGGER.debug("Failed to unsubscribe from shadow updates: %s", e)
+        self._subscribed = False
@@ -0,0 +1,119 @@
+"""Per-model capabilities compiled from the ``model_config`` of ``/things``."""
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from .const import MIN_TEMP, MAX_TEMP, STATE_MODES, STATE_FAN_SPEEDS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Names used in model_config mapped to Home Assistant's
+MODE_NAMES = {"fan": "fan_only", "cool": "cool", "dry": "dry", "auto": "auto", "heat": "heat"}
+FAN_SPEED_NAMES = {"low": "low", "med": "medium", "medium": "medium", "high": "high", "turbo": "turbo", "auto": "auto"}
+
+# Display order of fan speeds
+FAN_SPEED_ORDER = ("auto", "low", "medium", "high", "turbo")
+
+
+@dataclass(frozen=True)
+class Capabilities:
+    """Lookup tables for encoding and validating commands for one model."""
+
+    min_temp: float
+    max_temp: float
+    # Home Assistant name <-> device code
+    modes: Dict[str, int]
+    mode_names: Dict[int, str]
+    fan_speeds: Dict[str, int]
+    fan_names: Dict[int, str]
+    # Mode codes whose fan speed is fixed, with the speed the AC uses
+    fixed_fan_speeds: Dict[int, int]
+    # Mode codes without a target temperature
+    no_temperature_modes: FrozenSet[int]
+
+    @property
+    def hvac_modes(self) -> List[str]:
+        """Return the supported HVAC modes, including off."""
+        return ["off", *self.modes]
+
+    @property
+    def fan_modes(self) -> List[str]:
+        """Return the supported fan speeds in display order."""
+        return [name for name in FAN_SPEED_ORDER if name in self.fan_speeds]
+
+
+def parse_model_config(model_config: Dict[str, Any]) -> Capabilities:
+    """Compile a ``model_config`` into lookup tables.
+
+    Unknown mode or fan speed names are skipped; a config without any
+    usable mode raises ``ValueError``.
+    """
+    modes: Dict[str, int] = {}
+    fixed_fan_speeds: Dict[int, int] = {}
+    no_temperature_modes = set()
+    for code, mode in (model_config.get("mode") or {}).items():
+        name = MODE_NAMES.get(str(mode.get("name", "")).lower())
+        if name is None:
+            _LOGGER.debug("Skipping unknown mode %s", mode)
+            continue
+        code = int(code)
+        modes[name] = code
+        fspd = mode.get("fspd") or {}
+        if fspd.get("fixed"):
+            fixed_fan_speeds[code] = int(fspd.get("default"))
+        if "stemp" not in mode:
+            no_temperature_modes.add(code)
+
+    fan_speeds: Dict[str, int] = {}
+    for code, speed in (model_config.get("fspd") or {}).items():
+        name = FAN_SPEED_NAMES.get(str(speed).lower())
+        if name is None:
+            _LOGGER.debug("Skipping unknown fan speed %s", speed)
+            continue
+        fan_speeds.setdefault(name, int(code))
+
+    if not modes:
+        raise ValueError("model_config has no supported modes")
+    return Capabilities(
+        min_temp=float(model_config.get("min_temp", MIN_TEMP)),
+        max_temp=float(model_config.get("max_temp", MAX_TEMP)),
+        modes=modes,
+        mode_names={code: name for name, code in modes.items()},
+        fan_speeds=fan_speeds,
+        fan_names={code: name for name, code in fan_speeds.items()},
+        fixed_fan_speeds=fixed_fan_speeds,
+        no_temperature_modes=frozenset(no_temperature_modes),
+    )
+
+
+# Used when a device comes without a usable model_config
+DEFAULT_CAPABILITIES = Capabilities(
+    min_temp=MIN_TEMP,
+    max_temp=MAX_TEMP,
+    modes={name: code for code, name in STATE_MODES.items()},
+    mode_names=dict(STATE_MODES),
+    fan_speeds={name: code for code, name in STATE_FAN_SPEEDS.items()},
+    fan_names=dict(STATE_FAN_SPEEDS),
+    fixed_fan_speeds={},
+    no_temperature_modes=frozenset({0}),
+)
+
+_cache: Dict[str, Capabilities] = {}
+
+
+def get_capabilities(
+    model_id: Optional[str], model_config: Optional[Dict[str, Any]]
+) -> Capabilities:
+    """Return the capabilities of a model, parsing each model only once."""
+    if model_id and model_id in _cache:
+        return _cache[model_id]
+    if not model_config:
+        return DEFAULT_CAPABILITIES
+    try:
+        capabilities = parse_model_config(model_config)
+    except (AttributeError, TypeError, ValueError) as ex:
+        _LOGGER.warning("Unsupported model_config for %s: %s", model_id, ex)
+        return DEFAULT_CAPABILITIES
+    if model_id:
+        _cache[model_id] = capabilities
+    return capabilities
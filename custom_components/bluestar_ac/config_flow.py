@@ -1,18 +1,31 @@
 """Config flow for Bluestar AC integration."""
 import logging
+from typing import Any, Dict, List, Optional
+
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.httpx_client import get_async_client
 
 from .const import (
     DOMAIN,
-    CONF_AUTH_TYPE,
-    DEFAULT_AUTH_TYPE,
+    CONF_PUSH_UPDATES,
+    DEFAULT_PUSH_UPDATES,
+    CONF_COALESCE_WINDOW,
+    DEFAULT_COALESCE_WINDOW,
+    CONF_OPTIMISTIC,
+    DEFAULT_OPTIMISTIC,
+    CONF_TEMPERATURE_DEADBAND,
+    DEFAULT_TEMPERATURE_DEADBAND,
+    CONF_TEMPERATURE_INTERVAL,
+    DEFAULT_TEMPERATURE_INTERVAL,
+    DATA_ACCOUNTS,
 )
-from .bluestar_client import BluestarACClient
+from .account import account_key
+from .api_client import BluestarClient
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,41 +39,41 @@ class BluestarACConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self._errors = {}
     
     async def async_step_user(self, user_input=None) -> FlowResult:
-        """Handle the initial step."""
+        """Handle the initial step.
+        
+        One entry is created per account and covers every AC returned by
+        ``get_devices()``.
+        """
         self._errors = {}
         
         if user_input is not None:
+            username = user_input["username"]
+            
+            # Check if already configured
+            await self.async_set_unique_id(f"bluestar_ac_account_{account_key(username)}")
+            self._abort_if_unique_id_configured()
+            
             try:
-                # Test the connection
-                client = BluestarACClient(
-                    user_input["username"],
-                    user_input["password"],
-                    user_input["device_id"],
-                    user_input.get("auth_type", DEFAULT_AUTH_TYPE)
+                # Log in and discover the account's devices
+                devices = await self._async_discover_devices(
+                    username, user_input["password"]
                 )
-                
-                # Test connection
-                success = await self.hass.async_add_executor_job(client.test_connection)
-                
-                if success:
-                    # Create unique ID
-                    unique_id = f"bluestar_ac_{user_input['device_id']}"
-                    
-                    # Check if already configured
-                    await self.async_set_unique_id(unique_id)
-                    self._abort_if_unique_id_configured()
-                    
-                    # Create config entry
-                    return self.async_create_entry(
-                        title=f"Bluestar AC {user_input['device_id']}",
-                        data=user_input
-                    )
-                else:
-                    self._errors["base"] = "connection_failed"
-                    
             except Exception as ex:
                 _LOGGER.error("Config flow error: %s", ex)
                 self._errors["base"] = "unknown"
+            else:
+                if devices is None:
+                    self._errors["base"] = "connection_failed"
+                elif not devices:
+                    self._errors["base"] = "no_devices"
+                else:
+                    _LOGGER.debug(
+                        "Discovered %d devices for %s", len(devices), username
+                    )
+                    return self.async_create_entry(
+                        title=f"Bluestar AC ({username})",
+                        data=user_input
+                    )
         
         # Show the form
         return self.async_show_form(
@@ -68,12 +81,38 @@ class BluestarACConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=vol.Schema({
                 vol.Required("username"): str,
                 vol.Required("password"): str,
-                vol.Required("device_id"): str,
-                vol.Optional("auth_type", default=DEFAULT_AUTH_TYPE): str,
             }),
             errors=self._errors,
         )
     
+    async def _async_discover_devices(
+        self, username: str, password: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return the account's devices, or None if the login fails.
+        
+        A loaded account's session is reused; the MQTT connection is left
+        to setup, which shares one per account. A one-off login goes
+        through Home Assistant's shared HTTP client.
+        """
+        account = self.hass.data.get(DOMAIN, {}).get(DATA_ACCOUNTS, {}).get(
+            account_key(username)
+        )
+        if account is not None and account.api.password == password:
+            api, owned = account.api, False
+        else:
+            api = BluestarClient(
+                username, password, http_client=get_async_client(self.hass)
+            )
+            owned = True
+            
+        try:
+            if not await api.ensure_authenticated():
+                return None
+            return await api.get_devices()
+        finally:
+            if owned:
+                await api.close()
+    
     @staticmethod
     @callback
     def async_get_options_flow(config_entry):
@@ -89,13 +128,42 @@ class BluestarACOptionsFlow(config_entries.OptionsFlow):
     
     async def async_step_init(self, user_input=None):
         """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+            
         return self.async_show_form(
             step_id="init",
             data_schema=vol.Schema({
                 vol.Optional(
-                    "auth_type",
-                    default=self.config_entry.data.get("auth_type", DEFAULT_AUTH_TYPE)
-                ): str,
+                    CONF_PUSH_UPDATES,
+                    default=self.config_entry.options.get(
+                        CONF_PUSH_UPDATES, DEFAULT_PUSH_UPDATES
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_COALESCE_WINDOW,
+                    default=self.config_entry.options.get(
+                        CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1000)),
+                vol.Optional(
+                    CONF_OPTIMISTIC,
+                    default=self.config_entry.options.get(
+                        CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_TEMPERATURE_DEADBAND,
+                    default=self.config_entry.options.get(
+                        CONF_TEMPERATURE_DEADBAND, DEFAULT_TEMPERATURE_DEADBAND
+                    ),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=5)),
+                vol.Optional(
+                    CONF_TEMPERATURE_INTERVAL,
+                    default=self.config_entry.options.get(
+                        CONF_TEMPERATURE_INTERVAL, DEFAULT_TEMPERATURE_INTERVAL
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
             })
         )
 
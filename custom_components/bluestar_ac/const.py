@@ -11,6 +11,68 @@ DOMAIN = "bluestar_ac"
 CONF_AUTH_ID = "auth_id"
 CONF_AUTH_TYPE = "auth_type"
 DEFAULT_AUTH_TYPE = "bluestar"
+CONF_PUSH_UPDATES = "push_updates"
+DEFAULT_PUSH_UPDATES = True
+CONF_COALESCE_WINDOW = "coalesce_window"
+DEFAULT_COALESCE_WINDOW = 50  # milliseconds
+CONF_OPTIMISTIC = "optimistic"
+DEFAULT_OPTIMISTIC = True
+CONF_TEMPERATURE_DEADBAND = "temperature_deadband"
+DEFAULT_TEMPERATURE_DEADBAND = 0.3  # degrees Celsius
+CONF_TEMPERATURE_INTERVAL = "temperature_interval"
+DEFAULT_TEMPERATURE_INTERVAL = 60  # seconds
+
+# Update coordinator
+DEFAULT_SCAN_INTERVAL = 30  # seconds
+
+# Persistent session cache
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 1  # seconds
+
+# Keys for per-entry data in hass.data[DOMAIN]
+DATA_ACCOUNT = "account"
+DATA_ACCOUNTS = "accounts"
+DATA_API = "api"
+DATA_CLIENTS = "clients"
+DATA_COORDINATOR = "coordinator"
+DATA_DEVICES = "devices"
+DATA_MODELS = "models"
+
+# Dispatcher signal carrying the device state trackers of ACs added to an entry
+SIGNAL_NEW_DEVICES = f"{DOMAIN}_new_devices_{{entry_id}}"
+
+# REST API
+BASE_URL = "https://n3on22cp53.execute-api.ap-south-1.amazonaws.com/prod"
+LOGIN_URL = f"{BASE_URL}/auth/login"
+DEVICES_URL = f"{BASE_URL}/things"
+DEVICE_STATE_URL = f"{BASE_URL}/things/{{device_id}}/state"
+DEVICE_INFO_URL = f"{BASE_URL}/things/{{device_id}}"
+DEVICE_PREFERENCES_URL = f"{BASE_URL}/things/{{device_id}}/preferences"
+
+DEFAULT_HEADERS = {
+    "X-APP-VER": "v1.0.0-123",
+    "X-OS-NAME": "Android",
+    "X-OS-VER": "v13-33",
+    "User-Agent": "com.bluestarindia.bluesmart",
+    "Content-Type": "application/json",
+}
+
+# HTTP connection pool
+HTTP_CONNECT_TIMEOUT = 10  # seconds
+HTTP_READ_TIMEOUT = 30  # seconds
+HTTP_MAX_CONNECTIONS = 10
+HTTP_KEEPALIVE_EXPIRY = 60  # seconds
+
+# apply_state service
+SERVICE_APPLY_STATE = "apply_state"
+DEFAULT_SERVICE_CONCURRENCY = 10
+
+# Session lifetime assumed after a login, and how early it is renewed
+SESSION_LIFETIME = 3600  # seconds
+SESSION_REFRESH_MARGIN = 300  # seconds
+
+POWER_ON = "1"
+POWER_OFF = "0"
 
 # Device info
 MANUFACTURER = "Bluestar"
@@ -36,7 +98,11 @@ SWING_MODES = ["off", "horizontal", "vertical", "both"]
 PRESET_MODES = ["none", "eco", "turbo", "sleep"]
 
 # HVAC modes
-HVAC_MODES = ["off", "auto", "cool", "dry", "fan"]
+HVAC_MODES = ["off", "auto", "cool", "dry", "fan_only"]
+
+# "mode" and "fspd" codes for models without a usable model_config
+STATE_MODES = {0: "fan_only", 1: "heat", 2: "cool", 3: "dry", 4: "auto"}
+STATE_FAN_SPEEDS = {2: "low", 3: "medium", 4: "high", 6: "turbo", 7: "auto"}
 
 # Default values
 DEFAULT_TEMPERATURE = 24
@@ -0,0 +1,128 @@
+"""Data update coordinator for Bluestar AC."""
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
+
+from .api_client import BluestarClient
+from .const import DOMAIN, DEFAULT_SCAN_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _stamp(state: Dict[str, Any]) -> Optional[float]:
+    """Return the ``ts`` a device reported with its state, if any."""
+    try:
+        return float(state["ts"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class BluestarDataUpdateCoordinator(DataUpdateCoordinator[Dict[str, Dict[str, Any]]]):
+    """Fetch the state of every device on an account with one request.
+
+    ``data`` maps ``thing_id`` to the device dict returned by
+    ``BluestarClient.get_devices()``, including its ``state`` and
+    ``connected`` keys.
+
+    Pushed updates are merged into the cached state key by key. A poll
+    is slower than a push, so keys pushed while it was in flight win over
+    the polled ones, and a polled state whose ``ts`` is older than that of
+    the last state applied is ignored.
+    """
+
+    def __init__(self, hass: HomeAssistant, api: BluestarClient) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN,
+            update_interval=timedelta(seconds=DEFAULT_SCAN_INTERVAL),
+        )
+        self.api = api
+        self.stale_polls = 0
+        self.unchanged_pushes = 0
+        self._stamps: Dict[str, float] = {}
+        self._pushed: Dict[str, Dict[str, Any]] = {}
+        self._polling = False
+
+    async def _async_update_data(self) -> Dict[str, Dict[str, Any]]:
+        """Fetch all devices and their states."""
+        self._polling = True
+        try:
+            devices = await self.api.get_devices()
+        finally:
+            self._polling = False
+            pushed, self._pushed = self._pushed, {}
+        if not devices:
+            raise UpdateFailed("No devices returned by the Bluestar API")
+        for device in devices:
+            device["state"] = self._merge_polled(
+                device["thing_id"], device.get("state") or {}, pushed
+            )
+        return {device["thing_id"]: device for device in devices}
+
+    def _merge_polled(
+        self, device_id: str, state: Dict[str, Any], pushed: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Return the polled state of a device, minus what newer updates changed."""
+        stamp = _stamp(state)
+        last = self._stamps.get(device_id)
+        if stamp is not None and last is not None and stamp < last:
+            _LOGGER.debug("Ignoring polled state of %s older than the last update", device_id)
+            self.stale_polls += 1
+            state = self.device_state(device_id)
+        elif stamp is not None:
+            self._stamps[device_id] = stamp
+        if device_id in pushed:
+            state = {
+                key: value
+                for key, value in {**state, **pushed[device_id]}.items()
+                if value is not None
+            }
+        return state
+
+    @callback
+    def async_set_device_state(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Merge a pushed state update for one device and notify entities.
+
+        Keys set to None are removed, as in a shadow document. An update
+        that changes nothing notifies no one.
+        """
+        if not self.data or device_id not in self.data:
+            _LOGGER.debug("Ignoring pushed state for unknown device %s", device_id)
+            return
+
+        if self._polling:
+            self._pushed.setdefault(device_id, {}).update(state)
+        stamp = _stamp(state)
+        if stamp is not None:
+            self._stamps[device_id] = stamp
+        device = dict(self.data[device_id])
+        current = device.get("state", {})
+        merged = {
+            key: value for key, value in {**current, **state}.items() if value is not None
+        }
+        if merged == current and device.get("connected"):
+            self.unchanged_pushes += 1
+            return
+        device["state"] = merged
+        device["connected"] = True
+        self.async_set_updated_data({**self.data, device_id: device})
+
+    def device_state(self, device_id: str) -> Dict[str, Any]:
+        """Return the reported state of a device."""
+        if not self.data or device_id not in self.data:
+            return {}
+        return self.data[device_id].get("state", {})
+
+    def device_connected(self, device_id: str) -> bool:
+        """Return True if the cloud reports the device as connected."""
+        if not self.data or device_id not in self.data:
+            return False
+        return bool(self.data[device_id].get("connected", False))
@@ -0,0 +1,166 @@
+"""Parsed per-device state shared by every entity of an AC."""
+import logging
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from homeassistant.core import CALLBACK_TYPE, callback
+
+from .bluestar_client import PRESET_PAYLOADS, SWING_PAYLOADS, BluestarACClient
+from .capabilities import Capabilities
+from .coordinator import BluestarDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+StateListener = Callable[[FrozenSet[str]], None]
+
+
+def _match_payload(state: Dict[str, Any], payloads: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    """Return the option whose payload keys all match the state."""
+    for option, payload in payloads.items():
+        if all(str(state.get(key)) == str(value) for key, value in payload.items()):
+            return option
+    return None
+
+
+def _parse(raw: Dict[str, Any], key: str, convert: Callable[[Any], Any]) -> Any:
+    """Return a converted state key, or None if it is missing or malformed."""
+    if key not in raw:
+        return None
+    try:
+        return convert(raw[key])
+    except (TypeError, ValueError):
+        _LOGGER.debug("Ignoring malformed %s: %s", key, raw[key])
+        return None
+
+
+class DeviceState:
+    """The fields entities show, decoded once from a raw ``state`` dict.
+
+    ``None`` means the device did not report the field. Modes and fan
+    speeds are Home Assistant names; ``hvac_mode`` is the mode the AC runs
+    in when powered on.
+    """
+
+    __slots__ = (
+        "available",
+        "power",
+        "hvac_mode",
+        "target_temperature",
+        "room_temperature",
+        "fan_mode",
+        "swing_mode",
+        "preset_mode",
+        "display",
+        "buzzer",
+    )
+
+    def __init__(self, **fields: Any):
+        """Initialize the state; fields not given are None."""
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_raw(
+        cls, raw: Dict[str, Any], capabilities: Capabilities, available: bool
+    ) -> "DeviceState":
+        """Decode a raw state dict using the model's capabilities."""
+        return cls(
+            available=available,
+            power=_parse(raw, "pow", lambda value: bool(int(value))),
+            hvac_mode=_parse(raw, "mode", lambda value: capabilities.mode_names.get(int(value))),
+            target_temperature=_parse(raw, "stemp", float),
+            room_temperature=_parse(raw, "ctemp", float),
+            fan_mode=_parse(raw, "fspd", lambda value: capabilities.fan_names.get(int(value))),
+            swing_mode=_match_payload(raw, SWING_PAYLOADS),
+            preset_mode=_match_payload(raw, PRESET_PAYLOADS),
+            display=_parse(raw, "display", lambda value: bool(int(value))),
+            buzzer=_parse(raw, "buzzer", lambda value: bool(int(value))),
+        )
+
+    def diff(self, other: "DeviceState") -> FrozenSet[str]:
+        """Return the names of the fields that differ from ``other``."""
+        return frozenset(
+            name for name in self.__slots__ if getattr(self, name) != getattr(other, name)
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the fields as a dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class DeviceStateTracker:
+    """Keeps one ``DeviceState`` per AC and tells entities what changed.
+
+    The tracker follows the coordinator and the client's optimistic state,
+    decodes the merged raw state once per update and calls only the
+    listeners registered for a field that changed, so an unrelated key
+    does not make every entity of the AC write its state.
+    """
+
+    def __init__(
+        self,
+        coordinator: BluestarDataUpdateCoordinator,
+        client: BluestarACClient,
+        device_id: str,
+    ):
+        """Initialize the tracker."""
+        self.coordinator = coordinator
+        self.client = client
+        self.device_id = device_id
+        self.state = self._decode()
+        self._listeners: List[Tuple[StateListener, FrozenSet[str]]] = []
+        self._unsubs: List[CALLBACK_TYPE] = []
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """Return the reported state with unanswered commands applied."""
+        optimistic = self.client.optimistic_state
+        state = self.coordinator.device_state(self.device_id)
+        return {**state, **optimistic} if optimistic else state
+
+    def _decode(self) -> DeviceState:
+        """Decode the current raw state.
+
+        The AC is available while it is connected to the cloud and some
+        transport can carry a command: REST while polls succeed, MQTT
+        while its reconnect circuit is closed.
+        """
+        available = self.coordinator.device_connected(self.device_id) and (
+            self.coordinator.last_update_success or self.client.available
+        )
+        return DeviceState.from_raw(self.raw, self.client.capabilities, available)
+
+    @callback
+    def async_add_listener(
+        self, listener: StateListener, fields: Iterable[str]
+    ) -> CALLBACK_TYPE:
+        """Call ``listener`` with the changed fields when any of ``fields`` change."""
+        entry = (listener, frozenset(fields))
+        if not self._listeners:
+            self.state = self._decode()
+            self._unsubs = [
+                self.coordinator.async_add_listener(self.async_update),
+                self.client.add_listener(self.async_update),
+            ]
+        self._listeners.append(entry)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(entry)
+            if not self._listeners:
+                for unsub in self._unsubs:
+                    unsub()
+                self._unsubs = []
+
+        return remove_listener
+
+    @callback
+    def async_update(self) -> None:
+        """Decode the latest state and notify listeners of changed fields."""
+        state = self._decode()
+        changed = state.diff(self.state)
+        self.state = state
+        if not changed:
+            return
+        for listener, fields in list(self._listeners):
+            if fields & changed:
+                listener(changed)
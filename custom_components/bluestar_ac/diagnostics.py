@@ -0,0 +1,65 @@
+"""Diagnostics support for Bluestar AC."""
+from typing import Any, Dict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_ACCOUNT, DATA_CLIENTS, DATA_DEVICES
+
+TO_REDACT = {CONF_PASSWORD, CONF_USERNAME, "user_id", "mi", "session_token"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    account = data[DATA_ACCOUNT]
+    coordinator = account.coordinator
+    update_interval = coordinator.update_interval
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "account": {
+            "connected": account.connected,
+            "circuit": account.supervisor.state.value,
+            "connect_failures": account.supervisor.failures,
+            "retry_in": round(account.supervisor.retry_in, 1),
+            "session_expires_in": round(account.api.session_expires_in),
+            "session_refresh_in": (
+                round(account.refresher.refresh_in)
+                if account.refresher.refresh_in is not None else None
+            ),
+            "session_refresh_failures": account.refresher.failures,
+            "polling_interval": (
+                update_interval.total_seconds() if update_interval else None
+            ),
+            "last_update_success": coordinator.last_update_success,
+            "stale_polls": coordinator.stale_polls,
+            "unchanged_pushes": coordinator.unchanged_pushes,
+        },
+        "metrics": account.metrics.as_dict(),
+        "scheduler": account.scheduler.as_dict(),
+        "transports": account.transports.as_dict(account.connected),
+        "trace": account.trace.as_dict(),
+        "devices": {
+            device_id: {
+                "subscribed": client.subscribed,
+                "dedup": {
+                    "skipped": client.dedup_skipped,
+                    "trimmed": client.dedup_trimmed,
+                },
+                "shadow_version": client.shadow_version,
+                "stale_dropped": client.stale_dropped,
+                "connected": coordinator.device_connected(device_id),
+                "state": coordinator.device_state(device_id),
+                "decoded": data[DATA_DEVICES][device_id].state.as_dict(),
+            }
+            for device_id, client in data[DATA_CLIENTS].items()
+        },
+    }
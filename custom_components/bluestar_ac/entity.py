@@ -0,0 +1,159 @@
+"""Base entity for Bluestar AC."""
+from datetime import datetime
+from typing import Callable, FrozenSet, Iterable, Optional
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DATA_DEVICES, DOMAIN, MANUFACTURER, MODEL, SIGNAL_NEW_DEVICES
+from .coordinator import BluestarDataUpdateCoordinator
+from .device_state import DeviceState, DeviceStateTracker
+from .scheduler import Priority
+from .temperature import RoomTemperature
+
+
+@callback
+def async_setup_device_entities(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+    create: Callable[[DeviceStateTracker], Iterable[Entity]],
+) -> None:
+    """Add the entities ``create`` makes for every AC of an entry.
+
+    ACs added to the account after setup get their entities when the
+    entry announces them.
+    """
+
+    @callback
+    def async_add_devices(devices: Iterable[DeviceStateTracker]) -> None:
+        async_add_entities(
+            [entity for device in devices for entity in create(device)]
+        )
+
+    async_add_devices(hass.data[DOMAIN][entry.entry_id][DATA_DEVICES].values())
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_NEW_DEVICES.format(entry_id=entry.entry_id), async_add_devices
+        )
+    )
+
+
+class BluestarEntity(CoordinatorEntity[BluestarDataUpdateCoordinator]):
+    """Entity of one AC, updated from the AC's shared ``DeviceState``.
+
+    Subclasses list the fields they show in ``_state_fields`` and are only
+    updated and written when one of them, or availability, changes.
+    Entities showing the room temperature set ``_room_temperature`` and
+    call ``_update_room_temperature`` from ``_update_from_state``.
+    """
+
+    _state_fields: FrozenSet[str] = frozenset()
+    _room_temperature: Optional[RoomTemperature] = None
+    _unsub_room_temperature: Optional[Callable[[], None]] = None
+
+    def __init__(self, device: DeviceStateTracker):
+        """Initialize the entity."""
+        super().__init__(device.coordinator)
+        self._device = device
+        self._client = device.client
+        self._device_id = device.device_id
+        self._attr_has_entity_name = True
+        info = (device.coordinator.data or {}).get(device.device_id, {})
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, device.device_id)},
+            name=(info.get("user_config") or {}).get("name")
+            or f"Bluestar AC {device.device_id}",
+            manufacturer=MANUFACTURER,
+            model=info.get("model_id") or MODEL,
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return True if entity is available."""
+        return bool(self._device.state.available)
+
+    @property
+    def device_state(self) -> DeviceState:
+        """Return the decoded state, with unanswered commands applied."""
+        return self._device.state
+
+    @property
+    def _command_priority(self) -> Priority:
+        """Return the scheduler lane for a command issued by this entity.
+
+        Calls made on behalf of a user overtake automation traffic.
+        """
+        if self._context is not None and self._context.user_id:
+            return Priority.HIGH
+        return Priority.NORMAL
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the fields of the device state this entity shows."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._device.async_add_listener(
+                self._handle_state_update, self._state_fields | {"available"}
+            )
+        )
+        self._update_from_state()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel a pending room temperature update."""
+        await super().async_will_remove_from_hass()
+        if self._unsub_room_temperature:
+            self._unsub_room_temperature()
+            self._unsub_room_temperature = None
+
+    def _update_room_temperature(self) -> bool:
+        """Offer the reported room temperature to the filter.
+
+        Returns True if the shown value changed. A reading held back by
+        the minimum interval is shown once the interval has passed.
+        """
+        reading = self.device_state.room_temperature
+        if reading is None:
+            return False
+        changed = self._room_temperature.update(reading)
+        retry_in = self._room_temperature.retry_in
+        if retry_in is not None and self._unsub_room_temperature is None and self.hass:
+            self._unsub_room_temperature = async_call_later(
+                self.hass, retry_in, self._async_flush_room_temperature
+            )
+        return changed
+
+    @callback
+    def _async_flush_room_temperature(self, _now: datetime) -> None:
+        """Show the room temperature reading held back by the interval."""
+        self._unsub_room_temperature = None
+        if self._room_temperature.flush():
+            self._update_from_state()
+            self.async_write_ha_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Ignore the coordinator; the device state tracker drives writes."""
+
+    @callback
+    def _handle_state_update(self, changed: FrozenSet[str]) -> None:
+        """Update and write state after fields this entity shows changed.
+
+        A room temperature reading the filter drops causes no write.
+        """
+        if (
+            self._room_temperature is not None
+            and changed <= {"room_temperature"}
+            and not self._update_room_temperature()
+        ):
+            return
+        self._update_from_state()
+        self.async_write_ha_state()
+
+    def _update_from_state(self) -> None:
+        """Update entity attributes from ``device_state``."""
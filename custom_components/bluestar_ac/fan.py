@@ -1,6 +1,6 @@
 """Fan platform for Bluestar AC."""
 import logging
-from typing import Any, List, Optional
+from typing import Any, Dict, Optional
 
 from homeassistant.components.fan import (
     FanEntity,
@@ -9,9 +9,16 @@ from homeassistant.components.fan import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
+from homeassistant.util.percentage import (
+    ordered_list_item_to_percentage,
+    percentage_to_ordered_list_item,
+)
+
+from .device_state import DeviceStateTracker
+from .entity import BluestarEntity, async_setup_device_entities
 
-from .const import DOMAIN, CONF_DEVICE_ID, FAN_MODES
+# Fan speed offered as a preset rather than a percentage
+PRESET_AUTO = "auto"
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,93 +28,90 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the Bluestar AC fan platform."""
-    client = hass.data[DOMAIN][config_entry.entry_id]
-    device_id = config_entry.data[CONF_DEVICE_ID]
-    
-    async_add_entities([BluestarACFan(client, device_id)], True)
-
-class BluestarACFan(FanEntity):
-    """Representation of a Bluestar AC fan."""
-    
-    def __init__(self, client, device_id: str):
+    async_setup_device_entities(
+        hass, config_entry, async_add_entities, lambda device: [BluestarACFan(device)]
+    )
+
+class BluestarACFan(BluestarEntity, FanEntity):
+    """Representation of a Bluestar AC fan.
+
+    The fan is on while the AC is. Percentages step through the model's
+    fixed speeds, slowest first; auto is a preset.
+    """
+
+    _state_fields = frozenset({"power", "fan_mode"})
+
+    def __init__(self, device: DeviceStateTracker):
         """Initialize the fan entity."""
-        self._client = client
-        self._device_id = device_id
+        super().__init__(device)
+        device_id = device.device_id
+        fan_modes = device.client.capabilities.fan_modes
         self._attr_unique_id = f"bluestar_ac_fan_{device_id}"
-        self._attr_name = f"Bluestar AC Fan {device_id}"
-        self._attr_has_entity_name = True
-        
-        # Set supported features
-        self._attr_supported_features = FanEntityFeature.SET_SPEED
-        
-        # Set available speeds
-        self._attr_speed_count = len(FAN_MODES)
-        self._attr_percentage = 0
-        self._attr_speed = "auto"
-        
-    @property
-    def available(self) -> bool:
-        """Return True if entity is available."""
-        return self._client._connected
-    
+        self._attr_name = "Fan"
+
+        self._speeds = [mode for mode in fan_modes if mode != PRESET_AUTO]
+        self._attr_speed_count = len(self._speeds)
+        self._attr_supported_features = FanEntityFeature(0)
+        if self._speeds:
+            self._attr_supported_features |= FanEntityFeature.SET_SPEED
+        if PRESET_AUTO in fan_modes:
+            self._attr_supported_features |= FanEntityFeature.PRESET_MODE
+            self._attr_preset_modes = [PRESET_AUTO]
+        self._attr_percentage = None
+        self._attr_preset_mode = None
+        self._attr_is_on = None
+
+        self._update_from_state()
+
+    def _update_from_state(self) -> None:
+        """Update entity attributes from the decoded device state."""
+        state = self.device_state
+        self._attr_is_on = state.power
+        speed = state.fan_mode
+        if speed in self._speeds:
+            self._attr_percentage = ordered_list_item_to_percentage(self._speeds, speed)
+            self._attr_preset_mode = None
+        elif speed == PRESET_AUTO:
+            self._attr_percentage = None
+            self._attr_preset_mode = PRESET_AUTO
+        if state.power is False:
+            self._attr_percentage = 0
+
     @property
-    def is_on(self) -> bool:
-        """Return true if the entity is on."""
-        # The fan is on if the AC is on and not in auto mode
-        return self._attr_speed != "auto"
-    
-    async def async_turn_on(self, speed: Optional[str] = None, percentage: Optional[int] = None, preset_mode: Optional[str] = None, **kwargs: Any) -> None:
-        """Turn the fan on."""
-        if speed:
-            await self.async_set_speed(speed)
-        elif percentage:
-            await self.async_set_percentage(percentage)
-        else:
-            # Default to medium speed
-            await self.async_set_speed("medium")
-    
+    def is_on(self) -> Optional[bool]:
+        """Return True if the AC is powered on."""
+        return self._attr_is_on
+
+    async def async_turn_on(
+        self,
+        percentage: Optional[int] = None,
+        preset_mode: Optional[str] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Power the AC on, at the given speed if there is one."""
+        attrs: Dict[str, Any] = {"power": True}
+        if preset_mode:
+            attrs["fan_mode"] = preset_mode
+        elif percentage and self._speeds:
+            attrs["fan_mode"] = percentage_to_ordered_list_item(self._speeds, percentage)
+        if not await self._client.async_set_state(self._command_priority, **attrs):
+            _LOGGER.error("Failed to turn on fan with %s", attrs)
+
     async def async_turn_off(self, **kwargs: Any) -> None:
-        """Turn the fan off (set to auto)."""
-        await self.async_set_speed("auto")
-    
-    async def async_set_speed(self, speed: str) -> None:
-        """Set the speed of the fan."""
-        if speed not in FAN_MODES:
-            _LOGGER.error("Invalid fan speed: %s", speed)
-            return
-            
-        success = await self.hass.async_add_executor_job(
-            self._client.set_fan_mode, speed
-        )
-        if success:
-            self._attr_speed = speed
-            # Calculate percentage based on speed
-            if speed == "auto":
-                self._attr_percentage = 0
-            elif speed == "low":
-                self._attr_percentage = 33
-            elif speed == "medium":
-                self._attr_percentage = 66
-            elif speed == "high":
-                self._attr_percentage = 100
-            self.async_write_ha_state()
-        else:
-            _LOGGER.error("Failed to set fan speed to %s", speed)
-    
+        """Power the AC off."""
+        if not await self._client.async_set_power(False, self._command_priority):
+            _LOGGER.error("Failed to turn off fan")
+
     async def async_set_percentage(self, percentage: int) -> None:
-        """Set the speed percentage of the fan."""
+        """Set the speed as a percentage; 0 powers the AC off."""
         if percentage == 0:
-            await self.async_set_speed("auto")
-        elif percentage <= 33:
-            await self.async_set_speed("low")
-        elif percentage <= 66:
-            await self.async_set_speed("medium")
-        else:
-            await self.async_set_speed("high")
-    
-    async def async_update(self) -> None:
-        """Update the entity state."""
-        # For now, we'll just update the connection status
-        # In the future, we could implement state polling from the AC
-        if not self._client._connected:
-            await self.hass.async_add_executor_job(self._client.test_connection)
+            await self.async_turn_off()
+            return
+        speed = percentage_to_ordered_list_item(self._speeds, percentage)
+        if not await self._client.async_set_fan_mode(speed, self._command_priority):
+            _LOGGER.error("Failed to set fan speed to %s", speed)
+
+    async def async_set_preset_mode(self, preset_mode: str) -> None:
+        """Set the auto fan speed."""
+        if not await self._client.async_set_fan_mode(preset_mode, self._command_priority):
+            _LOGGER.error("Failed to set fan preset to %s", preset_mode)
@@ -0,0 +1,98 @@
+"""Timing histograms and counters for Bluestar AC operations."""
+import bisect
+from typing import Any, Dict, Tuple
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS: Tuple[float, ...] = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+OPERATIONS = (
+    "login", "get_devices", "get_device_status", "connect", "publish", "shadow_ack",
+    "queue_wait", "set_preferences",
+)
+
+
+class OperationStats:
+    """Latency histogram and success/failure counters of one operation."""
+
+    def __init__(self) -> None:
+        """Initialize empty stats."""
+        self.successes = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        # One extra bucket counts samples above the last bound
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    @property
+    def count(self) -> int:
+        """Return the number of recorded calls."""
+        return self.successes + self.failures
+
+    @property
+    def mean_ms(self) -> float:
+        """Return the mean latency."""
+        return self.total_ms / self.count if self.count else 0.0
+
+    def record(self, milliseconds: float, ok: bool) -> None:
+        """Record one call."""
+        if ok:
+            self.successes += 1
+        else:
+            self.failures += 1
+        self.total_ms += milliseconds
+        self.last_ms = milliseconds
+        self.max_ms = max(self.max_ms, milliseconds)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, milliseconds)] += 1
+
+    def percentile(self, pct: float) -> float:
+        """Estimate a percentile as the upper bound of its bucket."""
+        if not self.count:
+            return 0.0
+        target = pct / 100 * self.count
+        seen = 0
+        for bound, hits in zip(BUCKETS_MS, self.buckets):
+            seen += hits
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the stats as a JSON-friendly dict."""
+        return {
+            "count": self.count,
+            "successes": self.successes,
+            "failures": self.failures,
+            "mean_ms": round(self.mean_ms, 1),
+            "last_ms": round(self.last_ms, 1),
+            "max_ms": round(self.max_ms, 1),
+            "p50_ms": round(self.percentile(50), 1),
+            "p95_ms": round(self.percentile(95), 1),
+            "p99_ms": round(self.percentile(99), 1),
+            "histogram": {
+                f"le_{bound:g}": hits for bound, hits in zip(BUCKETS_MS, self.buckets)
+            } | {"inf": self.buckets[-1]},
+        }
+
+
+class Metrics:
+    """Per-operation stats shared by the REST and MQTT clients of an account."""
+
+    def __init__(self) -> None:
+        """Initialize stats for every known operation."""
+        self.operations: Dict[str, OperationStats] = {
+            operation: OperationStats() for operation in OPERATIONS
+        }
+
+    def record(self, operation: str, seconds: float, ok: bool) -> None:
+        """Record one call of an operation that took ``seconds``."""
+        stats = self.operations.get(operation)
+        if stats is None:
+            stats = self.operations[operation] = OperationStats()
+        stats.record(seconds * 1000, ok)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Return the stats of every operation."""
+        return {
+            operation: stats.as_dict() for operation, stats in self.operations.items()
+        }
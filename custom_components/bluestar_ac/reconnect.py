@@ -0,0 +1,128 @@
+"""Reconnect supervision for the Bluestar AC MQTT connection."""
+import asyncio
+import logging
+import random
+import time
+from enum import Enum
+from typing import Awaitable, Callable, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+BASE_DELAY = 2  # seconds
+MAX_DELAY = 300  # seconds
+FAILURE_THRESHOLD = 3
+
+
+class CircuitState(str, Enum):
+    """State of the reconnect circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class ReconnectSupervisor:
+    """Single-flight reconnects with exponential backoff and a circuit breaker.
+
+    Every caller that needs the connection goes through
+    ``async_ensure_connected``: concurrent callers share one attempt, and
+    while a backoff delay is running they fail fast instead of logging in
+    again. After ``failure_threshold`` consecutive failures the circuit
+    opens and ``available`` turns False until an attempt succeeds.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[bool]],
+        is_connected: Callable[[], bool],
+        base_delay: float = BASE_DELAY,
+        max_delay: float = MAX_DELAY,
+        failure_threshold: int = FAILURE_THRESHOLD,
+    ):
+        """Initialize the supervisor."""
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._connect = connect
+        self._is_connected = is_connected
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._failure_threshold = failure_threshold
+        self._next_attempt = 0.0
+        self._attempt: Optional[asyncio.Future] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self.on_reconnect: Optional[Callable[[], None]] = None
+
+    @property
+    def available(self) -> bool:
+        """Return False while the circuit is open."""
+        return self.state != CircuitState.OPEN
+
+    @property
+    def retry_in(self) -> float:
+        """Return the seconds left until the next attempt is allowed."""
+        return max(0.0, self._next_attempt - time.monotonic())
+
+    async def async_ensure_connected(self) -> bool:
+        """Return True once connected, attempting at most one connect at a time."""
+        if self._is_connected():
+            return True
+        if self._attempt is None:
+            if self.retry_in > 0:
+                return False
+            self._attempt = asyncio.ensure_future(self._async_attempt())
+        return await asyncio.shield(self._attempt)
+
+    async def _async_attempt(self) -> bool:
+        """Run one connect attempt and update the breaker."""
+        if self.state == CircuitState.OPEN:
+            self.state = CircuitState.HALF_OPEN
+        try:
+            connected = await self._connect()
+        except Exception:
+            _LOGGER.exception("Unexpected error while connecting")
+            connected = False
+        finally:
+            self._attempt = None
+
+        if connected:
+            if self.failures:
+                _LOGGER.info("Reconnected after %d failed attempts", self.failures)
+            self.failures = 0
+            self.state = CircuitState.CLOSED
+            self._next_attempt = 0.0
+            return True
+
+        self.failures += 1
+        delay = min(self._max_delay, self._base_delay * 2 ** (self.failures - 1))
+        # Jitter spreads out reconnects from many installs after an outage
+        delay = random.uniform(delay / 2, delay)
+        self._next_attempt = time.monotonic() + delay
+        if self.failures >= self._failure_threshold or self.state == CircuitState.HALF_OPEN:
+            self.state = CircuitState.OPEN
+        _LOGGER.warning(
+            "Connection attempt %d failed, next attempt in %.0fs (circuit %s)",
+            self.failures,
+            delay,
+            self.state.value,
+        )
+        return False
+
+    def async_schedule_reconnect(self) -> None:
+        """Keep reconnecting in the background until the connection is back."""
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.get_running_loop().create_task(
+                self._async_reconnect_loop()
+            )
+
+    async def _async_reconnect_loop(self) -> None:
+        """Retry with backoff until connected, then notify."""
+        while not await self.async_ensure_connected():
+            await asyncio.sleep(max(self.retry_in, 0.1))
+        if self.on_reconnect:
+            self.on_reconnect()
+
+    def stop(self) -> None:
+        """Cancel the background reconnect loop."""
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
@@ -0,0 +1,180 @@
+"""Per-account command scheduling for Bluestar AC."""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from .metrics import Metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+COMMAND_RATE = 20  # commands per second
+COMMAND_BURST = 20
+
+
+class Priority(IntEnum):
+    """Scheduling lane of a command; lower values go first."""
+
+    HIGH = 0
+    NORMAL = 1
+
+
+class _Job:
+    """A queued send and the future its submitter awaits."""
+
+    __slots__ = ("device_id", "send", "priority", "future", "queued_at")
+
+    def __init__(
+        self,
+        device_id: str,
+        send: Callable[[], Awaitable[bool]],
+        priority: Priority,
+        future: asyncio.Future,
+    ):
+        """Initialize the job."""
+        self.device_id = device_id
+        self.send = send
+        self.priority = priority
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+class CommandScheduler:
+    """Token-bucket rate limit with per-device FIFO and priority lanes.
+
+    Commands for one device run strictly in order, one at a time. Across
+    devices, the next command is the oldest one in the highest lane whose
+    device is idle, so a power-off or a user's command overtakes queued
+    automation traffic for other ACs. At most ``burst`` commands go out
+    back to back; after that they are paced at ``rate`` per second.
+    """
+
+    def __init__(
+        self,
+        rate: float = COMMAND_RATE,
+        burst: int = COMMAND_BURST,
+        metrics: Optional[Metrics] = None,
+    ):
+        """Initialize the scheduler."""
+        self.rate = rate
+        self.burst = burst
+        self.max_depth = 0
+        self._metrics = metrics
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._queues: Dict[str, Deque[_Job]] = {}
+        self._busy: Set[str] = set()
+        self._ready: List[Tuple[int, int, _Job]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    @property
+    def depth(self) -> int:
+        """Return the number of commands queued or being sent."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the queue state for diagnostics."""
+        lanes = {priority.name.lower(): 0 for priority in Priority}
+        for queue in self._queues.values():
+            for job in queue:
+                lanes[job.priority.name.lower()] += 1
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "lanes": lanes,
+            "in_flight": len(self._busy),
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._take_refill(), 1),
+        }
+
+    async def async_submit(
+        self,
+        device_id: str,
+        send: Callable[[], Awaitable[bool]],
+        priority: Priority = Priority.NORMAL,
+    ) -> bool:
+        """Queue a send and return its result once it has run."""
+        job = _Job(device_id, send, priority, asyncio.get_running_loop().create_future())
+        queue = self._queues.setdefault(device_id, deque())
+        queue.append(job)
+        if len(queue) == 1 and device_id not in self._busy:
+            self._push_ready(job)
+        self.max_depth = max(self.max_depth, self.depth)
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        return await asyncio.shield(job.future)
+
+    def _push_ready(self, job: _Job) -> None:
+        """Make a device's head job eligible to run."""
+        heapq.heappush(self._ready, (job.priority, next(self._sequence), job))
+        self._wakeup.set()
+
+    def _take_refill(self) -> float:
+        """Add the tokens earned since the last refill and return the level."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        return self._tokens
+
+    async def _run(self) -> None:
+        """Start eligible jobs as tokens become available."""
+        while True:
+            while not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            if self._take_refill() < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+            self._tokens -= 1
+            _, _, job = heapq.heappop(self._ready)
+            self._busy.add(job.device_id)
+            task = asyncio.get_running_loop().create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job: _Job) -> None:
+        """Run a job, then release its device for the next one."""
+        wait = time.monotonic() - job.queued_at
+        if self._metrics:
+            self._metrics.record("queue_wait", wait, True)
+        if wait > 1:
+            _LOGGER.debug("Command for %s waited %.1fs in queue", job.device_id, wait)
+        result = False
+        try:
+            result = await job.send()
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Unexpected error sending command to %s", job.device_id)
+        finally:
+            if not job.future.done():
+                job.future.set_result(result)
+            self._busy.discard(job.device_id)
+            queue = self._queues.get(job.device_id)
+            if queue:
+                queue.popleft()
+                if queue:
+                    self._push_ready(queue[0])
+                else:
+                    del self._queues[job.device_id]
+
+    def stop(self) -> None:
+        """Cancel the worker and fail every queued command."""
+        if self._worker:
+            self._worker.cancel()
+            self._worker = None
+        for task in list(self._running):
+            task.cancel()
+        for queue in self._queues.values():
+            for job in queue:
+                if not job.future.done():
+                    job.future.set_result(False)
+        self._queues.clear()
+        self._busy.clear()
+        self._ready.clear()
@@ -0,0 +1,175 @@
+"""Sensor platform for Bluestar AC."""
+import logging
+from typing import Any, Dict, List, Optional
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTemperature, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN, DATA_ACCOUNT
+from .device_state import DeviceStateTracker
+from .entity import BluestarEntity, async_setup_device_entities
+from .metrics import OPERATIONS, Metrics, OperationStats
+from .scheduler import CommandScheduler
+from .temperature import RoomTemperature, room_temperature
+
+_LOGGER = logging.getLogger(__name__)
+
+OPERATION_NAMES = {
+    "login": "Login",
+    "get_devices": "Device list",
+    "get_device_status": "Device status",
+    "connect": "MQTT connect",
+    "publish": "MQTT publish",
+    "shadow_ack": "Shadow acknowledgement",
+    "queue_wait": "Command queue wait",
+    "set_preferences": "Preferences write",
+}
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the room temperature and diagnostic sensors."""
+    data = hass.data[DOMAIN][config_entry.entry_id]
+    account = data[DATA_ACCOUNT]
+    metrics = account.metrics
+
+    async_setup_device_entities(
+        hass,
+        config_entry,
+        async_add_entities,
+        lambda device: [
+            BluestarRoomTemperatureSensor(device, room_temperature(config_entry.options))
+        ],
+    )
+
+    sensors: List[SensorEntity] = [
+        BluestarQueueDepthSensor(account.scheduler, config_entry.entry_id)
+    ]
+    for operation in OPERATIONS:
+        sensors.extend([
+            BluestarLatencySensor(metrics, operation, config_entry.entry_id),
+            BluestarFailureSensor(metrics, operation, config_entry.entry_id),
+        ])
+
+    async_add_entities(sensors)
+
+class BluestarRoomTemperatureSensor(BluestarEntity, SensorEntity):
+    """Room temperature reported by an AC, written only on real changes."""
+
+    _attr_device_class = SensorDeviceClass.TEMPERATURE
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
+    _state_fields = frozenset({"room_temperature"})
+
+    def __init__(self, device: DeviceStateTracker, room_temperature: RoomTemperature):
+        """Initialize the room temperature sensor."""
+        super().__init__(device)
+        self._room_temperature = room_temperature
+        self._attr_unique_id = f"bluestar_ac_room_temperature_{device.device_id}"
+        self._attr_name = "Room temperature"
+        self._update_from_state()
+
+    def _update_from_state(self) -> None:
+        """Update the shown temperature from the decoded device state."""
+        self._update_room_temperature()
+        self._attr_native_value = self._room_temperature.value
+
+class BluestarMetricSensor(SensorEntity):
+    """Base class for sensors reading the account's operation stats.
+
+    The stats are plain counters updated by the clients, so the sensors
+    poll them instead of being pushed every call.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, metrics: Metrics, operation: str):
+        """Initialize the sensor."""
+        self._metrics = metrics
+        self._operation = operation
+
+    @property
+    def _stats(self) -> OperationStats:
+        """Return the stats of this sensor's operation."""
+        return self._metrics.operations[self._operation]
+
+class BluestarLatencySensor(BluestarMetricSensor):
+    """Mean latency of an operation, with its histogram as attributes."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 0
+
+    def __init__(self, metrics: Metrics, operation: str, entry_id: str):
+        """Initialize the latency sensor."""
+        super().__init__(metrics, operation)
+        self._attr_unique_id = f"bluestar_ac_{operation}_latency_{entry_id}"
+        self._attr_name = f"Bluestar AC {OPERATION_NAMES[operation]} latency"
+
+    @property
+    def native_value(self) -> Optional[float]:
+        """Return the mean latency, or None before the first call."""
+        if not self._stats.count:
+            return None
+        return round(self._stats.mean_ms, 1)
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return percentiles, counters and the histogram."""
+        return self._stats.as_dict()
+
+class BluestarFailureSensor(BluestarMetricSensor):
+    """Number of failed calls of an operation."""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, metrics: Metrics, operation: str, entry_id: str):
+        """Initialize the failure counter."""
+        super().__init__(metrics, operation)
+        self._attr_unique_id = f"bluestar_ac_{operation}_failures_{entry_id}"
+        self._attr_name = f"Bluestar AC {OPERATION_NAMES[operation]} failures"
+
+    @property
+    def native_value(self) -> int:
+        """Return the failure count."""
+        return self._stats.failures
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return the success count alongside."""
+        return {"successes": self._stats.successes}
+
+class BluestarQueueDepthSensor(SensorEntity):
+    """Number of commands waiting in the account's scheduler."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, scheduler: CommandScheduler, entry_id: str):
+        """Initialize the queue depth sensor."""
+        self._scheduler = scheduler
+        self._attr_unique_id = f"bluestar_ac_queue_depth_{entry_id}"
+        self._attr_name = "Bluestar AC Command queue depth"
+
+    @property
+    def native_value(self) -> int:
+        """Return the number of commands queued or being sent."""
+        return self._scheduler.depth
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return the per-lane depth and the high-water mark."""
+        stats = self._scheduler.as_dict()
+        return {"max_depth": stats["max_depth"], "lanes": stats["lanes"]}
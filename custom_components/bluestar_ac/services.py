@@ -0,0 +1,170 @@
+"""Services for Bluestar AC."""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+
+import voluptuous as vol
+
+from homeassistant.const import ATTR_AREA_ID, ATTR_DEVICE_ID, ATTR_ENTITY_ID, ENTITY_MATCH_ALL
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+
+from .bluestar_client import BluestarACClient
+from .const import (
+    DOMAIN,
+    DATA_CLIENTS,
+    SERVICE_APPLY_STATE,
+    DEFAULT_SERVICE_CONCURRENCY,
+)
+from .scheduler import Priority
+from .transport import TRANSPORT_MQTT, TRANSPORT_REST
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_TRANSPORT = "transport"
+ATTR_CONCURRENCY = "concurrency"
+ATTR_FORCE = "force"
+
+TRANSPORT_AUTO = "auto"
+
+# Keyword arguments of BluestarACClient.async_set_state
+STATE_ATTRS = (
+    "power",
+    "hvac_mode",
+    "temperature",
+    "fan_mode",
+    "swing_mode",
+    "preset_mode",
+    "display",
+    "buzzer",
+)
+
+APPLY_STATE_SCHEMA = vol.All(
+    vol.Schema({
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Optional("power"): cv.boolean,
+        vol.Optional("hvac_mode"): cv.string,
+        vol.Optional("temperature"): vol.Coerce(float),
+        vol.Optional("fan_mode"): cv.string,
+        vol.Optional("swing_mode"): cv.string,
+        vol.Optional("preset_mode"): cv.string,
+        vol.Optional("display"): cv.boolean,
+        vol.Optional("buzzer"): cv.boolean,
+        vol.Optional(ATTR_TRANSPORT, default=TRANSPORT_AUTO): vol.In(
+            [TRANSPORT_AUTO, TRANSPORT_MQTT, TRANSPORT_REST]
+        ),
+        vol.Optional(ATTR_CONCURRENCY, default=DEFAULT_SERVICE_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+        vol.Optional(ATTR_FORCE, default=False): cv.boolean,
+    }),
+    cv.has_at_least_one_key(*STATE_ATTRS),
+)
+
+
+def _clients(hass: HomeAssistant) -> Dict[str, BluestarACClient]:
+    """Return the control clients of every loaded entry by device ID."""
+    clients: Dict[str, BluestarACClient] = {}
+    for data in hass.data.get(DOMAIN, {}).values():
+        if isinstance(data, dict) and DATA_CLIENTS in data:
+            clients.update(data[DATA_CLIENTS])
+    return clients
+
+
+def _target_device_ids(hass: HomeAssistant, call: ServiceCall) -> List[str]:
+    """Return the thing IDs of the ACs a call targets.
+
+    Entities and areas count through the AC device they belong to. A call
+    without a target, or targeting all entities, covers every AC.
+    """
+    if not any(key in call.data for key in (ATTR_ENTITY_ID, ATTR_DEVICE_ID, ATTR_AREA_ID)):
+        return list(_clients(hass))
+    if call.data.get(ATTR_ENTITY_ID) == ENTITY_MATCH_ALL:
+        return list(_clients(hass))
+
+    selected = async_extract_referenced_entity_ids(hass, call)
+    entity_registry = er.async_get(hass)
+    device_registry = dr.async_get(hass)
+    devices = set(selected.referenced_devices)
+    for entity_id in selected.referenced | selected.indirectly_referenced:
+        entry = entity_registry.async_get(entity_id)
+        if entry is not None and entry.platform == DOMAIN and entry.device_id:
+            devices.add(entry.device_id)
+
+    thing_ids = set()
+    for device_id in devices:
+        device = device_registry.async_get(device_id)
+        if device is not None:
+            thing_ids.update(
+                identifier for domain, identifier in device.identifiers if domain == DOMAIN
+            )
+    return sorted(thing_ids)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Bluestar AC services."""
+
+    async def async_apply_state(call: ServiceCall) -> ServiceResponse:
+        """Apply one state to many ACs at once.
+
+        Commands go out concurrently, at most ``concurrency`` at a time,
+        over whichever of the shared MQTT connection and REST preference
+        writes is performing better, unless ``transport`` pins one; the
+        account's scheduler still paces them. The response reports the
+        result of every targeted AC.
+        """
+        clients = _clients(hass)
+        devices = _target_device_ids(hass, call)
+        attrs = {key: call.data[key] for key in STATE_ATTRS if key in call.data}
+        transport = call.data[ATTR_TRANSPORT]
+        if transport == TRANSPORT_AUTO:
+            transport = None
+        priority = Priority.HIGH if call.context.user_id else Priority.NORMAL
+        force = call.data[ATTR_FORCE]
+        semaphore = asyncio.Semaphore(call.data[ATTR_CONCURRENCY])
+
+        async def apply(device_id: str) -> Dict[str, Any]:
+            client = clients.get(device_id)
+            if client is None:
+                return {"success": False, "error": "unknown device"}
+            async with semaphore:
+                start = time.monotonic()
+                success = await client.async_set_state(priority, force, transport, **attrs)
+                return {
+                    "success": success,
+                    "ms": round((time.monotonic() - start) * 1000, 1),
+                }
+
+        start = time.monotonic()
+        results = dict(zip(devices, await asyncio.gather(*(
+            apply(device_id) for device_id in devices
+        ))))
+        failed = [device_id for device_id, result in results.items() if not result["success"]]
+        if failed:
+            _LOGGER.warning("apply_state failed for %s", ", ".join(failed))
+        if not call.return_response:
+            return None
+        return {
+            "results": results,
+            "succeeded": len(results) - len(failed),
+            "failed": len(failed),
+            "ms": round((time.monotonic() - start) * 1000, 1),
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_APPLY_STATE,
+        async_apply_state,
+        schema=APPLY_STATE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -0,0 +1,92 @@
+"""Background renewal of the Bluestar session before it expires."""
+import asyncio
+import logging
+import random
+import time
+from typing import Callable, Optional
+
+from .api_client import BluestarClient
+from .const import SESSION_REFRESH_MARGIN
+
+_LOGGER = logging.getLogger(__name__)
+
+RETRY_DELAY = 30  # seconds
+
+
+class SessionRefresher:
+    """Renew the session and IoT credentials before they expire.
+
+    The client otherwise only logs in again once a call finds the session
+    expired or gets a 401, which makes that call pay for the login. The
+    refresher logs in ``margin`` seconds early instead, while the old
+    session still works, and hands the fresh credentials to
+    ``on_refresh``. Failed renewals are retried every ``retry_delay``
+    seconds; the reactive login remains as a fallback and is the only
+    path while there is no session at all.
+    """
+
+    def __init__(
+        self,
+        api: BluestarClient,
+        margin: float = SESSION_REFRESH_MARGIN,
+        retry_delay: float = RETRY_DELAY,
+    ):
+        """Initialize the refresher."""
+        self.failures = 0
+        self._api = api
+        self._margin = margin
+        self._retry_delay = retry_delay
+        self._refresh_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.on_refresh: Optional[Callable[[], None]] = None
+
+    @property
+    def refresh_in(self) -> Optional[float]:
+        """Return the seconds until the next renewal, or None if stopped."""
+        if self._task is None:
+            return None
+        return max(0.0, self._refresh_at - time.monotonic())
+
+    def start(self) -> None:
+        """Start renewing in the background."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._async_run())
+
+    async def _async_run(self) -> None:
+        """Sleep until shortly before expiry, then renew."""
+        while True:
+            if self.failures:
+                delay = self._retry_delay
+            elif not self._api.session_expires_in:
+                # No live session to renew; the next call logs in as usual
+                self._refresh_at = time.monotonic() + self._retry_delay
+                await asyncio.sleep(self._retry_delay)
+                continue
+            else:
+                # Jitter spreads out renewals of accounts logged in together
+                delay = max(0.0, self._api.session_expires_in - random.uniform(
+                    self._margin / 2, self._margin
+                ))
+            self._refresh_at = time.monotonic() + delay
+            await asyncio.sleep(delay)
+
+            if await self._api.refresh_session():
+                if self.failures:
+                    _LOGGER.info("Session renewed after %d failed attempts", self.failures)
+                self.failures = 0
+                _LOGGER.debug(
+                    "Session renewed, valid for %.0fs", self._api.session_expires_in
+                )
+                if self.on_refresh:
+                    self.on_refresh()
+            else:
+                self.failures += 1
+                _LOGGER.warning(
+                    "Session renewal failed, retrying in %.0fs", self._retry_delay
+                )
+
+    def stop(self) -> None:
+        """Cancel the background renewal."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,69 @@
+"""Deadband and rate limiting for the reported room temperature."""
+import time
+from typing import Any, Mapping, Optional
+
+from .const import (
+    CONF_TEMPERATURE_DEADBAND,
+    CONF_TEMPERATURE_INTERVAL,
+    DEFAULT_TEMPERATURE_DEADBAND,
+    DEFAULT_TEMPERATURE_INTERVAL,
+)
+
+
+class RoomTemperature:
+    """Decides which room temperature readings are worth a state write.
+
+    A reading within ``deadband`` of the shown value is dropped, so sensor
+    noise such as 30.5 -> 30.4 -> 30.5 does not produce a recorder row
+    each time. A larger change is shown at most once per ``min_interval``
+    seconds; a reading held back by the interval is kept in ``pending``
+    until ``flush`` is called.
+    """
+
+    def __init__(self, deadband: float, min_interval: float):
+        """Initialize without a reading."""
+        self.value: Optional[float] = None
+        self.pending: Optional[float] = None
+        self._deadband = deadband
+        self._min_interval = min_interval
+        self._shown_at = 0.0
+
+    @property
+    def retry_in(self) -> Optional[float]:
+        """Return the seconds until a held-back reading may be shown."""
+        if self.pending is None:
+            return None
+        return max(0.0, self._shown_at + self._min_interval - time.monotonic())
+
+    def update(self, reading: float) -> bool:
+        """Offer a reading and return True if the shown value changed."""
+        if self.value is not None:
+            if abs(reading - self.value) < self._deadband:
+                self.pending = None
+                return False
+            if time.monotonic() - self._shown_at < self._min_interval:
+                self.pending = reading
+                return False
+        self._show(reading)
+        return True
+
+    def flush(self) -> bool:
+        """Show a held-back reading and return True if there was one."""
+        if self.pending is None:
+            return False
+        self._show(self.pending)
+        return True
+
+    def _show(self, reading: float) -> None:
+        """Make a reading the shown value."""
+        self.value = reading
+        self.pending = None
+        self._shown_at = time.monotonic()
+
+
+def room_temperature(options: Mapping[str, Any]) -> RoomTemperature:
+    """Return a room temperature filter configured from entry options."""
+    return RoomTemperature(
+        options.get(CONF_TEMPERATURE_DEADBAND, DEFAULT_TEMPERATURE_DEADBAND),
+        options.get(CONF_TEMPERATURE_INTERVAL, DEFAULT_TEMPERATURE_INTERVAL),
+    )
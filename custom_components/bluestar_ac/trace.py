@@ -0,0 +1,64 @@
+"""Bounded trace of the traffic between the client layer and the cloud."""
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+TRACE_SIZE = 500
+
+# Event directions
+OUTGOING = "out"
+INCOMING = "in"
+
+
+class TraceRecorder:
+    """Ring buffer of outgoing payloads and incoming responses.
+
+    Every event carries its offset in seconds from the creation of the
+    recorder on the monotonic clock, so a trace dumped through diagnostics
+    keeps the original pacing and can be replayed with ``tools/replay.py``.
+    Once ``size`` events are stored the oldest ones are dropped.
+    """
+
+    def __init__(self, size: int = TRACE_SIZE):
+        """Initialize an empty trace."""
+        self.dropped = 0
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._start = time.monotonic()
+
+    def record(
+        self,
+        direction: str,
+        kind: str,
+        target: str,
+        payload: Optional[Any] = None,
+        **extra: Any,
+    ) -> None:
+        """Record one event.
+
+        ``kind`` is ``rest``, ``mqtt`` or ``connection``; ``target`` is
+        the request path or the MQTT topic.
+        """
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        event = {
+            "t": round(time.monotonic() - self._start, 4),
+            "dir": direction,
+            "kind": kind,
+            "target": target,
+        }
+        if payload is not None:
+            event["payload"] = payload
+        event.update(extra)
+        self._events.append(event)
+
+    def as_list(self) -> List[Dict[str, Any]]:
+        """Return the recorded events, oldest first."""
+        return list(self._events)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the trace for diagnostics."""
+        return {
+            "size": self._events.maxlen,
+            "dropped": self.dropped,
+            "events": self.as_list(),
+        }
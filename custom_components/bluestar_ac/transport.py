@@ -0,0 +1,116 @@
+"""Adaptive choice between the MQTT shadow and REST preferences."""
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+TRANSPORT_MQTT = "mqtt"
+TRANSPORT_REST = "rest"
+TRANSPORTS = (TRANSPORT_MQTT, TRANSPORT_REST)
+
+EWMA_ALPHA = 0.2
+FAILURE_THRESHOLD = 3
+COOLDOWN = 60  # seconds
+# Floor of the success rate when weighing latency, so a path that keeps
+# failing is expensive rather than infinitely so
+MIN_SUCCESS_RATE = 0.05
+
+
+class TransportHealth:
+    """Smoothed latency and success rate of one transport."""
+
+    def __init__(self) -> None:
+        """Initialize with no samples."""
+        self.latency: Optional[float] = None
+        self.success_rate = 1.0
+        self.failures = 0
+        self.samples = 0
+        self.retry_at = 0.0
+
+    @property
+    def cost(self) -> float:
+        """Return the expected time to a successful send, in seconds."""
+        return (self.latency or 0.0) / max(self.success_rate, MIN_SUCCESS_RATE)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the health as a JSON-friendly dict."""
+        return {
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "success_rate": round(self.success_rate, 3),
+            "failures": self.failures,
+            "samples": self.samples,
+            "cooldown": round(max(self.retry_at - time.monotonic(), 0), 1),
+        }
+
+
+class TransportSelector:
+    """Orders the command transports of an account by recent performance.
+
+    Every result updates an exponentially weighted moving average of the
+    transport's latency and success rate, and commands try the transport
+    with the lower expected time to success first. A transport not
+    measured yet is tried first. After ``failure_threshold`` consecutive
+    failures a transport goes last for ``cooldown`` seconds, then gets a
+    probe command; it stays available as a last resort throughout, so a
+    command only fails if every transport does.
+    """
+
+    def __init__(
+        self,
+        transports: Iterable[str] = TRANSPORTS,
+        alpha: float = EWMA_ALPHA,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        cooldown: float = COOLDOWN,
+    ):
+        """Initialize the selector."""
+        self.health: Dict[str, TransportHealth] = {
+            transport: TransportHealth() for transport in transports
+        }
+        self._alpha = alpha
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+
+    def order(self, mqtt_connected: bool = True) -> List[str]:
+        """Return the transports in the order a command should try them.
+
+        MQTT goes last while the connection is down, since sending would
+        first have to reconnect.
+        """
+        now = time.monotonic()
+
+        def rank(transport: str) -> tuple:
+            health = self.health[transport]
+            down = health.retry_at > now or (
+                transport == TRANSPORT_MQTT and not mqtt_connected
+            )
+            # A transport whose cooldown has passed is probed first
+            probe = health.failures >= self._failure_threshold and not down
+            return (down, not probe, health.cost)
+
+        return sorted(self.health, key=rank)
+
+    def record(self, transport: str, seconds: float, ok: bool) -> None:
+        """Record the outcome of one send over a transport."""
+        health = self.health.get(transport)
+        if health is None:
+            return
+        alpha = self._alpha
+        health.samples += 1
+        health.success_rate += alpha * ((1.0 if ok else 0.0) - health.success_rate)
+        if ok:
+            # Failures are often fast, so only successes count as latency
+            if health.latency is None:
+                health.latency = seconds
+            else:
+                health.latency += alpha * (seconds - health.latency)
+            health.failures = 0
+            health.retry_at = 0.0
+            return
+        health.failures += 1
+        if health.failures >= self._failure_threshold:
+            health.retry_at = time.monotonic() + self._cooldown
+
+    def as_dict(self, mqtt_connected: bool = True) -> Dict[str, Any]:
+        """Return the health of every transport and the current order."""
+        return {
+            "order": self.order(mqtt_connected),
+            **{transport: health.as_dict() for transport, health in self.health.items()},
+        }
@@ -0,0 +1 @@
+"""Tests for the Bluestar AC integration."""
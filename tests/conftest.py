@@ -0,0 +1,31 @@
+"""Fixtures shared by the Bluestar AC tests."""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Import the integration before tools/_bootstrap can register a bare package
+import custom_components.bluestar_ac  # noqa: F401
+
+TOOLS = Path(__file__).resolve().parents[1] / "tools"
+if str(TOOLS) not in sys.path:
+    sys.path.insert(0, str(TOOLS))
+
+from fake_cloud import MODEL_CONFIG  # noqa: E402
+
+from custom_components.bluestar_ac.capabilities import (  # noqa: E402
+    Capabilities,
+    parse_model_config,
+)
+
+
+@pytest.fixture
+def model_config():
+    """Return the ``model_config`` the fake cloud serves."""
+    return MODEL_CONFIG
+
+
+@pytest.fixture
+def capabilities(model_config) -> Capabilities:
+    """Return the capabilities compiled from the fake cloud's model."""
+    return parse_model_config(model_config)
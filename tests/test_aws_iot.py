@@ -0,0 +1,233 @@
+"""Tests for the MQTT packet codec and SigV4 presigning."""
+import base64
+import datetime
+import struct
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from custom_components.bluestar_ac.aws_iot import (
+    DEFAULT_REGION,
+    MAX_SUBSCRIPTIONS,
+    PUBLISH,
+    SUBSCRIBE,
+    UNSUBSCRIBE,
+    BluestarIoTConnection,
+    IoTConnectionError,
+    IoTCredentials,
+    _encode_length,
+    _encode_string,
+    decode_credentials,
+    decode_publish,
+    encode_connect,
+    encode_publish,
+    encode_subscribe,
+    encode_unsubscribe,
+    presign_url,
+    read_packet,
+)
+
+ENDPOINT = "a1b2c3d4e5f6g7-ats.iot.ap-south-1.amazonaws.com"
+CREDENTIALS = IoTCredentials(ENDPOINT, "AKIDEXAMPLE", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY")
+NOW = datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.parametrize(
+    ("length", "encoded"),
+    [
+        (0, b"\x00"),
+        (127, b"\x7f"),
+        (128, b"\x80\x01"),
+        (16383, b"\xff\x7f"),
+        (16384, b"\x80\x80\x01"),
+        (268435455, b"\xff\xff\xff\x7f"),
+    ],
+)
+def test_encode_length(length, encoded):
+    """Remaining lengths are encoded as MQTT varints."""
+    assert _encode_length(length) == encoded
+
+
+def test_encode_connect():
+    """CONNECT asks for a clean MQTT 3.1.1 session."""
+    body = b"\x00\x04MQTT\x04\x02\x00\x3c\x00\x03u-1"
+    assert encode_connect("u-1", keepalive=60) == bytes([0x10, len(body)]) + body
+
+
+def test_encode_subscribe():
+    """SUBSCRIBE carries the packet ID and QoS 0 for every topic."""
+    packet = encode_subscribe(7, ["a/b", "c"])
+    body = b"\x00\x07" + b"\x00\x03a/b\x00" + b"\x00\x01c\x00"
+    assert packet == bytes([SUBSCRIBE | 0x02, len(body)]) + body
+
+
+def test_encode_unsubscribe():
+    """UNSUBSCRIBE lists the topics without a QoS."""
+    packet = encode_unsubscribe(8, ["a/b"])
+    body = b"\x00\x08" + b"\x00\x03a/b"
+    assert packet == bytes([UNSUBSCRIBE | 0x02, len(body)]) + body
+
+
+@pytest.mark.parametrize("size", [0, 10, 200, 20000])
+def test_publish_round_trip(size):
+    """A published packet reads back as the same topic and payload."""
+    topic = "$aws/things/fa0000000001/shadow/update"
+    payload = bytes(index % 256 for index in range(size))
+    buffer = bytearray(encode_publish(topic, payload))
+
+    first_byte, body = read_packet(buffer)
+
+    assert first_byte == PUBLISH
+    assert not buffer
+    assert decode_publish(first_byte, body) == (topic, payload, 0, None)
+
+
+def test_decode_publish_qos1():
+    """A QoS 1 PUBLISH has a packet ID between topic and payload."""
+    body = _encode_string("t/1") + struct.pack("!H", 42) + b"{}"
+    assert decode_publish(PUBLISH | 0x02, body) == ("t/1", b"{}", 1, 42)
+
+
+def test_read_packet_incomplete():
+    """A partial packet is left in the buffer until the rest arrives."""
+    packet = encode_publish("t", b"x" * 300)
+    buffer = bytearray(packet[:1])
+    assert read_packet(buffer) is None
+    buffer.extend(packet[1:100])
+    assert read_packet(buffer) is None
+    assert buffer == packet[:100]
+
+    buffer.extend(packet[100:])
+    assert read_packet(buffer) is not None
+    assert not buffer
+
+
+def test_read_packet_several():
+    """Packets sharing one WebSocket frame are read one at a time."""
+    buffer = bytearray(encode_publish("a", b"1") + encode_publish("b", b"2") + b"\xd0")
+
+    assert decode_publish(*read_packet(buffer))[:2] == ("a", b"1")
+    assert decode_publish(*read_packet(buffer))[:2] == ("b", b"2")
+    assert read_packet(buffer) is None
+    assert buffer == b"\xd0"
+
+
+def test_decode_credentials():
+    """The ``mi`` blob decodes to the endpoint, keys and session token."""
+    mi = base64.b64encode(f"{ENDPOINT}::AKID::secret::token".encode()).decode()
+    credentials = decode_credentials(mi)
+    assert credentials == IoTCredentials(ENDPOINT, "AKID", "secret", "token")
+    assert credentials.region == "ap-south-1"
+
+
+def test_decode_credentials_malformed():
+    """A blob without the three required fields is rejected."""
+    with pytest.raises(ValueError):
+        decode_credentials(base64.b64encode(b"endpoint::key").decode())
+
+
+def test_region_default():
+    """An endpoint without a region falls back to the default one."""
+    assert IoTCredentials("ws://127.0.0.1:8080", "a", "b").region == DEFAULT_REGION
+
+
+def test_presign_url():
+    """The URL is query-signed for the endpoint's region and the given time."""
+    url = presign_url(CREDENTIALS, NOW)
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+
+    assert parts.scheme == "wss"
+    assert parts.netloc == ENDPOINT
+    assert parts.path == "/mqtt"
+    assert query["X-Amz-Algorithm"] == ["AWS4-HMAC-SHA256"]
+    assert query["X-Amz-Credential"] == [
+        "AKIDEXAMPLE/20240102/ap-south-1/iotdata/aws4_request"
+    ]
+    assert query["X-Amz-Date"] == ["20240102T030405Z"]
+    assert query["X-Amz-SignedHeaders"] == ["host"]
+    # Same as botocore's SigV4QueryAuth for this request
+    assert query["X-Amz-Signature"] == [
+        "8ad1f87e7d1c61b426a6d8d5cdcf16d6cf9db4538019eed369f2bae466bec68b"
+    ]
+    assert "X-Amz-Security-Token" not in query
+
+
+def test_presign_url_signature_inputs():
+    """The signature depends on the secret and the time."""
+    signature = parse_qs(urlsplit(presign_url(CREDENTIALS, NOW)).query)["X-Amz-Signature"]
+    other_secret = IoTCredentials(ENDPOINT, "AKIDEXAMPLE", "another")
+    later = NOW + datetime.timedelta(seconds=1)
+
+    assert parse_qs(urlsplit(presign_url(other_secret, NOW)).query)["X-Amz-Signature"] != signature
+    assert parse_qs(urlsplit(presign_url(CREDENTIALS, later)).query)["X-Amz-Signature"] != signature
+
+
+def test_presign_url_session_token():
+    """The session token is appended after the signature, unsigned."""
+    with_token = IoTCredentials(ENDPOINT, "AKIDEXAMPLE", CREDENTIALS.secret_key, "a/b+c=")
+    url = presign_url(with_token, NOW)
+
+    assert url.startswith(presign_url(CREDENTIALS, NOW) + "&")
+    assert url.endswith("&X-Amz-Security-Token=a%2Fb%2Bc%3D")
+
+
+def test_presign_url_local_endpoint():
+    """An endpoint with a scheme is used as-is."""
+    local = IoTCredentials("ws://127.0.0.1:8080/", "AKID", "secret")
+    assert presign_url(local, NOW).startswith("ws://127.0.0.1:8080/mqtt?X-Amz-Algorithm=")
+
+
+class WebSocket:
+    """Records sent packets and acknowledges every SUBSCRIBE."""
+
+    def __init__(self, connection: BluestarIoTConnection):
+        """Initialize an open socket for the connection."""
+        self.closed = False
+        self.subscribes = []
+        self._connection = connection
+
+    async def send_bytes(self, packet: bytes) -> None:
+        """Answer a SUBSCRIBE with a SUBACK granting QoS 0 to every topic."""
+        buffer = bytearray(packet)
+        first_byte, body = read_packet(buffer)
+        if first_byte & 0xF0 != SUBSCRIBE:
+            return
+        (packet_id,) = struct.unpack_from("!H", body)
+        offset, topics = 2, []
+        while offset < len(body):
+            (length,) = struct.unpack_from("!H", body, offset)
+            topics.append(body[offset + 2:offset + 2 + length].decode())
+            offset += length + 3
+        self.subscribes.append(topics)
+        self._connection._acks[packet_id].set_result(b"\x00" * len(topics))
+
+
+@pytest.fixture
+def connection():
+    """Return a connection that looks connected to a recording socket."""
+    connection = BluestarIoTConnection(None, CREDENTIALS, "u-1")
+    connection._ws = WebSocket(connection)
+    connection._ping_task = object()
+    return connection
+
+
+async def test_subscribe_chunked(connection):
+    """Topics go out at most eight per SUBSCRIBE."""
+    topics = [f"t/{index}" for index in range(20)]
+
+    await connection.subscribe(topics, lambda topic, payload: None)
+
+    assert connection._ws.subscribes == [topics[:8], topics[8:16], topics[16:]]
+
+
+async def test_subscription_limit(connection):
+    """Subscriptions past the per-connection limit are refused."""
+    callback = lambda topic, payload: None  # noqa: E731
+    await connection.subscribe([f"t/{index}" for index in range(48)], callback)
+
+    with pytest.raises(IoTConnectionError):
+        await connection.subscribe(["t/48", "t/49", "t/50"], callback)
+    await connection.subscribe(["t/0", "t/48", "t/49"], callback)
+
+    assert len(connection._subscriptions) == MAX_SUBSCRIPTIONS
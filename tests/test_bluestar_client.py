@@ -0,0 +1,370 @@
+"""Tests for the per-device shadow client."""
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.bluestar_ac import bluestar_client
+from custom_components.bluestar_ac.aws_iot import IoTConnectionError
+from custom_components.bluestar_ac.bluestar_client import (
+    BluestarACClient,
+    _PendingCommand,
+    shadow_state,
+)
+from custom_components.bluestar_ac.metrics import Metrics
+from custom_components.bluestar_ac.scheduler import CommandScheduler, Priority
+from custom_components.bluestar_ac.trace import TraceRecorder
+from custom_components.bluestar_ac.transport import (
+    TRANSPORT_MQTT,
+    TRANSPORT_REST,
+    TransportSelector,
+)
+
+DEVICE_ID = "fa0000000000"
+TOPIC = f"$aws/things/{DEVICE_ID}/shadow"
+
+
+class Account:
+    """The parts of ``BluestarAccount`` that ``BluestarACClient`` uses."""
+
+    def __init__(self):
+        """Initialize a connected account whose sends succeed."""
+        self.api = MagicMock()
+        self.api.set_preferences = AsyncMock(return_value=True)
+        self.connection = MagicMock()
+        self.connection.publish = AsyncMock()
+        self.connection.subscribe = AsyncMock()
+        self.connection.unsubscribe = AsyncMock()
+        self.metrics = Metrics()
+        self.trace = TraceRecorder()
+        self.scheduler = CommandScheduler()
+        self.transports = TransportSelector()
+        self.available = True
+        self.connected = True
+
+    async def async_connect(self) -> bool:
+        """Return whether the connection is up."""
+        return self.connected
+
+
+@pytest.fixture
+async def account():
+    """Return an account; its scheduler is stopped afterwards."""
+    account = Account()
+    yield account
+    account.scheduler.stop()
+    await asyncio.sleep(0)
+
+
+@pytest.fixture
+def reported():
+    """Return the state the device last reported, in cool mode."""
+    return {"pow": 1, "mode": 2, "stemp": "24.0", "fspd": 7}
+
+
+@pytest.fixture
+def pushed():
+    """Return the list of states passed to the state callback."""
+    return []
+
+
+@pytest.fixture
+async def client(account, capabilities, reported, pushed):
+    """Return a client that sends every command right away; closed afterwards."""
+    client = BluestarACClient(
+        account,
+        DEVICE_ID,
+        coalesce_window=0,
+        state_callback=lambda device_id, state: pushed.append(state),
+        capabilities=capabilities,
+        reported_state=lambda device_id: reported,
+    )
+    yield client
+    await client.async_close()
+
+
+def published(account):
+    """Return the desired states published on the shadow update topic."""
+    return [
+        json.loads(call.args[1])["state"]["desired"]
+        for call in account.connection.publish.call_args_list
+        if call.args[0] == f"{TOPIC}/update"
+    ]
+
+
+# De-duplication
+
+
+def test_trim_redundant(client):
+    """Keys the device already reports are dropped, numbers compared as such."""
+    assert client._trim_redundant({"stemp": 24, "mode": "2", "fspd": 4}) == {"fspd": 4}
+    assert client.dedup_trimmed == 1
+    assert client.dedup_skipped == 0
+
+
+def test_trim_redundant_all(client):
+    """A command that changes nothing is left empty."""
+    assert client._trim_redundant({"pow": 1, "stemp": "24.0"}) == {}
+    assert client.dedup_skipped == 1
+
+
+def test_trim_redundant_pending(client):
+    """Keys already sent and not answered yet count as set."""
+    client._track(_PendingCommand(), {"stemp": "22.0"}, Priority.NORMAL)
+
+    assert client._trim_redundant({"stemp": "22.0"}) == {}
+    assert client._trim_redundant({"stemp": "24.0"}) == {"stemp": "24.0"}
+
+
+async def test_redundant_command_not_sent(client, account):
+    """A command for the current state succeeds without being sent."""
+    assert await client.async_set_temperature(24)
+
+    account.connection.publish.assert_not_called()
+    account.api.set_preferences.assert_not_called()
+
+
+async def test_force_sends_redundant(client, account):
+    """With ``force``, a command is sent even if nothing changes."""
+    assert await client.async_set_state(force=True, temperature=24)
+
+    (desired,) = published(account)
+    assert desired["stemp"] == "24.0"
+
+
+# Encoding
+
+
+def test_encode_mode(client):
+    """A mode powers the AC on and sets a fixed fan speed with it."""
+    assert client._encode_state(hvac_mode="dry") == {"pow": 1, "mode": 3, "fspd": 2}
+    assert client._encode_state(hvac_mode="off") == {"pow": 0}
+    assert client._encode_state(hvac_mode="heat") is None
+
+
+def test_encode_against_current_mode(client, reported):
+    """Without a mode, temperature and fan speed are checked against the current one."""
+    assert client._encode_state(temperature=22, fan_mode="high") == {"stemp": "22.0", "fspd": 4}
+
+    reported["mode"] = 0
+    assert client._encode_state(temperature=22) is None
+    assert client._encode_state(fan_mode="high") == {"fspd": 4}
+
+    reported["mode"] = 3
+    assert client._encode_state(fan_mode="high") is None
+
+
+def test_encode_against_pending_mode(client):
+    """A mode sent but not reported yet is the one commands are checked against."""
+    client._track(_PendingCommand(), {"mode": 4}, Priority.NORMAL)
+
+    assert client._encode_state(fan_mode="high") is None
+    assert client._encode_state(hvac_mode="cool", fan_mode="high") == {
+        "pow": 1, "mode": 2, "fspd": 4
+    }
+
+
+def test_encode_temperature_range(client):
+    """Temperatures outside the model's range are rejected."""
+    assert client._encode_state(temperature=30) == {"stemp": "30.0"}
+    assert client._encode_state(temperature=31) is None
+
+
+# Transport failover
+
+
+async def test_failover_to_rest(client, account, pushed):
+    """A command that cannot be published goes out as a preferences write."""
+    account.connection.publish.side_effect = IoTConnectionError("gone")
+
+    assert await client.async_set_temperature(22)
+
+    account.api.set_preferences.assert_awaited_once_with(DEVICE_ID, {"stemp": "22.0"})
+    assert account.transports.health[TRANSPORT_MQTT].failures == 1
+    assert account.transports.health[TRANSPORT_REST].samples == 1
+    assert client.optimistic_state == {"stemp": "22.0"}
+    assert pushed == []
+
+
+async def test_failover_to_mqtt(client, account):
+    """REST goes first once faster, and MQTT takes over when it fails."""
+    account.transports.record(TRANSPORT_MQTT, 0.5, True)
+    account.transports.record(TRANSPORT_REST, 0.1, True)
+    account.api.set_preferences.return_value = False
+
+    assert await client.async_set_temperature(22)
+
+    account.api.set_preferences.assert_awaited_once()
+    assert published(account)[0]["stemp"] == "22.0"
+
+
+async def test_pinned_transport(client, account):
+    """A pinned command does not fail over."""
+    account.api.set_preferences.return_value = False
+
+    assert not await client.async_set_preferences(temperature=22)
+
+    account.connection.publish.assert_not_called()
+
+
+async def test_all_transports_fail(client, account, pushed):
+    """A command fails only once every transport has, and is rolled back."""
+    account.connection.publish.side_effect = IoTConnectionError("gone")
+    account.api.set_preferences.return_value = False
+
+    assert not await client.async_set_temperature(22)
+
+    assert client.optimistic_state == {}
+    assert client._commands == {}
+    assert pushed == []
+
+
+# Shadow documents
+
+
+def test_shadow_state():
+    """Reported state comes from accepted documents, never from a delta."""
+    document = {"state": {"reported": {"pow": 1}, "desired": {"pow": 0}}}
+
+    assert shadow_state(f"{TOPIC}/update/accepted", document) == {"pow": 1}
+    assert shadow_state(f"{TOPIC}/get/accepted", document) == {"pow": 1}
+    assert shadow_state(f"{TOPIC}/update/delta", {"state": {"pow": 0}}) is None
+    assert shadow_state(f"{TOPIC}/update/accepted", {"state": {"desired": {"pow": 0}}}) is None
+
+
+def test_is_current_version(client):
+    """Documents older than the newest version seen are dropped."""
+    assert client._is_current(f"{TOPIC}/update/accepted", {"version": 5})
+    assert client._is_current(f"{TOPIC}/update/accepted", {"version": 5})
+    assert not client._is_current(f"{TOPIC}/update/accepted", {"version": 4})
+    assert client._is_current(f"{TOPIC}/update/accepted", {"version": 6})
+    assert not client._is_current(f"{TOPIC}/update/accepted", {"version": 5})
+
+    assert client.shadow_version == 6
+    assert client.stale_dropped == 2
+
+
+def test_is_current_timestamp(client):
+    """Without versions, the shadow timestamps are compared."""
+    assert client._is_current(f"{TOPIC}/update/accepted", {"timestamp": 1700000010})
+    assert not client._is_current(f"{TOPIC}/update/accepted", {"timestamp": 1700000009})
+    assert client._is_current(f"{TOPIC}/update/accepted", {"timestamp": 1700000010})
+
+
+def test_is_current_get_resets(client):
+    """The answer to our own get is applied and resets the version."""
+    client._is_current(f"{TOPIC}/update/accepted", {"version": 9})
+    client._get_token = "ours"
+
+    assert client._is_current(f"{TOPIC}/get/accepted", {"version": 1, "clientToken": "ours"})
+    assert client.shadow_version == 1
+    assert client._is_current(f"{TOPIC}/update/accepted", {"version": 2})
+
+
+def test_is_current_foreign_get(client):
+    """Answers to other clients' gets are checked like any document."""
+    client._is_current(f"{TOPIC}/update/accepted", {"version": 9})
+    client._get_token = "ours"
+
+    assert not client._is_current(f"{TOPIC}/get/accepted", {"version": 8, "clientToken": "app"})
+    assert not client._is_current(f"{TOPIC}/get/accepted", {"version": 8})
+    assert client.shadow_version == 9
+
+
+async def test_subscribe_sends_get_with_token(client, account):
+    """The shadow get carries a client token to match its answer."""
+    assert await client.async_subscribe_shadow()
+
+    topic, payload = account.connection.publish.await_args.args
+    assert topic == f"{TOPIC}/get"
+    assert json.loads(payload) == {"clientToken": client._get_token}
+
+
+def test_stale_message_not_applied(client, pushed):
+    """A reported state older than one already applied is not pushed."""
+    message = lambda version, pow: json.dumps(  # noqa: E731
+        {"state": {"reported": {"pow": pow}}, "version": version}
+    ).encode()
+
+    client._on_shadow_message(f"{TOPIC}/update/accepted", message(3, 0))
+    client._on_shadow_message(f"{TOPIC}/update/accepted", message(2, 1))
+
+    assert pushed == [{"pow": 0}]
+
+
+def test_delta_not_applied(client, pushed):
+    """A delta only lists what the device has not applied, so it is not state."""
+    client._on_shadow_message(
+        f"{TOPIC}/update/delta", json.dumps({"state": {"pow": 0}, "version": 3}).encode()
+    )
+
+    assert pushed == []
+    assert client.shadow_version == 3
+
+
+async def test_verdict_resolves_command(client, account, pushed):
+    """The shadow's verdict settles a command by its client token."""
+    client._subscribed = True
+    send = asyncio.ensure_future(client.async_set_temperature(22))
+    await asyncio.sleep(0.01)
+    assert client.optimistic_state == {"stemp": "22.0"}
+    assert await send
+
+    (token,) = client._commands
+    client._on_shadow_message(
+        f"{TOPIC}/update/rejected",
+        json.dumps({"code": 400, "message": "bad", "clientToken": token}).encode(),
+    )
+
+    assert client.optimistic_state == {}
+    assert pushed == []
+    assert account.transports.health[TRANSPORT_MQTT].failures == 1
+
+
+async def test_accepted_keys_until_reported(client, account, reported, pushed):
+    """Accepted keys are shown, not reported, until the device reports them."""
+    client.optimistic = False
+    assert await client.async_set_state(temperature=22, fan_mode="high")
+
+    assert client.optimistic_state == {"stemp": "22.0", "fspd": 4}
+    assert pushed == []
+    # Not reported yet, so sending it again is not skipped
+    assert client._trim_redundant({"stemp": "22.0"}) == {"stemp": "22.0"}
+
+    reported["stemp"] = "22.0"
+    assert client.optimistic_state == {"fspd": 4}
+
+
+async def test_accepted_keys_expire(client, account, monkeypatch):
+    """Accepted keys the device never reports stop showing after the timeout."""
+    assert await client.async_set_temperature(22)
+    assert client.optimistic_state == {"stemp": "22.0"}
+
+    monkeypatch.setattr(bluestar_client, "REPORT_TIMEOUT", 0)
+
+    assert client.optimistic_state == {}
+
+
+async def test_verdict_before_publish_returns(client, account):
+    """A verdict arriving while publishing leaves no ack timer behind."""
+    client._subscribed = True
+
+    async def publish(topic: str, payload: bytes) -> None:
+        document = json.loads(payload)
+        if "clientToken" in document:
+            client._on_shadow_message(
+                f"{TOPIC}/update/accepted",
+                json.dumps({"clientToken": document["clientToken"]}).encode(),
+            )
+
+    account.connection.publish.side_effect = publish
+
+    assert await client.async_set_temperature(22)
+
+    assert client._commands == {}
+    assert account.transports.health[TRANSPORT_MQTT].failures == 0
+    command = _PendingCommand()
+    command.payload = {"stemp": "22.0"}
+    client._on_ack_timeout(command)
+    assert account.transports.health[TRANSPORT_MQTT].failures == 0
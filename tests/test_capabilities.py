@@ -0,0 +1,83 @@
+"""Tests for compiling a model's ``model_config``."""
+import pytest
+
+from custom_components.bluestar_ac import capabilities as capabilities_module
+from custom_components.bluestar_ac.capabilities import (
+    DEFAULT_CAPABILITIES,
+    get_capabilities,
+    parse_model_config,
+)
+
+
+def test_parse_model_config(capabilities):
+    """Modes, fan speeds and their constraints are read from the config."""
+    assert capabilities.min_temp == 16
+    assert capabilities.max_temp == 30
+    assert capabilities.modes == {"fan_only": 0, "cool": 2, "dry": 3, "auto": 4}
+    assert capabilities.mode_names == {0: "fan_only", 2: "cool", 3: "dry", 4: "auto"}
+    assert capabilities.fan_speeds == {
+        "low": 2, "medium": 3, "high": 4, "turbo": 6, "auto": 7
+    }
+    assert capabilities.fixed_fan_speeds == {3: 2, 4: 7}
+    assert capabilities.no_temperature_modes == frozenset({0})
+
+
+def test_display_order(capabilities):
+    """Modes start with off and fan speeds follow the display order."""
+    assert capabilities.hvac_modes == ["off", "fan_only", "cool", "dry", "auto"]
+    assert capabilities.fan_modes == ["auto", "low", "medium", "high", "turbo"]
+
+
+def test_unknown_names_skipped():
+    """Modes and fan speeds the integration does not know are left out."""
+    capabilities = parse_model_config({
+        "mode": {
+            "2": {"name": "Cool", "stemp": {"default": "24"}},
+            "9": {"name": "purify"},
+        },
+        "fspd": {"2": "low", "5": "quiet"},
+    })
+
+    assert capabilities.modes == {"cool": 2}
+    assert capabilities.fan_speeds == {"low": 2}
+    assert capabilities.no_temperature_modes == frozenset()
+
+
+def test_default_temperature_range():
+    """The temperature range falls back to the integration's limits."""
+    capabilities = parse_model_config({"mode": {"2": {"name": "cool", "stemp": {}}}})
+
+    assert capabilities.min_temp == DEFAULT_CAPABILITIES.min_temp
+    assert capabilities.max_temp == DEFAULT_CAPABILITIES.max_temp
+
+
+@pytest.mark.parametrize(
+    "model_config",
+    [{}, {"mode": {}}, {"mode": {"9": {"name": "purify"}}}],
+)
+def test_no_modes(model_config):
+    """A config without a supported mode is rejected."""
+    with pytest.raises(ValueError):
+        parse_model_config(model_config)
+
+
+def test_get_capabilities_cached(monkeypatch, model_config):
+    """Each model is parsed once and shared by its devices."""
+    monkeypatch.setattr(capabilities_module, "_cache", {})
+
+    first = get_capabilities("model-1", model_config)
+
+    assert get_capabilities("model-1", None) is first
+    assert get_capabilities("model-2", model_config) is not first
+
+
+@pytest.mark.parametrize(
+    "model_config",
+    [None, {}, {"mode": {"9": {"name": "purify"}}}, {"mode": {"2": {"name": "cool", "fspd": {"fixed": True}}}}],
+)
+def test_get_capabilities_fallback(monkeypatch, model_config):
+    """A missing or unusable config gives the default capabilities."""
+    monkeypatch.setattr(capabilities_module, "_cache", {})
+
+    assert get_capabilities("model-1", model_config) is DEFAULT_CAPABILITIES
+    assert "model-1" not in capabilities_module._cache
@@ -0,0 +1,132 @@
+"""Tests for merging polled and pushed state in the coordinator."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.bluestar_ac.coordinator import BluestarDataUpdateCoordinator
+
+DEVICE_ID = "fa0000000000"
+
+
+def device(state, connected=True):
+    """Return a ``/things`` device entry with the given state."""
+    return {"thing_id": DEVICE_ID, "connected": connected, "state": dict(state)}
+
+
+@pytest.fixture
+def api():
+    """Return a REST client whose device list the tests set."""
+    api = MagicMock()
+    api.get_devices = AsyncMock()
+    return api
+
+
+@pytest.fixture
+def coordinator(hass, api):
+    """Return a coordinator holding one device, without polling."""
+    coordinator = BluestarDataUpdateCoordinator(hass, api)
+    coordinator.update_interval = None
+    coordinator.data = {DEVICE_ID: device({"pow": 0, "stemp": "24.0", "ts": 100})}
+    return coordinator
+
+
+def listen(coordinator):
+    """Return a list that grows by one on every listener update."""
+    updates = []
+    coordinator.async_add_listener(lambda: updates.append(coordinator.data))
+    return updates
+
+
+async def test_push_merged(coordinator):
+    """A pushed update is merged key by key and notifies listeners."""
+    updates = listen(coordinator)
+
+    coordinator.async_set_device_state(DEVICE_ID, {"pow": 1, "ts": 200})
+
+    assert coordinator.device_state(DEVICE_ID) == {"pow": 1, "stemp": "24.0", "ts": 200}
+    assert len(updates) == 1
+
+
+async def test_push_removes_none(coordinator):
+    """Keys pushed as None are removed, as in a shadow document."""
+    coordinator.async_set_device_state(DEVICE_ID, {"stemp": None})
+
+    assert coordinator.device_state(DEVICE_ID) == {"pow": 0, "ts": 100}
+
+
+async def test_push_unchanged(coordinator):
+    """A push that changes nothing notifies no one."""
+    updates = listen(coordinator)
+
+    coordinator.async_set_device_state(DEVICE_ID, {"pow": 0, "stemp": "24.0"})
+
+    assert not updates
+    assert coordinator.unchanged_pushes == 1
+
+
+async def test_push_marks_connected(coordinator):
+    """Any push from a device shown as offline brings it back online."""
+    coordinator.data = {DEVICE_ID: device({"pow": 0}, connected=False)}
+    updates = listen(coordinator)
+
+    coordinator.async_set_device_state(DEVICE_ID, {"pow": 0})
+
+    assert coordinator.device_connected(DEVICE_ID)
+    assert len(updates) == 1
+
+
+async def test_push_unknown_device(coordinator):
+    """Pushes for devices the account does not list are ignored."""
+    coordinator.async_set_device_state("other", {"pow": 1})
+
+    assert set(coordinator.data) == {DEVICE_ID}
+
+
+async def test_poll(coordinator, api):
+    """A newer polled state replaces the cached one."""
+    api.get_devices.return_value = [device({"pow": 1, "stemp": "22.0", "ts": 200})]
+
+    data = await coordinator._async_update_data()
+
+    assert data[DEVICE_ID]["state"] == {"pow": 1, "stemp": "22.0", "ts": 200}
+    assert coordinator.stale_polls == 0
+
+
+async def test_stale_poll_ignored(coordinator, api):
+    """A polled state older than the last one applied keeps the cache."""
+    coordinator.async_set_device_state(DEVICE_ID, {"pow": 1, "ts": 300})
+    api.get_devices.return_value = [device({"pow": 0, "stemp": "24.0", "ts": 200})]
+
+    data = await coordinator._async_update_data()
+
+    assert data[DEVICE_ID]["state"] == {"pow": 1, "stemp": "24.0", "ts": 300}
+    assert coordinator.stale_polls == 1
+
+
+async def test_push_during_poll_wins(coordinator, api):
+    """Keys pushed while a poll is in flight override the polled ones."""
+
+    async def get_devices():
+        coordinator.async_set_device_state(DEVICE_ID, {"stemp": "20.0", "swing": None})
+        return [device({"pow": 0, "stemp": "24.0", "swing": 1})]
+
+    api.get_devices.side_effect = get_devices
+
+    data = await coordinator._async_update_data()
+
+    assert data[DEVICE_ID]["state"] == {"pow": 0, "stemp": "20.0"}
+
+    # Only the push during that poll is overlaid on the next one
+    api.get_devices.side_effect = None
+    api.get_devices.return_value = [device({"pow": 0, "stemp": "24.0"})]
+    data = await coordinator._async_update_data()
+    assert data[DEVICE_ID]["state"] == {"pow": 0, "stemp": "24.0"}
+
+
+async def test_poll_without_devices(coordinator, api):
+    """An empty device list fails the update."""
+    api.get_devices.return_value = []
+
+    with pytest.raises(UpdateFailed):
+        await coordinator._async_update_data()
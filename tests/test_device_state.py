@@ -0,0 +1,201 @@
+"""Tests for the shared per-device state and its change detection."""
+from typing import Any, Callable, Dict, List
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.bluestar_ac.bluestar_client import BluestarACClient
+from custom_components.bluestar_ac.climate import BluestarACClimate
+from custom_components.bluestar_ac.coordinator import BluestarDataUpdateCoordinator
+from custom_components.bluestar_ac.device_state import DeviceState, DeviceStateTracker
+from custom_components.bluestar_ac.temperature import RoomTemperature
+
+from .test_bluestar_client import Account
+
+DEVICE_ID = "fa0000000000"
+RAW = {
+    "pow": 1, "mode": 2, "stemp": "24.0", "ctemp": "30.5", "fspd": 7,
+    "hswing": 0, "vswing": 1, "eco": 1, "turbo": 0, "sleep": 0, "display": 1,
+}
+
+
+class Client:
+    """The parts of ``BluestarACClient`` that the tracker uses."""
+
+    def __init__(self, capabilities):
+        """Initialize an available client without pending commands."""
+        self.capabilities = capabilities
+        self.available = True
+        self.optimistic_state: Dict[str, Any] = {}
+        self._listeners: List[Callable[[], None]] = []
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Register an optimistic state listener."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def set_optimistic(self, state: Dict[str, Any]) -> None:
+        """Show unanswered command keys and notify."""
+        self.optimistic_state = state
+        for listener in list(self._listeners):
+            listener()
+
+
+@pytest.fixture
+def coordinator(hass):
+    """Return a coordinator holding one connected AC."""
+    coordinator = BluestarDataUpdateCoordinator(hass, MagicMock())
+    coordinator.update_interval = None
+    coordinator.data = {
+        DEVICE_ID: {"thing_id": DEVICE_ID, "connected": True, "state": dict(RAW)}
+    }
+    return coordinator
+
+
+@pytest.fixture
+def client(capabilities):
+    """Return a client stand-in."""
+    return Client(capabilities)
+
+
+@pytest.fixture
+def tracker(coordinator, client):
+    """Return the tracker of the AC."""
+    return DeviceStateTracker(coordinator, client, DEVICE_ID)
+
+
+def listen(tracker, fields):
+    """Return a list of the changed-field sets passed to a new listener."""
+    calls = []
+    tracker.async_add_listener(calls.append, fields)
+    return calls
+
+
+def test_from_raw(capabilities):
+    """Raw keys decode to Home Assistant names and types."""
+    state = DeviceState.from_raw(RAW, capabilities, True)
+
+    assert state.as_dict() == {
+        "available": True,
+        "power": True,
+        "hvac_mode": "cool",
+        "target_temperature": 24.0,
+        "room_temperature": 30.5,
+        "fan_mode": "auto",
+        "swing_mode": "vertical",
+        "preset_mode": "eco",
+        "display": True,
+        "buzzer": None,
+    }
+
+
+def test_from_raw_malformed(capabilities):
+    """Missing, malformed or unknown values decode to None."""
+    state = DeviceState.from_raw({"pow": "x", "mode": 9, "stemp": None}, capabilities, False)
+
+    assert state.power is None
+    assert state.hvac_mode is None
+    assert state.target_temperature is None
+    assert state.swing_mode is None
+
+
+def test_diff(capabilities):
+    """The diff names exactly the fields that changed."""
+    state = DeviceState.from_raw(RAW, capabilities, True)
+
+    assert state.diff(DeviceState.from_raw(RAW, capabilities, True)) == frozenset()
+    assert state.diff(DeviceState.from_raw({**RAW, "stemp": "22"}, capabilities, True)) == {
+        "target_temperature"
+    }
+    assert state.diff(DeviceState.from_raw(RAW, capabilities, False)) == {"available"}
+    assert state.diff(
+        DeviceState.from_raw({**RAW, "hswing": 1, "eco": 0}, capabilities, True)
+    ) == {"swing_mode", "preset_mode"}
+
+
+async def test_listener_filtering(tracker, coordinator):
+    """Listeners are only called for the fields they follow."""
+    temperature = listen(tracker, {"target_temperature"})
+    power = listen(tracker, {"power", "hvac_mode"})
+
+    coordinator.async_set_device_state(DEVICE_ID, {"stemp": "22.0"})
+    coordinator.async_set_device_state(DEVICE_ID, {"pow": 0, "ts": 5})
+
+    assert temperature == [{"target_temperature"}]
+    assert power == [{"power"}]
+    assert tracker.state.power is False
+
+
+async def test_unrelated_key_notifies_no_one(tracker, coordinator):
+    """A raw key no field depends on causes no listener call."""
+    calls = listen(tracker, DeviceState.__slots__)
+
+    coordinator.async_set_device_state(DEVICE_ID, {"ts": 12345})
+
+    assert calls == []
+
+
+async def test_optimistic_overlay(tracker, client):
+    """Unanswered command keys are shown over the reported state."""
+    calls = listen(tracker, {"fan_mode"})
+
+    client.set_optimistic({"fspd": 4})
+    assert tracker.state.fan_mode == "high"
+    client.set_optimistic({})
+    assert tracker.state.fan_mode == "auto"
+
+    assert calls == [{"fan_mode"}, {"fan_mode"}]
+
+
+async def test_remove_last_listener(tracker, coordinator, client):
+    """Removing the last listener stops following the coordinator and client."""
+    remove = tracker.async_add_listener(lambda changed: None, {"power"})
+    assert client._listeners
+
+    remove()
+
+    assert not client._listeners
+    assert not coordinator._listeners
+
+
+async def test_available_while_a_transport_works(tracker, coordinator, client):
+    """The AC stays available while either REST or MQTT can carry commands."""
+    client.available = False
+    tracker.async_update()
+    assert tracker.state.available
+
+    coordinator.last_update_success = False
+    tracker.async_update()
+    assert not tracker.state.available
+
+    client.available = True
+    tracker.async_update()
+    assert tracker.state.available
+
+    coordinator.data[DEVICE_ID]["connected"] = False
+    tracker.async_update()
+    assert not tracker.state.available
+
+
+async def test_entity_sends_over_rest_while_mqtt_down(coordinator, capabilities):
+    """With the MQTT circuit open, the entity is available and sends over REST."""
+    account = Account()
+    account.available = account.connected = False
+    client = BluestarACClient(
+        account,
+        DEVICE_ID,
+        coalesce_window=0,
+        capabilities=capabilities,
+        reported_state=coordinator.device_state,
+    )
+    entity = BluestarACClimate(
+        DeviceStateTracker(coordinator, client, DEVICE_ID), RoomTemperature(0, 0)
+    )
+
+    assert entity.available
+    await entity.async_set_temperature(temperature=22)
+
+    account.api.set_preferences.assert_awaited_once_with(DEVICE_ID, {"stemp": "22.0"})
+    account.connection.publish.assert_not_awaited()
+    await client.async_close()
+    account.scheduler.stop()
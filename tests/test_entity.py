@@ -0,0 +1,81 @@
+"""Tests for the entities shared by every platform."""
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from custom_components.bluestar_ac.const import DATA_DEVICES, DOMAIN, SIGNAL_NEW_DEVICES
+from custom_components.bluestar_ac.coordinator import BluestarDataUpdateCoordinator
+from custom_components.bluestar_ac.device_state import DeviceStateTracker
+from custom_components.bluestar_ac.entity import async_setup_device_entities
+from custom_components.bluestar_ac.switch import BluestarACDisplaySwitch
+
+from .test_device_state import RAW, Client
+
+DEVICE_ID = "fa0000000000"
+NEW_DEVICE_ID = "fa0000000001"
+
+
+@pytest.fixture
+def coordinator(hass):
+    """Return a coordinator holding two ACs, one without a name."""
+    coordinator = BluestarDataUpdateCoordinator(hass, MagicMock())
+    coordinator.update_interval = None
+    coordinator.data = {
+        DEVICE_ID: {
+            "thing_id": DEVICE_ID,
+            "model_id": "BS-1",
+            "user_config": {"name": "Bedroom"},
+            "connected": True,
+            "state": dict(RAW),
+        },
+        NEW_DEVICE_ID: {"thing_id": NEW_DEVICE_ID, "connected": True, "state": {}},
+    }
+    return coordinator
+
+
+def tracker(coordinator, capabilities, device_id) -> DeviceStateTracker:
+    """Return the state tracker of an AC."""
+    return DeviceStateTracker(coordinator, Client(capabilities), device_id)
+
+
+def test_device_info(coordinator, capabilities):
+    """Entities belong to a device per AC, named as in the app."""
+    switch = BluestarACDisplaySwitch(tracker(coordinator, capabilities, DEVICE_ID))
+
+    assert switch.device_info["identifiers"] == {(DOMAIN, DEVICE_ID)}
+    assert switch.device_info["name"] == "Bedroom"
+    assert switch.device_info["model"] == "BS-1"
+    assert switch.name == "Display"
+
+    unnamed = BluestarACDisplaySwitch(tracker(coordinator, capabilities, NEW_DEVICE_ID))
+    assert unnamed.device_info["name"] == f"Bluestar AC {NEW_DEVICE_ID}"
+
+
+async def test_new_devices_get_entities(hass, coordinator, capabilities):
+    """ACs announced after setup get their entities too."""
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    hass.data[DOMAIN] = {
+        entry.entry_id: {DATA_DEVICES: {DEVICE_ID: tracker(coordinator, capabilities, DEVICE_ID)}}
+    }
+    added = []
+
+    async_setup_device_entities(
+        hass,
+        entry,
+        lambda entities: added.extend(entities),
+        lambda device: [BluestarACDisplaySwitch(device)],
+    )
+    assert [entity.unique_id for entity in added] == [f"bluestar_ac_display_{DEVICE_ID}"]
+
+    async_dispatcher_send(
+        hass,
+        SIGNAL_NEW_DEVICES.format(entry_id=entry.entry_id),
+        [tracker(coordinator, capabilities, NEW_DEVICE_ID)],
+    )
+    await hass.async_block_till_done()
+
+    assert added[1].unique_id == f"bluestar_ac_display_{NEW_DEVICE_ID}"
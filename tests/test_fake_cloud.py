@@ -0,0 +1,176 @@
+"""End-to-end tests of the client layer against the local fake cloud."""
+import asyncio
+
+import aiohttp
+import pytest
+
+from benchmark import BenchAccount
+from fake_cloud import FakeBluestarCloud
+
+from custom_components.bluestar_ac.api_client import BluestarClient
+from custom_components.bluestar_ac.bluestar_client import BluestarACClient
+from custom_components.bluestar_ac.transport import TRANSPORTS
+
+USERNAME = "test@example.com"
+PASSWORD = "secret"
+TIMEOUT = 5
+
+
+@pytest.fixture
+async def cloud(socket_enabled):
+    """Run a fake cloud with four devices."""
+    async with FakeBluestarCloud(device_count=4, seed=0) as cloud:
+        yield cloud
+
+
+@pytest.fixture
+async def api(cloud):
+    """Return a REST client for the fake cloud."""
+    api = BluestarClient(USERNAME, PASSWORD, base_url=cloud.base_url)
+    yield api
+    await api.close()
+
+
+@pytest.fixture
+async def account(api):
+    """Return an account with an MQTT connection to the fake cloud."""
+    async with aiohttp.ClientSession() as session:
+        account = BenchAccount(session, api, transports=TRANSPORTS)
+        assert await account.async_connect()
+        yield account
+        await account.async_close()
+
+
+@pytest.fixture
+async def device_id(cloud):
+    """Return the ID of the first emulated AC."""
+    return next(iter(cloud.devices))
+
+
+@pytest.fixture
+def pushed():
+    """Return a queue of the states pushed to the client."""
+    return asyncio.Queue()
+
+
+@pytest.fixture
+async def client(account, device_id, capabilities, pushed):
+    """Return a client following the shadow of the first AC."""
+    states = {}
+
+    def on_state(device_id, state):
+        states.setdefault(device_id, {}).update(state)
+        pushed.put_nowait(state)
+
+    client = BluestarACClient(
+        account,
+        device_id,
+        coalesce_window=0,
+        state_callback=on_state,
+        capabilities=capabilities,
+        reported_state=lambda device_id: states.get(device_id, {}),
+    )
+    yield client
+    await client.async_close()
+
+
+async def wait_for_state(pushed, **expected):
+    """Return the first pushed state holding the expected values."""
+    while True:
+        state = await asyncio.wait_for(pushed.get(), TIMEOUT)
+        if all(state.get(key) == value for key, value in expected.items()):
+            return state
+
+
+async def test_login_and_devices(api, cloud):
+    """The REST client logs in and lists every device with its state."""
+    devices = await api.get_devices()
+
+    assert [device["thing_id"] for device in devices] == list(cloud.devices)
+    assert devices[0]["state"]["stemp"] == "24.0"
+    assert devices[0]["connected"]
+    assert api.iot_credentials
+
+
+async def test_wrong_password(cloud):
+    """A rejected login fails authentication."""
+    api = BluestarClient(USERNAME, "wrong", base_url=cloud.base_url)
+    try:
+        assert not await api.ensure_authenticated()
+    finally:
+        await api.close()
+
+
+async def test_shadow_round_trip(client, pushed, cloud, device_id):
+    """A command published on the shadow comes back as reported state."""
+    assert await client.async_subscribe_shadow()
+    await wait_for_state(pushed, stemp="24.0")
+
+    assert await client.async_set_state(power=True, temperature=21)
+    state = await wait_for_state(pushed, pow=1, stemp="21.0", src="fake")
+
+    assert state["mode"] == 2
+    assert cloud.devices[device_id].reported["stemp"] == "21.0"
+    assert client.shadow_version == cloud.devices[device_id].version
+
+
+async def test_mode_sets_fixed_fan_speed(client, pushed, cloud, device_id):
+    """Switching to a mode with a fixed fan speed sends that speed too."""
+    assert await client.async_subscribe_shadow()
+    await wait_for_state(pushed, src="fake")
+
+    assert await client.async_set_mode("dry")
+    await wait_for_state(pushed, pow=1, mode=3, fspd=2, src="fake")
+
+    assert not await client.async_set_fan_mode("high")
+
+
+async def test_preferences_write(client, cloud, device_id):
+    """A command pinned to REST is applied by the cloud directly."""
+    assert await client.async_set_preferences(temperature=26)
+
+    assert cloud.devices[device_id].reported["stemp"] == "26.0"
+    assert cloud.request_counts["POST /things/{thing_id}/preferences"] == 1
+    assert client.optimistic_state == {"stemp": "26.0"}
+
+
+async def test_redundant_command_skipped(client, pushed, cloud, device_id):
+    """Once the shadow reports a value, setting it again sends nothing."""
+    assert await client.async_subscribe_shadow()
+    await wait_for_state(pushed, src="fake")
+    version = cloud.devices[device_id].version
+
+    assert await client.async_set_temperature(24)
+
+    assert client.dedup_skipped == 1
+    assert cloud.devices[device_id].version == version
+
+
+async def test_subscriptions_restored_after_reconnect(account, cloud, capabilities):
+    """Every AC's subscriptions come back after a reconnect, in small batches."""
+    pushed = asyncio.Queue()
+    clients = [
+        BluestarACClient(
+            account,
+            device_id,
+            coalesce_window=0,
+            state_callback=lambda device_id, state: pushed.put_nowait((device_id, state)),
+            capabilities=capabilities,
+        )
+        for device_id in cloud.devices
+    ]
+    try:
+        for client in clients:
+            assert await client.async_subscribe_shadow()
+        await account.connection.connect()
+        assert account.connection.connected
+
+        last = clients[-1]
+        assert await last.async_set_temperature(20)
+        while True:
+            device_id, state = await asyncio.wait_for(pushed.get(), TIMEOUT)
+            if device_id == last.device_id and state.get("stemp") == "20.0":
+                break
+    finally:
+        for client in clients:
+            await client.async_close()
@@ -0,0 +1,134 @@
+"""Tests for reconnect backoff and the circuit breaker."""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from custom_components.bluestar_ac import reconnect
+from custom_components.bluestar_ac.reconnect import CircuitState, ReconnectSupervisor
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    """Make every backoff delay its upper bound."""
+    monkeypatch.setattr(reconnect.random, "uniform", lambda low, high: high)
+
+
+def make(connect, connected=lambda: False, **kwargs) -> ReconnectSupervisor:
+    """Return a supervisor around a connect coroutine function."""
+    return ReconnectSupervisor(connect, connected, **kwargs)
+
+
+async def test_connected_skips_attempt():
+    """Nothing is attempted while the connection is up."""
+    connect = AsyncMock(return_value=True)
+    supervisor = make(connect, lambda: True)
+
+    assert await supervisor.async_ensure_connected()
+    connect.assert_not_awaited()
+
+
+async def test_single_flight():
+    """Concurrent callers share one connect attempt."""
+    release = asyncio.Event()
+
+    async def connect() -> bool:
+        await release.wait()
+        return True
+
+    connect_mock = AsyncMock(side_effect=connect)
+    supervisor = make(connect_mock)
+    calls = [asyncio.ensure_future(supervisor.async_ensure_connected()) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*calls) == [True, True, True]
+    assert connect_mock.await_count == 1
+
+
+async def test_backoff(no_jitter):
+    """Failed attempts back off exponentially up to the maximum delay."""
+    connect = AsyncMock(return_value=False)
+    supervisor = make(connect, base_delay=1, max_delay=4, failure_threshold=10)
+    delays = []
+
+    for _ in range(4):
+        assert not await supervisor.async_ensure_connected()
+        delays.append(supervisor.retry_in)
+        # Calls during the delay fail fast without connecting
+        assert not await supervisor.async_ensure_connected()
+        supervisor._next_attempt = 0
+
+    assert delays == pytest.approx([1, 2, 4, 4], abs=0.05)
+    assert connect.await_count == 4
+    assert supervisor.failures == 4
+
+
+async def test_jitter():
+    """Each delay is drawn from the upper half of the backoff."""
+    supervisor = make(AsyncMock(return_value=False), base_delay=10)
+
+    await supervisor.async_ensure_connected()
+
+    assert 5 - 0.05 <= supervisor.retry_in <= 10
+
+
+async def test_breaker_opens_and_closes():
+    """The circuit opens after the threshold and closes on success."""
+    connect = AsyncMock(return_value=False)
+    supervisor = make(connect, base_delay=0, failure_threshold=3)
+
+    for _ in range(2):
+        await supervisor.async_ensure_connected()
+    assert supervisor.state == CircuitState.CLOSED
+    assert supervisor.available
+
+    await supervisor.async_ensure_connected()
+    assert supervisor.state == CircuitState.OPEN
+    assert not supervisor.available
+
+    connect.return_value = True
+    assert await supervisor.async_ensure_connected()
+    assert supervisor.state == CircuitState.CLOSED
+    assert supervisor.available
+    assert supervisor.failures == 0
+    assert supervisor.retry_in == 0
+
+
+async def test_half_open_probe():
+    """An open circuit lets one probe through and reopens if it fails."""
+    states = []
+
+    async def connect() -> bool:
+        states.append(supervisor.state)
+        return False
+
+    supervisor = make(connect, base_delay=0, failure_threshold=1)
+    await supervisor.async_ensure_connected()
+    await supervisor.async_ensure_connected()
+
+    assert states == [CircuitState.CLOSED, CircuitState.HALF_OPEN]
+    assert supervisor.state == CircuitState.OPEN
+
+
+async def test_connect_error_counts_as_failure():
+    """An exception from the connect call is a failed attempt."""
+    supervisor = make(AsyncMock(side_effect=RuntimeError("boom")), base_delay=0)
+
+    assert not await supervisor.async_ensure_connected()
+    assert supervisor.failures == 1
+
+
+async def test_background_reconnect():
+    """The background loop retries until connected, then notifies."""
+    connect = AsyncMock(side_effect=[False, False, True])
+    supervisor = make(connect, base_delay=0.01)
+    reconnected = asyncio.Event()
+    supervisor.on_reconnect = reconnected.set
+
+    supervisor.async_schedule_reconnect()
+    supervisor.async_schedule_reconnect()
+    await asyncio.wait_for(reconnected.wait(), 5)
+
+    assert connect.await_count == 3
+    supervisor.stop()
@@ -0,0 +1,151 @@
+"""Tests for the per-account command scheduler."""
+import asyncio
+import time
+
+import pytest
+
+from custom_components.bluestar_ac.scheduler import CommandScheduler, Priority
+
+
+@pytest.fixture
+async def make_scheduler():
+    """Return a scheduler factory; every scheduler is stopped afterwards."""
+    schedulers = []
+
+    def make(**kwargs) -> CommandScheduler:
+        scheduler = CommandScheduler(**kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.stop()
+    await asyncio.sleep(0)
+
+
+def recorder(log, name, result=True, delay=0.0):
+    """Return a send that logs its name when it starts."""
+
+    async def send() -> bool:
+        log.append(name)
+        if delay:
+            await asyncio.sleep(delay)
+        return result
+
+    return send
+
+
+async def test_device_fifo(make_scheduler):
+    """Commands for one device run in order, one at a time."""
+    scheduler = make_scheduler()
+    log = []
+    running = 0
+    overlap = False
+
+    def send(index):
+        async def run() -> bool:
+            nonlocal running, overlap
+            running += 1
+            overlap = overlap or running > 1
+            log.append(index)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return True
+
+        return run
+
+    results = await asyncio.gather(
+        *(scheduler.async_submit("ac1", send(index)) for index in range(5))
+    )
+
+    assert results == [True] * 5
+    assert log == [0, 1, 2, 3, 4]
+    assert not overlap
+    assert scheduler.depth == 0
+
+
+async def test_high_priority_first(make_scheduler):
+    """A high-priority command overtakes queued normal ones."""
+    scheduler = make_scheduler()
+    log = []
+
+    await asyncio.gather(
+        scheduler.async_submit("ac1", recorder(log, "ac1")),
+        scheduler.async_submit("ac2", recorder(log, "ac2")),
+        scheduler.async_submit("ac3", recorder(log, "ac3"), Priority.HIGH),
+        scheduler.async_submit("ac4", recorder(log, "ac4")),
+    )
+
+    assert log == ["ac3", "ac1", "ac2", "ac4"]
+
+
+async def test_busy_device_does_not_block(make_scheduler):
+    """A slow device does not hold up commands for other devices."""
+    scheduler = make_scheduler()
+    release = asyncio.Event()
+    log = []
+
+    async def slow() -> bool:
+        log.append("ac1")
+        await release.wait()
+        return True
+
+    first = asyncio.ensure_future(scheduler.async_submit("ac1", slow))
+    second = asyncio.ensure_future(scheduler.async_submit("ac1", recorder(log, "ac1 again")))
+    await asyncio.sleep(0.01)
+    assert log == ["ac1"]
+
+    assert await scheduler.async_submit("ac2", recorder(log, "ac2"))
+    assert log == ["ac1", "ac2"]
+    assert scheduler.as_dict()["in_flight"] == 1
+
+    release.set()
+    assert await first and await second
+    assert log == ["ac1", "ac2", "ac1 again"]
+
+
+async def test_rate_limit(make_scheduler):
+    """Past the burst, commands are paced at the configured rate."""
+    scheduler = make_scheduler(rate=20, burst=2)
+    log = []
+    start = time.monotonic()
+
+    await asyncio.gather(
+        *(scheduler.async_submit(f"ac{index}", recorder(log, index)) for index in range(4))
+    )
+
+    # Two commands go at once, the other two wait 50ms each for a token
+    assert time.monotonic() - start >= 0.09
+    assert sorted(log) == [0, 1, 2, 3]
+    assert scheduler.max_depth == 4
+
+
+async def test_send_error(make_scheduler):
+    """A send that raises fails its command and releases the device."""
+    scheduler = make_scheduler()
+
+    async def broken() -> bool:
+        raise RuntimeError("boom")
+
+    assert not await scheduler.async_submit("ac1", broken)
+    assert await scheduler.async_submit("ac1", recorder([], "next"))
+
+
+async def test_stop_fails_queued(make_scheduler):
+    """Stopping the scheduler fails every command still queued."""
+    scheduler = make_scheduler()
+    release = asyncio.Event()
+
+    async def blocked() -> bool:
+        await release.wait()
+        return True
+
+    running = asyncio.ensure_future(scheduler.async_submit("ac1", blocked))
+    queued = asyncio.ensure_future(scheduler.async_submit("ac1", blocked))
+    await asyncio.sleep(0.01)
+
+    scheduler.stop()
+
+    assert await running is False
+    assert await queued is False
+    assert scheduler.depth == 0
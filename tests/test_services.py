@@ -0,0 +1,100 @@
+"""Tests for the apply_state service."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from custom_components.bluestar_ac.const import DATA_CLIENTS, DOMAIN, SERVICE_APPLY_STATE
+from custom_components.bluestar_ac.scheduler import Priority
+from custom_components.bluestar_ac.services import async_setup_services
+
+DEVICE_IDS = ("fa0000000000", "fa0000000001", "fa0000000002")
+
+
+@pytest.fixture
+def clients(hass):
+    """Register three ACs with a device each and the service."""
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    clients = {}
+    for device_id in DEVICE_IDS:
+        client = clients[device_id] = MagicMock()
+        client.async_set_state = AsyncMock(return_value=True)
+        dr.async_get(hass).async_get_or_create(
+            config_entry_id=entry.entry_id, identifiers={(DOMAIN, device_id)}
+        )
+    hass.data[DOMAIN] = {entry.entry_id: {DATA_CLIENTS: clients}}
+    async_setup_services(hass)
+    return clients
+
+
+async def apply_state(hass, data, target=None):
+    """Call the service and return its response."""
+    return await hass.services.async_call(
+        DOMAIN, SERVICE_APPLY_STATE, data, target=target, blocking=True, return_response=True
+    )
+
+
+def device_entry(hass, device_id):
+    """Return the registry entry of an AC's device."""
+    return dr.async_get(hass).async_get_device(identifiers={(DOMAIN, device_id)})
+
+
+async def test_no_target_applies_to_all(hass, clients):
+    """Without a target every AC gets the state."""
+    response = await apply_state(hass, {"temperature": 22})
+
+    assert sorted(response["results"]) == sorted(DEVICE_IDS)
+    assert response["succeeded"] == 3
+    for client in clients.values():
+        client.async_set_state.assert_awaited_once_with(
+            Priority.NORMAL, False, None, temperature=22.0
+        )
+
+
+async def test_device_target(hass, clients):
+    """Targeting a device changes only its AC."""
+    response = await apply_state(
+        hass,
+        {"power": False, "transport": "rest", "force": True},
+        {"device_id": device_entry(hass, DEVICE_IDS[1]).id},
+    )
+
+    assert list(response["results"]) == [DEVICE_IDS[1]]
+    clients[DEVICE_IDS[1]].async_set_state.assert_awaited_once_with(
+        Priority.NORMAL, True, "rest", power=False
+    )
+    clients[DEVICE_IDS[0]].async_set_state.assert_not_awaited()
+
+
+async def test_entity_target(hass, clients):
+    """Targeting an entity changes the AC it belongs to."""
+    entity = er.async_get(hass).async_get_or_create(
+        "climate", DOMAIN, f"bluestar_ac_{DEVICE_IDS[2]}",
+        device_id=device_entry(hass, DEVICE_IDS[2]).id,
+    )
+
+    response = await apply_state(hass, {"hvac_mode": "cool"}, {"entity_id": entity.entity_id})
+
+    assert list(response["results"]) == [DEVICE_IDS[2]]
+
+
+async def test_empty_target_applies_to_none(hass, clients):
+    """An empty target changes no AC rather than all of them."""
+    response = await apply_state(hass, {"power": True}, {"entity_id": []})
+
+    assert response["results"] == {}
+    for client in clients.values():
+        client.async_set_state.assert_not_awaited()
+
+
+async def test_failures_reported(hass, clients):
+    """ACs whose command failed are counted and listed."""
+    clients[DEVICE_IDS[0]].async_set_state.return_value = False
+
+    response = await apply_state(hass, {"power": True})
+
+    assert response["failed"] == 1
+    assert not response["results"][DEVICE_IDS[0]]["success"]
@@ -0,0 +1,111 @@
+"""Tests for background session renewal."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.bluestar_ac.session import SessionRefresher
+
+
+@pytest.fixture
+def api():
+    """Return a REST client with a session valid for a moment."""
+    api = MagicMock()
+    api.session_expires_in = 0.05
+
+    async def refresh_session() -> bool:
+        api.session_expires_in = 3600
+        return True
+
+    api.refresh_session = AsyncMock(side_effect=refresh_session)
+    return api
+
+
+@pytest.fixture
+async def make_refresher(api):
+    """Return a refresher factory; every refresher is stopped afterwards."""
+    refreshers = []
+
+    def make(**kwargs) -> SessionRefresher:
+        refresher = SessionRefresher(api, **kwargs)
+        refreshers.append(refresher)
+        return refresher
+
+    yield make
+    for refresher in refreshers:
+        refresher.stop()
+    await asyncio.sleep(0)
+
+
+async def wait_refreshed(refresher: SessionRefresher) -> None:
+    """Wait for the next successful renewal."""
+    refreshed = asyncio.Event()
+    refresher.on_refresh = refreshed.set
+    await asyncio.wait_for(refreshed.wait(), 5)
+
+
+async def test_renews_before_expiry(make_refresher, api):
+    """The session is renewed within the margin before it expires."""
+    refresher = make_refresher(margin=0.04)
+    refresher.start()
+
+    await wait_refreshed(refresher)
+
+    api.refresh_session.assert_awaited_once()
+    assert refresher.failures == 0
+    # The next renewal is planned against the new session
+    await asyncio.sleep(0)
+    assert 3600 - 0.04 - 0.05 <= refresher.refresh_in <= 3600 - 0.02
+
+
+async def test_jitter(make_refresher, api):
+    """Renewal happens between half the margin and the margin early."""
+    api.session_expires_in = 100
+    refresher = make_refresher(margin=10)
+    refresher.start()
+    await asyncio.sleep(0)
+
+    assert 90 - 0.05 <= refresher.refresh_in <= 95
+
+
+async def test_retry_after_failure(make_refresher, api):
+    """A failed renewal is retried after the retry delay."""
+    outcomes = iter([False, True])
+    failures = []
+
+    async def refresh_session() -> bool:
+        failures.append(refresher.failures)
+        return next(outcomes)
+
+    api.refresh_session.side_effect = refresh_session
+    refresher = make_refresher(margin=0.04, retry_delay=0.01)
+    refresher.start()
+
+    await wait_refreshed(refresher)
+
+    assert failures == [0, 1]
+    assert refresher.failures == 0
+
+
+async def test_no_session(make_refresher, api):
+    """Without a live session nothing is renewed."""
+    api.session_expires_in = 0
+    refresher = make_refresher(retry_delay=60)
+    refresher.start()
+    await asyncio.sleep(0.01)
+
+    api.refresh_session.assert_not_awaited()
+    assert 59 <= refresher.refresh_in <= 60
+
+
+async def test_stop(make_refresher):
+    """A refresher reports no renewal while stopped."""
+    refresher = make_refresher()
+    assert refresher.refresh_in is None
+
+    refresher.start()
+    await asyncio.sleep(0)
+    assert refresher.refresh_in is not None
+
+    refresher.stop()
+    assert refresher.refresh_in is None
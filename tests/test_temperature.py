@@ -0,0 +1,114 @@
+"""Tests for the room temperature deadband and update interval."""
+import pytest
+
+from custom_components.bluestar_ac import temperature
+from custom_components.bluestar_ac.const import (
+    CONF_TEMPERATURE_DEADBAND,
+    CONF_TEMPERATURE_INTERVAL,
+    DEFAULT_TEMPERATURE_DEADBAND,
+    DEFAULT_TEMPERATURE_INTERVAL,
+)
+from custom_components.bluestar_ac.temperature import RoomTemperature, room_temperature
+
+
+class Clock:
+    """Stand-in for the ``time`` module with a settable monotonic clock."""
+
+    def __init__(self):
+        """Start at an arbitrary point."""
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the clock the filter reads."""
+    clock = Clock()
+    monkeypatch.setattr(temperature, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def room(clock):
+    """Return a filter with a 0.3 degree deadband and 60s interval, showing 30.5."""
+    room = RoomTemperature(0.3, 60)
+    assert room.update(30.5)
+    return room
+
+
+def test_first_reading(room):
+    """The first reading is always shown."""
+    assert room.value == 30.5
+    assert room.pending is None
+    assert room.retry_in is None
+
+
+def test_deadband(room, clock):
+    """Readings within the deadband are dropped."""
+    clock.now += 600
+
+    assert not room.update(30.4)
+    assert not room.update(30.7)
+    assert room.value == 30.5
+
+
+def test_change_shown_after_interval(room, clock):
+    """A change beyond the deadband is shown once the interval has passed."""
+    clock.now += 60
+
+    assert room.update(31.0)
+    assert room.value == 31.0
+
+
+def test_change_held_back(room, clock):
+    """A change within the interval is held back until flushed."""
+    clock.now += 20
+
+    assert not room.update(31.0)
+    assert room.value == 30.5
+    assert room.pending == 31.0
+    assert room.retry_in == 40
+
+    assert room.flush()
+    assert room.value == 31.0
+    assert room.pending is None
+    assert not room.flush()
+
+
+def test_held_back_reading_dropped(room, clock):
+    """A reading back within the deadband cancels a held-back one."""
+    clock.now += 20
+    room.update(31.0)
+
+    assert not room.update(30.6)
+    assert room.pending is None
+    assert room.retry_in is None
+
+
+def test_interval_restarts_on_flush(room, clock):
+    """Flushing counts as showing a value for the interval."""
+    clock.now += 30
+    room.update(31.0)
+    clock.now += 30
+    room.flush()
+    clock.now += 30
+
+    assert not room.update(32.0)
+    assert room.retry_in == 30
+
+
+def test_room_temperature_options(clock):
+    """The filter uses the entry options, or the defaults."""
+    configured = room_temperature({CONF_TEMPERATURE_DEADBAND: 1.0, CONF_TEMPERATURE_INTERVAL: 0})
+    configured.update(20.0)
+    assert not configured.update(20.9)
+    assert configured.update(21.0)
+
+    default = room_temperature({})
+    default.update(20.0)
+    assert not default.update(20.0 + DEFAULT_TEMPERATURE_DEADBAND / 2)
+    clock.now += DEFAULT_TEMPERATURE_INTERVAL
+    assert default.update(20.0 + DEFAULT_TEMPERATURE_DEADBAND)
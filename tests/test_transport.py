@@ -0,0 +1,133 @@
+"""Tests for the adaptive transport selection."""
+import time
+
+from custom_components.bluestar_ac.transport import (
+    TRANSPORT_MQTT,
+    TRANSPORT_REST,
+    TransportSelector,
+)
+
+
+def test_unmeasured_order():
+    """Without samples, the transports keep their configured order."""
+    assert TransportSelector().order() == [TRANSPORT_MQTT, TRANSPORT_REST]
+
+
+def test_faster_first():
+    """The transport with the lower smoothed latency goes first."""
+    selector = TransportSelector()
+    selector.record(TRANSPORT_MQTT, 0.5, True)
+    selector.record(TRANSPORT_REST, 0.1, True)
+
+    assert selector.order() == [TRANSPORT_REST, TRANSPORT_MQTT]
+
+
+def test_unmeasured_first():
+    """A transport without samples is tried before a measured one."""
+    selector = TransportSelector()
+    selector.record(TRANSPORT_MQTT, 0.05, True)
+
+    assert selector.order() == [TRANSPORT_REST, TRANSPORT_MQTT]
+
+
+def test_latency_smoothing():
+    """Latency is an exponentially weighted moving average of successes."""
+    selector = TransportSelector(alpha=0.5)
+    selector.record(TRANSPORT_REST, 1.0, True)
+    selector.record(TRANSPORT_REST, 3.0, True)
+    selector.record(TRANSPORT_REST, 0.01, False)
+
+    health = selector.health[TRANSPORT_REST]
+    assert health.latency == 2.0
+    assert health.success_rate == 0.5
+    assert health.samples == 3
+
+
+def test_failures_weigh_latency():
+    """A fast transport that keeps failing ranks below a reliable one."""
+    selector = TransportSelector(alpha=0.5)
+    selector.record(TRANSPORT_REST, 0.2, True)
+    selector.record(TRANSPORT_MQTT, 0.1, True)
+    selector.record(TRANSPORT_MQTT, 0.1, False)
+    selector.record(TRANSPORT_MQTT, 0.1, False)
+
+    assert selector.order() == [TRANSPORT_REST, TRANSPORT_MQTT]
+
+
+def test_disconnected_mqtt_last():
+    """MQTT goes last while its connection is down."""
+    selector = TransportSelector()
+    selector.record(TRANSPORT_MQTT, 0.01, True)
+    selector.record(TRANSPORT_REST, 1.0, True)
+
+    assert selector.order(mqtt_connected=True) == [TRANSPORT_MQTT, TRANSPORT_REST]
+    assert selector.order(mqtt_connected=False) == [TRANSPORT_REST, TRANSPORT_MQTT]
+
+
+def test_cooldown():
+    """Consecutive failures put a transport last for the cooldown."""
+    selector = TransportSelector(failure_threshold=2, cooldown=60)
+    selector.record(TRANSPORT_MQTT, 1.0, True)
+    selector.record(TRANSPORT_REST, 0.1, True)
+    selector.record(TRANSPORT_REST, 0.1, False)
+    assert selector.order() == [TRANSPORT_REST, TRANSPORT_MQTT]
+
+    selector.record(TRANSPORT_REST, 0.1, False)
+
+    health = selector.health[TRANSPORT_REST]
+    assert health.failures == 2
+    assert health.retry_at > time.monotonic()
+    assert selector.order() == [TRANSPORT_MQTT, TRANSPORT_REST]
+    assert selector.as_dict()[TRANSPORT_REST]["cooldown"] > 0
+
+
+def test_probe_after_cooldown():
+    """Once its cooldown is over, a failed transport is probed first."""
+    selector = TransportSelector(failure_threshold=2, cooldown=0)
+    selector.record(TRANSPORT_MQTT, 0.1, True)
+    selector.record(TRANSPORT_REST, 0.1, False)
+    selector.record(TRANSPORT_REST, 0.1, False)
+
+    assert selector.order() == [TRANSPORT_REST, TRANSPORT_MQTT]
+    # Ranking has no side effects, so diagnostics do not use up the probe
+    assert selector.order() == [TRANSPORT_REST, TRANSPORT_MQTT]
+
+    selector.record(TRANSPORT_REST, 0.5, True)
+
+    health = selector.health[TRANSPORT_REST]
+    assert health.failures == 0
+    assert health.retry_at == 0
+    assert selector.order() == [TRANSPORT_MQTT, TRANSPORT_REST]
+
+
+def test_unknown_transport_ignored():
+    """Results for a transport the selector does not use are ignored."""
+    selector = TransportSelector([TRANSPORT_MQTT])
+    selector.record(TRANSPORT_REST, 0.1, False)
+
+    assert selector.order() == [TRANSPORT_MQTT]
+    assert set(selector.as_dict()) == {"order", TRANSPORT_MQTT}
+
+
+def test_as_dict():
+    """Diagnostics show the order and each transport's health."""
+    selector = TransportSelector()
+    selector.record(TRANSPORT_REST, 0.25, True)
+
+    assert selector.as_dict() == {
+        "order": [TRANSPORT_MQTT, TRANSPORT_REST],
+        TRANSPORT_MQTT: {
+            "latency_ms": None,
+            "success_rate": 1.0,
+            "failures": 0,
+            "samples": 0,
+            "cooldown": 0,
+        },
+        TRANSPORT_REST: {
+            "latency_ms": 250.0,
+            "success_rate": 1.0,
+            "failures": 0,
+            "samples": 1,
+            "cooldown": 0,
+        },
+    }
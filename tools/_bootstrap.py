@@ -0,0 +1,22 @@
+"""Make the integration's client modules importable from tools.
+
+Importing ``custom_components.bluestar_ac.<module>`` normally runs the
+package ``__init__``, which pulls in the config entry machinery and every
+platform. The tools only use the transport and client modules, so the
+packages are registered without running their ``__init__`` files.
+"""
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+PACKAGES = {
+    "custom_components": ROOT / "custom_components",
+    "custom_components.bluestar_ac": ROOT / "custom_components" / "bluestar_ac",
+}
+
+for _name, _path in PACKAGES.items():
+    if _name not in sys.modules:
+        _module = types.ModuleType(_name)
+        _module.__path__ = [str(_path)]
+        sys.modules[_name] = _module
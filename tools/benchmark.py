@@ -0,0 +1,346 @@
+"""Latency and throughput benchmark for the Bluestar client layer.
+
+Drives ``BluestarClient`` (REST) and ``BluestarACClient`` (MQTT shadow)
+against the local stand-in cloud from ``fake_cloud.py`` and prints the
+results as JSON, so runs can be stored and compared between releases::
+
+    python tools/benchmark.py --iterations 200 --latency 0.02 --output bench.json
+
+Latencies are in milliseconds. ``send`` is the time until a ``set_*``
+call returns; ``roundtrip`` is the time until the change comes back on
+the device shadow. Throughput is commands per second sustained across
+all devices sharing one MQTT connection.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import aiohttp
+
+import _bootstrap
+from fake_cloud import FakeBluestarCloud
+from custom_components.bluestar_ac.api_client import BluestarClient
+from custom_components.bluestar_ac.aws_iot import (
+    BluestarIoTConnection,
+    IoTConnectionError,
+    decode_credentials,
+)
+from custom_components.bluestar_ac.bluestar_client import BluestarACClient
+from custom_components.bluestar_ac.scheduler import COMMAND_RATE, CommandScheduler
+from custom_components.bluestar_ac.transport import (
+    TRANSPORT_MQTT,
+    TRANSPORTS,
+    TransportSelector,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+USERNAME = "bench@example.com"
+PASSWORD = "bench"
+DEVICE_COUNTS = (1, 10, 100)
+
+# Alternating calls per command so every command changes the state
+SET_COMMANDS: Dict[str, List[Callable[[BluestarACClient], Awaitable[bool]]]] = {
+    "set_power": [
+        lambda client: client.async_set_power(True),
+        lambda client: client.async_set_power(False),
+    ],
+    "set_temperature": [
+        lambda client: client.async_set_temperature(22),
+        lambda client: client.async_set_temperature(25),
+    ],
+    "set_mode": [
+        lambda client: client.async_set_mode("cool"),
+        lambda client: client.async_set_mode("dry"),
+    ],
+    "set_fan_mode": [
+        lambda client: client.async_set_fan_mode("low"),
+        lambda client: client.async_set_fan_mode("high"),
+    ],
+    "set_swing_mode": [
+        lambda client: client.async_set_swing_mode("vertical"),
+        lambda client: client.async_set_swing_mode("off"),
+    ],
+    "set_preset_mode": [
+        lambda client: client.async_set_preset_mode("eco"),
+        lambda client: client.async_set_preset_mode("none"),
+    ],
+    "set_display": [
+        lambda client: client.async_set_display(False),
+        lambda client: client.async_set_display(True),
+    ],
+    "set_buzzer": [
+        lambda client: client.async_set_buzzer(False),
+        lambda client: client.async_set_buzzer(True),
+    ],
+}
+
+
+class BenchAccount:
+    """The parts of ``BluestarAccount`` that ``BluestarACClient`` uses."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        api: BluestarClient,
+        rate: float = COMMAND_RATE,
+        transports: Sequence[str] = (TRANSPORT_MQTT,),
+    ):
+        """Initialize the account; commands only use ``transports``."""
+        self.api = api
+        self.metrics = api.metrics
+        self.trace = api.trace
+        self.scheduler = CommandScheduler(rate, metrics=api.metrics)
+        self.transports = TransportSelector(transports)
+        self.available = True
+        self.connection: Optional[BluestarIoTConnection] = None
+        self._session = session
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the MQTT connection is up."""
+        return self.connection is not None and self.connection.connected
+
+    async def async_connect(self) -> bool:
+        """Log in and open the MQTT connection."""
+        if not await self.api.ensure_authenticated():
+            return False
+        if self.connection is None:
+            self.connection = BluestarIoTConnection(
+                self._session,
+                decode_credentials(self.api.iot_credentials),
+                f"u-{self.api.user_id}",
+            )
+        try:
+            await self.connection.connect()
+        except IoTConnectionError as e:
+            _LOGGER.error("Failed to connect: %s", e)
+            return False
+        return True
+
+    async def async_close(self) -> None:
+        """Stop the scheduler and close the MQTT connection."""
+        self.scheduler.stop()
+        if self.connection:
+            await self.connection.disconnect()
+
+
+class Recorder:
+    """Collects samples per operation."""
+
+    def __init__(self):
+        """Initialize an empty recorder."""
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    async def time(self, name: str, call: Awaitable[Any]) -> Any:
+        """Await a call, recording its duration and whether it failed."""
+        start = time.perf_counter()
+        result = await call
+        self.add(name, time.perf_counter() - start, bool(result))
+        return result
+
+    def add(self, name: str, seconds: float, ok: bool = True) -> None:
+        """Record one sample."""
+        self.samples.setdefault(name, []).append(seconds * 1000)
+        self.errors.setdefault(name, 0)
+        if not ok:
+            self.errors[name] += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return count, errors, mean and percentiles per operation."""
+        return {
+            name: {
+                "count": len(samples),
+                "errors": self.errors[name],
+                "mean": round(sum(samples) / len(samples), 3),
+                "p50": percentile(samples, 50),
+                "p95": percentile(samples, 95),
+                "p99": percentile(samples, 99),
+                "max": round(max(samples), 3),
+            }
+            for name, samples in sorted(self.samples.items())
+            if samples
+        }
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of the samples."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return round(ordered[rank - 1], 3)
+
+
+class ShadowWaiter:
+    """Resolves a future when the shadow echoes a device's state back."""
+
+    def __init__(self):
+        """Initialize with no waiters."""
+        self._waiters: Dict[str, asyncio.Future] = {}
+
+    def expect(self, device_id: str) -> asyncio.Future:
+        """Return a future for the next state pushed for the device."""
+        future = self._waiters[device_id] = asyncio.get_running_loop().create_future()
+        return future
+
+    def __call__(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Shadow callback passed to ``async_subscribe_shadow``."""
+        future = self._waiters.pop(device_id, None)
+        if future and not future.done():
+            future.set_result(state)
+
+
+async def bench_rest(api: BluestarClient, device_id: str, iterations: int, recorder: Recorder) -> None:
+    """Measure login, device listing and status polling."""
+    for _ in range(iterations):
+        api.invalidate_session()
+        await recorder.time("login", api.ensure_authenticated())
+    for _ in range(iterations):
+        await recorder.time("get_devices", api.get_devices())
+    for _ in range(iterations):
+        await recorder.time("get_device_status", api.get_device_status(device_id))
+
+
+async def bench_commands(
+    client: BluestarACClient, waiter: ShadowWaiter, iterations: int, timeout: float, recorder: Recorder
+) -> None:
+    """Measure every ``set_*`` command, sent and round-tripped."""
+    for name, calls in SET_COMMANDS.items():
+        for index in range(iterations):
+            echoed = waiter.expect(client.device_id)
+            start = time.perf_counter()
+            ok = await calls[index % len(calls)](client)
+            recorder.add(f"{name}.send", time.perf_counter() - start, ok)
+            if not ok:
+                continue
+            try:
+                await asyncio.wait_for(echoed, timeout)
+            except asyncio.TimeoutError:
+                recorder.add(f"{name}.roundtrip", timeout, False)
+            else:
+                recorder.add(f"{name}.roundtrip", time.perf_counter() - start)
+
+
+async def bench_throughput(clients: List[BluestarACClient], duration: float) -> Dict[str, float]:
+    """Send commands from every client concurrently for ``duration`` seconds."""
+    sent = failed = 0
+    deadline = time.perf_counter() + duration
+
+    async def drive(client: BluestarACClient) -> None:
+        nonlocal sent, failed
+        calls = SET_COMMANDS["set_temperature"]
+        index = 0
+        while time.perf_counter() < deadline:
+            if await calls[index % len(calls)](client):
+                sent += 1
+            else:
+                failed += 1
+            index += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(client) for client in clients))
+    elapsed = time.perf_counter() - start
+    return {
+        "devices": len(clients),
+        "commands": sent,
+        "errors": failed,
+        "seconds": round(elapsed, 3),
+        "commands_per_second": round(sent / elapsed, 1),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the fake cloud, run every benchmark and return the report."""
+    device_counts = sorted(set(args.devices))
+    recorder = Recorder()
+    throughput = []
+    cloud = FakeBluestarCloud(
+        device_count=max(device_counts),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    async with cloud, aiohttp.ClientSession() as session:
+        device_ids = list(cloud.devices)
+        api = BluestarClient(USERNAME, PASSWORD, base_url=cloud.base_url)
+        transports = TRANSPORTS if args.transport == "auto" else (args.transport,)
+        account = BenchAccount(session, api, args.rate, transports)
+        clients: List[BluestarACClient] = []
+        try:
+            await bench_rest(api, device_ids[0], args.iterations, recorder)
+
+            if not await account.async_connect():
+                raise SystemExit("Could not connect to the fake cloud")
+            waiter = ShadowWaiter()
+            window = args.coalesce_window / 1000
+            clients = [BluestarACClient(account, device_id, window) for device_id in device_ids]
+            await clients[0].async_subscribe_shadow(waiter)
+            await bench_commands(clients[0], waiter, args.iterations, args.timeout, recorder)
+
+            for count in device_counts:
+                throughput.append(await bench_throughput(clients[:count], args.duration))
+        finally:
+            for client in clients:
+                await client.async_close()
+            await account.async_close()
+            await api.close()
+
+    return {
+        "meta": {
+            "version": json.loads(
+                (_bootstrap.ROOT / "custom_components" / "bluestar_ac" / "manifest.json").read_text()
+            )["version"],
+            "python": platform.python_version(),
+            "timestamp": int(time.time()),
+            "iterations": args.iterations,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "coalesce_window_ms": args.coalesce_window,
+            "rate": args.rate,
+            "transport": args.transport,
+            "duration": args.duration,
+        },
+        "latency_ms": recorder.summary(),
+        "throughput": throughput,
+        "client_metrics": api.metrics.as_dict(),
+        "transports": account.transports.as_dict(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the benchmark and print or save the JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100, help="samples per operation")
+    parser.add_argument("--devices", type=int, nargs="+", default=list(DEVICE_COUNTS))
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per throughput run")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake cloud delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake cloud failure rate")
+    parser.add_argument("--coalesce-window", type=float, default=0.0, help="milliseconds")
+    parser.add_argument("--rate", type=float, default=COMMAND_RATE, help="commands per second")
+    parser.add_argument(
+        "--transport", choices=("auto", *TRANSPORTS), default=TRANSPORT_MQTT,
+        help="command transport; auto lets the selector choose",
+    )
+    parser.add_argument("--timeout", type=float, default=5.0, help="roundtrip timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the report here instead of stdout")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,442 @@
+"""Local stand-in for the Bluestar cloud.
+
+Serves the REST endpoints used by ``BluestarClient`` and an MQTT-over-
+WebSocket broker that emulates the AWS IoT device shadow, so the client
+layer can be exercised and benchmarked without the real ap-south-1
+endpoints.
+
+Run it standalone::
+
+    python tools/fake_cloud.py --devices 12 --latency 0.05 --error-rate 0.01
+
+or embed it::
+
+    async with FakeBluestarCloud(device_count=10) as cloud:
+        client = BluestarClient("user@example.com", "secret", base_url=cloud.base_url)
+
+Any username and password are accepted except the password ``wrong``.
+The login ``mi`` blob points the MQTT transport back at this server.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import random
+import struct
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+from aiohttp import WSMsgType, web
+
+import _bootstrap  # noqa: F401
+from custom_components.bluestar_ac.aws_iot import (  # noqa: E402
+    CONNACK,
+    CONNECT,
+    DISCONNECT,
+    PINGREQ,
+    PINGRESP,
+    PUBLISH,
+    SUBACK,
+    SUBSCRIBE,
+    UNSUBACK,
+    UNSUBSCRIBE,
+    _packet,
+    decode_publish,
+    encode_publish,
+    read_packet,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+SHADOW_PREFIX = "$aws/things/"
+# AWS IoT rejects a SUBSCRIBE with more topic filters than this
+TOPICS_PER_SUBSCRIBE = 8
+
+MODEL_CONFIG = {
+    "min_temp": 16,
+    "max_temp": 30,
+    "mode": {
+        "0": {"name": "fan", "fspd": {"fixed": False, "default": 2}},
+        "2": {"name": "cool", "fspd": {"fixed": False, "default": 7},
+              "stemp": {"fixed": False, "default": "24"}},
+        "3": {"name": "dry", "fspd": {"fixed": True, "default": 2},
+              "stemp": {"fixed": False, "default": "24"}},
+        "4": {"name": "auto", "fspd": {"fixed": True, "default": 7},
+              "stemp": {"fixed": False, "default": "24"}},
+    },
+    "fspd": {"2": "low", "3": "med", "4": "high", "6": "turbo", "7": "auto"},
+}
+MODEL_ID = "da8d34d2-449f-42be-a537-6391772dfb86"
+
+
+class FakeDevice:
+    """Shadow of one emulated AC."""
+
+    def __init__(self, thing_id: str):
+        """Initialize the device with the documented sample state."""
+        self.thing_id = thing_id
+        self.reported: Dict[str, Any] = {
+            "pow": 0,
+            "mode": 2,
+            "stemp": "24.0",
+            "fspd": 7,
+            "ctemp": "30.5",
+            "src": "fake",
+        }
+        self.desired: Dict[str, Any] = {}
+        self.version = 1
+        self.timestamp = int(time.time())
+
+    def apply(self, changes: Dict[str, Any]) -> None:
+        """Apply control values as the AC would and bump the version."""
+        for key, value in changes.items():
+            if key in ("ts", "src"):
+                continue
+            if key == "stemp":
+                self.reported[key] = f"{float(value):.1f}"
+            else:
+                try:
+                    self.reported[key] = int(value)
+                except (TypeError, ValueError):
+                    self.reported[key] = value
+        self.desired = {}
+        self.version += 1
+        self.timestamp = int(time.time())
+
+    def thing(self) -> Dict[str, Any]:
+        """Return the ``/things`` entry of the device."""
+        return {
+            "thing_id": self.thing_id,
+            "type": 1,
+            "model_id": MODEL_ID,
+            "f_ver": "0.5.7",
+            "user_config": {"name": f"AC {self.thing_id[-4:]}"},
+            "model_config": MODEL_CONFIG,
+        }
+
+
+class FakeBluestarCloud:
+    """REST API and shadow broker on one aiohttp server.
+
+    ``latency`` delays every REST response and shadow reply, ``error_rate``
+    is the probability that a REST call fails with 503 or a shadow update
+    is rejected, and ``device_delay`` is how long an emulated AC takes to
+    report a desired change.
+    """
+
+    def __init__(
+        self,
+        device_count: int = 1,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        device_delay: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+    ):
+        """Initialize the fake cloud."""
+        self.latency = latency
+        self.error_rate = error_rate
+        self.device_delay = device_delay
+        self.host = host
+        self.port = port
+        self.devices: Dict[str, FakeDevice] = {
+            f"fa{index:010x}": FakeDevice(f"fa{index:010x}")
+            for index in range(device_count)
+        }
+        self.sessions: Set[str] = set()
+        self.user_id = str(uuid.uuid4())
+        self.request_counts: Dict[str, int] = {}
+        self._random = random.Random(seed)
+        self._subscribers: Dict[web.WebSocketResponse, Set[str]] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        """Return the REST base URL to pass to ``BluestarClient``."""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        """Start serving; with port 0 a free port is picked."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/auth/login", self._login)
+        app.router.add_get("/things", self._things)
+        app.router.add_get("/things/{thing_id}/state", self._state)
+        app.router.add_post("/things/{thing_id}/state", self._state_write)
+        app.router.add_post("/things/{thing_id}/preferences", self._preferences)
+        app.router.add_get("/mqtt", self._mqtt)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        _LOGGER.info("Fake Bluestar cloud listening on %s", self.base_url)
+
+    async def stop(self) -> None:
+        """Stop serving and drop MQTT clients."""
+        for ws in list(self._subscribers):
+            await ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeBluestarCloud":
+        """Start on context entry."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Stop on context exit."""
+        await self.stop()
+
+    def _fail(self) -> bool:
+        """Return True if this call should fail."""
+        return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    # REST API
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        """Count requests and inject latency and errors."""
+        resource = request.match_info.route.resource
+        key = f"{request.method} {resource.canonical if resource else request.path}"
+        self.request_counts[key] = self.request_counts.get(key, 0) + 1
+        if request.path == "/mqtt":
+            return await handler(request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._fail():
+            return web.json_response({"message": "Injected failure"}, status=503)
+        return await handler(request)
+
+    def _authorized(self, request: web.Request) -> bool:
+        """Return True if the request carries a valid session."""
+        return request.headers.get("X-APP-SESSION") in self.sessions
+
+    async def _login(self, request: web.Request) -> web.Response:
+        """Handle ``POST /auth/login``."""
+        body = await request.json()
+        if body.get("password") == "wrong":
+            return web.json_response({"message": "Invalid credentials"}, status=401)
+        session = str(uuid.uuid4())
+        self.sessions.add(session)
+        mi = base64.b64encode(
+            f"ws://{self.host}:{self.port}::AKIAFAKEFAKEFAKE::fakesecret".encode()
+        ).decode()
+        return web.json_response({
+            "session": session,
+            "user": {"id": self.user_id, "name": "Fake", "email": body.get("auth_id")},
+            "mi": mi,
+        })
+
+    async def _things(self, request: web.Request) -> web.Response:
+        """Handle ``GET /things``."""
+        if not self._authorized(request):
+            return web.json_response({"message": "Not authenticated"}, status=401)
+        return web.json_response({
+            "things": [device.thing() for device in self.devices.values()],
+            "states": {
+                thing_id: {"state": dict(device.reported), "connected": True}
+                for thing_id, device in self.devices.items()
+            },
+        })
+
+    async def _state(self, request: web.Request) -> web.Response:
+        """Handle ``GET /things/{id}/state``."""
+        if not self._authorized(request):
+            return web.json_response({"message": "Not authenticated"}, status=401)
+        device = self.devices.get(request.match_info["thing_id"])
+        if device is None:
+            return web.json_response({"message": "Not found"}, status=404)
+        return web.json_response({"data": {"state": dict(device.reported)}})
+
+    async def _state_write(self, request: web.Request) -> web.Response:
+        """Reject writes to ``/state`` the way the real API does."""
+        return web.json_response({"message": "Missing Authentication Token"}, status=403)
+
+    async def _preferences(self, request: web.Request) -> web.Response:
+        """Handle ``POST /things/{id}/preferences``."""
+        if not self._authorized(request):
+            return web.json_response({"message": "Not authenticated"}, status=401)
+        device = self.devices.get(request.match_info["thing_id"])
+        if device is None:
+            return web.json_response({"message": "Not found"}, status=404)
+        body = await request.json()
+        device.apply(body.get("preferences", {}))
+        await self._publish_reported(device)
+        return web.json_response({"code": "STATUS_SUCCESS", "message": "Request successfull"})
+
+    # Shadow broker
+
+    async def _mqtt(self, request: web.Request) -> web.WebSocketResponse:
+        """Serve one MQTT-over-WebSocket client."""
+        ws = web.WebSocketResponse(protocols=("mqtt",))
+        await ws.prepare(request)
+        self._subscribers[ws] = set()
+        buffer = bytearray()
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.BINARY:
+                    continue
+                buffer.extend(message.data)
+                while (packet := read_packet(buffer)) is not None:
+                    if not await self._handle_packet(ws, *packet):
+                        await ws.close()
+                        break
+        finally:
+            self._subscribers.pop(ws, None)
+        return ws
+
+    async def _handle_packet(self, ws: web.WebSocketResponse, first_byte: int, body: bytes) -> bool:
+        """Handle one packet; return False to close the connection."""
+        packet_type = first_byte & 0xF0
+        if packet_type == CONNECT:
+            await ws.send_bytes(_packet(CONNACK, b"\x00\x00"))
+        elif packet_type == SUBSCRIBE:
+            packet_id, topics = self._decode_topics(body, with_qos=True)
+            code = b"\x00"
+            if len(topics) > TOPICS_PER_SUBSCRIBE:
+                code = b"\x80"
+            else:
+                self._subscribers[ws].update(topics)
+            await ws.send_bytes(
+                _packet(SUBACK, struct.pack("!H", packet_id) + code * len(topics))
+            )
+        elif packet_type == UNSUBSCRIBE:
+            packet_id, topics = self._decode_topics(body, with_qos=False)
+            self._subscribers[ws].difference_update(topics)
+            await ws.send_bytes(_packet(UNSUBACK, struct.pack("!H", packet_id)))
+        elif packet_type == PINGREQ:
+            await ws.send_bytes(_packet(PINGRESP))
+        elif packet_type == PUBLISH:
+            topic, payload, _, _ = decode_publish(first_byte, body)
+            asyncio.get_running_loop().create_task(self._handle_publish(topic, payload))
+        elif packet_type == DISCONNECT:
+            return False
+        return True
+
+    @staticmethod
+    def _decode_topics(body: bytes, with_qos: bool):
+        """Decode the topic list of a SUBSCRIBE or UNSUBSCRIBE packet."""
+        (packet_id,) = struct.unpack_from("!H", body)
+        offset, topics = 2, []
+        while offset < len(body):
+            (length,) = struct.unpack_from("!H", body, offset)
+            topics.append(body[offset + 2:offset + 2 + length].decode())
+            offset += 2 + length + (1 if with_qos else 0)
+        return packet_id, topics
+
+    async def _handle_publish(self, topic: str, payload: bytes) -> None:
+        """Emulate the shadow service for a published message."""
+        if not topic.startswith(SHADOW_PREFIX):
+            return
+        thing_id, _, action = topic[len(SHADOW_PREFIX):].partition("/shadow/")
+        device = self.devices.get(thing_id)
+        if device is None:
+            return
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        base = f"{SHADOW_PREFIX}{thing_id}/shadow"
+        if action == "get":
+            answer = {
+                "state": {"reported": dict(device.reported), "desired": dict(device.desired)},
+                "version": device.version,
+                "timestamp": device.timestamp,
+            }
+            try:
+                token = json.loads(payload).get("clientToken")
+            except (ValueError, AttributeError):
+                token = None
+            if token:
+                answer["clientToken"] = token
+            await self._send(f"{base}/get/accepted", answer)
+            return
+        if action != "update":
+            return
+
+        document = json.loads(payload)
+        desired = document.get("state", {}).get("desired", {})
+        token = document.get("clientToken")
+        if self._fail():
+            await self._send(f"{base}/update/rejected", {
+                "code": 500,
+                "message": "Injected failure",
+                "clientToken": token,
+                "timestamp": int(time.time()),
+            })
+            return
+
+        device.desired.update(desired)
+        device.version += 1
+        accepted = {
+            "state": {"desired": desired},
+            "version": device.version,
+            "timestamp": int(time.time()),
+        }
+        if token:
+            accepted["clientToken"] = token
+        await self._send(f"{base}/update/accepted", accepted)
+        await self._send(f"{base}/update/delta", {
+            "state": desired,
+            "version": device.version,
+            "timestamp": int(time.time()),
+        })
+        if self.device_delay:
+            await asyncio.sleep(self.device_delay)
+        device.apply(desired)
+        await self._publish_reported(device)
+
+    async def _publish_reported(self, device: FakeDevice) -> None:
+        """Send the device's reported state as its own shadow update."""
+        await self._send(f"{SHADOW_PREFIX}{device.thing_id}/shadow/update/accepted", {
+            "state": {"reported": dict(device.reported)},
+            "version": device.version,
+            "timestamp": device.timestamp,
+        })
+
+    async def _send(self, topic: str, document: Dict[str, Any]) -> None:
+        """Deliver a message to every client subscribed to the topic."""
+        packet = encode_publish(topic, json.dumps(document).encode())
+        for ws, topics in list(self._subscribers.items()):
+            if topic in topics and not ws.closed:
+                await ws.send_bytes(packet)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the fake cloud until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="0.0-1.0")
+    parser.add_argument("--device-delay", type=float, default=0.0, help="seconds until reported")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    async def run() -> None:
+        cloud = FakeBluestarCloud(
+            device_count=args.devices,
+            latency=args.latency,
+            error_rate=args.error_rate,
+            device_delay=args.device_delay,
+            host=args.host,
+            port=args.port,
+            seed=args.seed,
+        )
+        async with cloud:
+            print(f"Fake Bluestar cloud on {cloud.base_url} with {args.devices} devices")
+            await asyncio.Event().wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
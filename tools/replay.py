@@ -0,0 +1,210 @@
+"""Replay a recorded trace against the local stand-in cloud.
+
+The trace is the ``trace`` section of the integration's diagnostics: every
+request and shadow update the client layer sent, with its offset from the
+start of recording. Outgoing events are fed back through ``BluestarClient``
+and ``BluestarACClient`` at their original pacing, or faster with
+``--speed``, so an incident such as a slow scene or a reconnect storm
+becomes a repeatable regression test::
+
+    python tools/replay.py config_entry-bluestar_ac.json --speed 10 --output replay.json
+
+Device IDs from the trace are mapped onto the fake cloud's devices in order
+of appearance. Logins happen on demand and are not replayed. The report
+has send latencies per event kind, how late events started compared with
+the schedule, and the client metrics.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+
+import _bootstrap  # noqa: F401
+from benchmark import PASSWORD, USERNAME, BenchAccount, Recorder
+from fake_cloud import FakeBluestarCloud
+from custom_components.bluestar_ac.api_client import BluestarClient
+from custom_components.bluestar_ac.bluestar_client import BluestarACClient
+from custom_components.bluestar_ac.trace import OUTGOING
+
+_LOGGER = logging.getLogger(__name__)
+
+SHADOW_UPDATE = re.compile(r"^\$aws/things/([^/]+)/shadow/update$")
+DEVICE_STATE = re.compile(r"^/things/([^/]+)/state$")
+
+
+def load_events(path: Path) -> List[Dict[str, Any]]:
+    """Return the events of a diagnostics dump, a trace or a bare event list."""
+    data = json.loads(path.read_text())
+    if isinstance(data, dict):
+        data = data.get("data", data)
+        data = data.get("trace", data)
+        data = data.get("events", data)
+    if not isinstance(data, list):
+        raise SystemExit(f"No trace events in {path}")
+    return sorted(data, key=lambda event: event["t"])
+
+
+def device_ids(events: List[Dict[str, Any]]) -> List[str]:
+    """Return the device IDs the trace sends to, in order of appearance."""
+    seen: Dict[str, None] = {}
+    for event in events:
+        match = SHADOW_UPDATE.match(event["target"]) or DEVICE_STATE.match(event["target"])
+        if match:
+            seen.setdefault(match.group(1))
+    return list(seen)
+
+
+class Replayer:
+    """Fires the outgoing events of a trace on schedule."""
+
+    def __init__(
+        self,
+        api: BluestarClient,
+        account: BenchAccount,
+        clients: Dict[str, BluestarACClient],
+        recorder: Recorder,
+    ):
+        """Initialize the replayer; ``clients`` are keyed by traced device ID."""
+        self.api = api
+        self.account = account
+        self.clients = clients
+        self.recorder = recorder
+        self.skipped: Dict[str, int] = {}
+        self.lateness: List[float] = []
+
+    def _handler(self, event: Dict[str, Any]) -> Optional[Callable[[], Awaitable[Any]]]:
+        """Return the call that reproduces an event, or None to skip it."""
+        target = event["target"]
+        if event["kind"] == "mqtt":
+            match = SHADOW_UPDATE.match(target)
+            payload = event.get("payload")
+            if match and isinstance(payload, dict):
+                client = self.clients[match.group(1)]
+                return lambda: client.async_send_payload(payload, force=True)
+        elif event["kind"] == "rest" and event.get("method") == "GET":
+            if target == "/things":
+                return self.api.get_devices
+            match = DEVICE_STATE.match(target)
+            if match:
+                device_id = self.clients[match.group(1)].device_id
+                return lambda: self.api.get_device_status(device_id)
+        elif event["kind"] == "connection" and target == "connect":
+            return self._reconnect
+        return None
+
+    async def _reconnect(self) -> bool:
+        """Drop the MQTT connection and connect again."""
+        if self.account.connection:
+            await self.account.connection.disconnect()
+        return await self.account.async_connect()
+
+    async def _fire(
+        self, name: str, call: Callable[[], Awaitable[Any]], due: float
+    ) -> None:
+        """Wait until an event is due, then run and time it."""
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        self.lateness.append((time.perf_counter() - due) * 1000)
+        await self.recorder.time(name, call())
+
+    async def run(self, events: List[Dict[str, Any]], speed: float) -> float:
+        """Replay the outgoing events and return the elapsed seconds."""
+        outgoing = [event for event in events if event["dir"] == OUTGOING]
+        origin = outgoing[0]["t"] if outgoing else 0
+        start = time.perf_counter()
+        tasks = []
+        for event in outgoing:
+            call = self._handler(event)
+            if call is None:
+                key = f"{event['kind']} {event.get('method', '')} {event['target']}"
+                self.skipped[key] = self.skipped.get(key, 0) + 1
+                continue
+            name = f"{event['kind']}.{event['target'].rsplit('/', 1)[-1]}"
+            offset = (event["t"] - origin) / speed if speed > 0 else 0.0
+            tasks.append(asyncio.ensure_future(self._fire(name, call, start + offset)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the fake cloud, replay the trace and return the report."""
+    events = load_events(args.trace)
+    traced = device_ids(events)
+    recorder = Recorder()
+    cloud = FakeBluestarCloud(
+        device_count=max(1, len(traced)),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    async with cloud, aiohttp.ClientSession() as session:
+        api = BluestarClient(USERNAME, PASSWORD, base_url=cloud.base_url)
+        account = BenchAccount(session, api)
+        clients = {
+            device_id: BluestarACClient(account, fake_id, args.coalesce_window / 1000)
+            for device_id, fake_id in zip(traced, cloud.devices)
+        }
+        replayer = Replayer(api, account, clients, recorder)
+        try:
+            if not await account.async_connect():
+                raise SystemExit("Could not connect to the fake cloud")
+            for client in clients.values():
+                await client.async_subscribe_shadow(lambda device_id, state: None)
+            elapsed = await replayer.run(events, args.speed)
+        finally:
+            for client in clients.values():
+                await client.async_close()
+            await account.async_close()
+            await api.close()
+
+    lateness = sorted(replayer.lateness)
+    return {
+        "meta": {
+            "trace": str(args.trace),
+            "events": len(events),
+            "devices": len(traced),
+            "speed": args.speed,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "coalesce_window_ms": args.coalesce_window,
+            "seconds": round(elapsed, 3),
+        },
+        "latency_ms": recorder.summary(),
+        "lateness_ms": {
+            "mean": round(sum(lateness) / len(lateness), 3) if lateness else 0.0,
+            "max": round(lateness[-1], 3) if lateness else 0.0,
+        },
+        "skipped": replayer.skipped,
+        "client_metrics": api.metrics.as_dict(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Replay a trace and print or save the JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", type=Path, help="diagnostics dump or trace JSON")
+    parser.add_argument("--speed", type=float, default=1.0, help="time factor, 0 for no delays")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake cloud delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake cloud failure rate")
+    parser.add_argument("--coalesce-window", type=float, default=0.0, help="milliseconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the report here instead of stdout")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())